@@ -5,21 +5,47 @@ Application factory and app runner.
 - creates Flask app
 - configures database
 - registers blueprints (route groups)
-- ensures DB tables are created and inserts demo restaurants if empty
+- ensures DB tables are created and inserts demo restaurants, content and hours if empty
 """
 
 from flask import Flask, render_template, request, redirect, url_for
 from config import Config
-from utils.db import db
+from utils.db import db, add_missing_columns, configure_read_bind, init_engines
+from utils.regions import configure_regions, init_regions
+from utils.compression import init_compression
+from utils.profiling import init_profiling
+from utils.prerender import init_prerender
+from utils.assets import init_assets
+from utils.shared_cache import cached, init_shared_cache
 
 # Import blueprints after db is defined (they import models that import db)
 from routes.restaurant_routes import restaurant_bp
 from routes.review_routes import review_bp
 from routes.fyp_routes import fyp_bp
 from routes.chatbot_routes import chatbot_bp
+from routes.export_routes import export_bp
 from models.restaurant import Restaurant
 from models.content import Content
 from models.review import Review
+from models.hours import RestaurantHours
+from utils.projection import project, rows_to_dicts, rating_summaries
+from utils.catalog import catalog
+from utils.hours import OPEN_FILTERS, hours_index, parse_schedule
+
+# Fields rendered by the restaurant cards and the map on home.html
+HOME_FIELDS = ("id", "name", "description", "address", "latitude", "longitude",
+               "cuisine", "halal_status", "image_url")
+# Fields rendered by reviews.html
+REVIEWS_PAGE_FIELDS = ("id", "name", "description", "cuisine", "halal_status")
+
+def group_reviews():
+    """{restaurant_id: [{"text", "rating"}]} for every review, oldest first."""
+    reviews_by_restaurant = {}
+    for rev in project(Review, ("restaurant_id", "rating", "comment"), order_by=Review.id):
+        reviews_by_restaurant.setdefault(rev.restaurant_id, []).append(
+            {"text": rev.comment or "", "rating": rev.rating}
+        )
+    return reviews_by_restaurant
 
 def insert_demo_restaurants(app):
 
@@ -154,6 +180,41 @@ def insert_demo_restaurants(app):
             db.session.commit()
             print(f"Inserted {len(demo_restaurants)} demo restaurants.")
 
+# Weekly hours of the demo restaurants (utils/hours.py parse_schedule)
+DEMO_HOURS = {
+    "The Halal Guys": "mon-thu 10:00-02:00, fri-sat 10:00-04:00, sun 10:00-02:00",
+    "Dave's Hot Chicken": "mon-thu 11:00-23:00, fri-sat 11:00-01:00, sun 11:00-23:00",
+    "Crown Fried Chicken": "mon-sun 11:00-03:00",
+    "Asad's Hot Chicken": "mon-sun 12:00-02:00",
+    "Saad's Halal Restaurant": "mon-sat 11:00-22:00, sun 12:00-21:00",
+    "Pasha's Halal Food": "mon-sun 11:00-23:00",
+    "Manakeesh Cafe Bakery & Grill": "mon-sun 07:00-22:00",
+    "Doro Bet": "tue-sun 12:00-22:00",
+    "Kabobeesh": "mon-sun 11:00-23:00",
+    "Halal Fusionz": "mon-sun 12:00-00:00",
+    "Sahara Indian Cuisine": "mon-sun 11:00-22:00",
+}
+
+def insert_demo_hours(app):
+    """Insert opening hours for the demo restaurants if none exist"""
+    with app.app_context():
+        if RestaurantHours.query.count() == 0:
+            restaurants = {r.name: r.id for r in project(Restaurant, ("id", "name"))}
+            rows = 0
+            for name, spec in DEMO_HOURS.items():
+                if name not in restaurants:
+                    continue
+                for day, opens, closes in parse_schedule(spec):
+                    db.session.add(RestaurantHours(
+                        restaurant_id=restaurants[name],
+                        day_of_week=day,
+                        open_minute=opens,
+                        close_minute=closes,
+                    ))
+                    rows += 1
+            db.session.commit()
+            print(f"Inserted {rows} demo opening hours.")
+
 def insert_demo_content(app):
     """Insert demo content for FYP feed"""
     with app.app_context():
@@ -252,31 +313,56 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Initialize db with this app
+    # Initialize db with this app (reads on GET go to the read-only engine)
+    configure_read_bind(app)
+    # One more primary/read engine pair per extra region
+    configure_regions(app)
     db.init_app(app)
+    init_engines(app)
+
+    # Create any tables (and nullable columns) missing from an existing database file
+    with app.app_context():
+        db.create_all()
+        add_missing_columns(db.engine)
+
+    # Per-region databases and the per-request region choice
+    init_regions(app)
+
+    # Results shared by all workers, invalidated on writes
+    init_shared_cache(app)
+
+    # Opt-in request profiling; registered first so it also times the
+    # other after_request hooks
+    init_profiling(app)
+
+    # Gzip/brotli responses and precompressed static files
+    init_compression(app)
+
+    # Content-hashed static URLs via asset_url() in templates
+    init_assets(app)
 
     # Register route blueprints
     app.register_blueprint(restaurant_bp)
     app.register_blueprint(review_bp)
     app.register_blueprint(fyp_bp)
     app.register_blueprint(chatbot_bp)
+    app.register_blueprint(export_bp)
+
+    # Re-render static restaurant/home/map pages after writes (opt-in)
+    init_prerender(app)
 
     # --------------------------
     # Home route
     # --------------------------
     @app.route("/")
     def home():
-        restaurants = [r.to_dict() for r in Restaurant.query.all()]
+        restaurants = rows_to_dicts(catalog.get().rows(fields=HOME_FIELDS))
 
-        # Attach average rating from database reviews
+        # Attach average rating from database reviews (one grouped query,
+        # shared by all workers until a review is written)
+        ratings = cached("ratings", rating_summaries, tags=("review",))
         for r in restaurants:
-            # Get reviews from database
-            db_reviews = Review.query.filter_by(restaurant_id=r["id"]).all()
-            if db_reviews:
-                avg = sum([rev.rating for rev in db_reviews]) / len(db_reviews)
-                r["avg_rating"] = round(avg, 1)
-            else:
-                r["avg_rating"] = None
+            r["avg_rating"] = round(ratings[r["id"]][0], 1) if r["id"] in ratings else None
 
         return render_template("home.html", restaurants=restaurants)
 
@@ -289,8 +375,6 @@ def create_app():
 
     @app.route("/reviews", methods=["GET", "POST"])
     def reviews():
-        restaurants = [r.to_dict() for r in Restaurant.query.all()]
-
         if request.method == "POST":
             restaurant_id = request.form.get("restaurant_id")
             review_text = (request.form.get("review_text") or "").strip()
@@ -315,14 +399,17 @@ def create_app():
 
             return redirect(url_for("reviews"))
 
+        restaurants = rows_to_dicts(catalog.get().rows(fields=REVIEWS_PAGE_FIELDS))
+
         # Attach reviews and average rating from database
+        # Load all reviews once and group them, instead of one query per restaurant
+        reviews_by_restaurant = cached("reviews_by_restaurant", group_reviews, tags=("review",))
+
         for r in restaurants:
-            # Get reviews from database
-            db_reviews = Review.query.filter_by(restaurant_id=r["id"]).all()
-            # Convert to format expected by template
-            r["reviews"] = [{"text": rev.comment or "", "rating": rev.rating} for rev in db_reviews]
-            if db_reviews:
-                avg = sum([rev.rating for rev in db_reviews]) / len(db_reviews)
+            # Already in the format expected by template
+            r["reviews"] = reviews_by_restaurant.get(r["id"], [])
+            if r["reviews"]:
+                avg = sum([rev["rating"] for rev in r["reviews"]]) / len(r["reviews"])
                 r["avg_rating"] = round(avg, 1)
             else:
                 r["avg_rating"] = None
@@ -339,22 +426,21 @@ def create_app():
     @app.route("/find", methods=["GET"])
     def find():
         query = request.args.get("query", "").strip().lower()
-        restaurants = [r.to_dict() for r in Restaurant.query.all()]
-
-        if query:
-            filtered = [
-                r for r in restaurants
-                if query in r["name"].lower()
-                or query in r["cuisine"].lower()
-                or query in r["description"].lower()
-            ]
-        else:
-            filtered = restaurants
+        snapshot = catalog.get()
+
+        # Match name, cuisine or description against the in-memory catalog
+        positions = snapshot.search(query, ("name", "cuisine", "description")) if query else None
+        # ?open=now / late_night: only places open then (utils/hours.py)
+        when = request.args.get("open")
+        if when in OPEN_FILTERS:
+            positions = hours_index.get().filter_positions(snapshot, positions, when)
+        filtered = rows_to_dicts(snapshot.rows(positions, HOME_FIELDS))
 
         return render_template(
             "home.html",
             restaurants=filtered,
-            query=query
+            query=query,
+            open=when if when in OPEN_FILTERS else None
         )
     return app
 
@@ -368,5 +454,6 @@ if __name__ == "__main__":
         db.create_all()  # Create tables if they don't exist
         insert_demo_restaurants(app)  # Insert demo restaurants if empty
         insert_demo_content(app)  # Insert demo content if empty
+        insert_demo_hours(app)  # Insert demo opening hours if empty
 
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+benchmarks/bench_bloom.py
+
+Size and accuracy of the per-session seen-content filter: serialized
+bytes per session (and per million sessions), measured false-positive
+rate, and add/lookup cost, compared with storing seen ids as a list.
+
+Usage: python benchmarks/bench_bloom.py [capacity] [error_rate]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bloom import RotatingBloomFilter  # noqa: E402
+
+CAPACITY = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+ERROR_RATE = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+PROBES = 100_000
+
+
+def false_positive_rate(seen, start):
+    hits = sum(1 for key in range(start, start + PROBES) if key in seen)
+    return hits / PROBES
+
+
+def main():
+    print(f"capacity {CAPACITY}, target error rate {ERROR_RATE:.2%}")
+    for items in (CAPACITY // 2, CAPACITY, 2 * CAPACITY, 10 * CAPACITY):
+        seen = RotatingBloomFilter(CAPACITY, ERROR_RATE)
+        start = time.perf_counter()
+        for key in range(items):
+            seen.add(key)
+        add_us = (time.perf_counter() - start) / items * 1e6
+
+        cookie = seen.dumps()
+        restored = RotatingBloomFilter.loads(cookie, CAPACITY, ERROR_RATE)
+        start = time.perf_counter()
+        fpr = false_positive_rate(restored, 10_000_000)
+        lookup_us = (time.perf_counter() - start) / PROBES * 1e6
+        # Ids still remembered: everything in the current and previous generation
+        remembered = sum(1 for key in range(items) if key in restored) / items
+
+        id_list = json.dumps(list(range(10_000, 10_000 + items)))
+        print(f"  {items:>5} seen: {len(cookie):5d} B/session "
+              f"({len(cookie):,} MB per million sessions), "
+              f"json id list {len(id_list):6d} B, "
+              f"false positives {fpr:.2%}, remembered {remembered:.0%}, "
+              f"add {add_us:.1f} us, lookup {lookup_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+benchmarks/bench_catalog.py
+
+Memory and read-path timings of the columnar catalog snapshot for N
+venues, compared with holding the same rows as a list of dicts.
+
+Usage: python benchmarks/bench_catalog.py [venues]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.catalog import FIELDS, CatalogSnapshot  # noqa: E402
+
+VENUES = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+CUISINES = ["Middle Eastern", "Pakistani", "Indian / Pakistani", "Lebanese", "American",
+            "Ethiopian / Fried Chicken", "American / Fusion", "Turkish", "Afghan"]
+STATUSES = ["Halal", "Certified Halal", "Halal-Friendly"]
+Row = namedtuple("Row", FIELDS)
+
+
+def make_rows(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        Row(
+            id=i,
+            name=f"Halal Spot {i}",
+            description="Halal platters, kabobs, shawarma and fresh naan. " * rng.randint(1, 3),
+            address=f"{i} Walnut St, Philadelphia, PA 19104",
+            latitude=39.9 + rng.random() / 10,
+            longitude=-75.2 + rng.random() / 10,
+            cuisine=rng.choice(CUISINES),
+            halal_status=rng.choice(STATUSES),
+            image_url=f"/static/images/{i}.jpg",
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<38} {best * 1000:8.2f} ms  ({len(result)} rows)")
+
+
+def main():
+    # The dicts own their strings, like rows loaded fresh from the database
+    dicts, dict_bytes = measure(lambda: [r._asdict() for r in make_rows(VENUES)])
+    del dicts
+    rows = make_rows(VENUES)
+    snapshot, snapshot_bytes = measure(lambda: CatalogSnapshot(rows, version=1))
+    print(f"{VENUES} venues")
+    print(f"  list of dicts: {dict_bytes / 1e6:7.1f} MB")
+    print(f"  snapshot:      {snapshot_bytes / 1e6:7.1f} MB (nbytes() estimate {snapshot.nbytes() / 1e6:.1f} MB)")
+
+    snapshot.search("warm-up")
+    timed("text search 'spot 4242' (3 columns)", lambda: snapshot.search("spot 4242"))
+    timed("halal_status == 'Certified Halal'", lambda: snapshot.where(None, "halal_status", "Certified Halal"))
+    timed("positions_for 1,000 ids", lambda: snapshot.positions_for(range(1, 100_000, 100)))
+    timed("map rows (5 fields, all venues)", lambda: snapshot.rows(fields=("id", "name", "address", "latitude", "longitude")))
+
+
+if __name__ == "__main__":
+    main()
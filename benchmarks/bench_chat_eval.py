@@ -0,0 +1,68 @@
+"""
+benchmarks/bench_chat_eval.py
+
+Replaying logged chatbot messages: one /api/chat request per message
+(test client, no network) versus evaluate_batch() on a frozen snapshot,
+inline and on a process pool. Prints messages/s and the projected time
+for a 100k-message corpus.
+
+Usage: python benchmarks/bench_chat_eval.py [messages] [restaurants]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+RESTAURANTS = int(sys.argv[2]) if len(sys.argv) > 2 else 450
+PER_REQUEST = 500  # /api/chat is slow; time a sample and extrapolate
+CORPUS = 100_000
+SAMPLES = [
+    "I'm craving chicken", "find middle eastern restaurants", "certified halal places",
+    "top rated pakistani", "recommend a good kabob spot", "I want biryani",
+    "where can I get shawarma", "best rated burgers", "show me halal wings near campus",
+    "i need falafel", "good rating lebanese", "what should I eat tonight",
+]
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+
+from app import create_app  # noqa: E402
+from query_budgets import seed  # noqa: E402
+from utils.chat_eval import evaluate_batch  # noqa: E402
+from utils.db import db  # noqa: E402
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        seed(db, RESTAURANTS)
+    messages = [f"{SAMPLES[i % len(SAMPLES)]} {'please' if i % 7 == 0 else ''}".strip()
+                for i in range(MESSAGES)]
+
+    client = app.test_client()
+    client.post("/api/chat", json={"message": messages[0]})
+    start = time.perf_counter()
+    for message in messages[:PER_REQUEST]:
+        assert client.post("/api/chat", json={"message": message}).status_code == 200
+    rates = {"/api/chat per message": PER_REQUEST / (time.perf_counter() - start)}
+
+    cpus = os.cpu_count() or 1
+    with app.app_context():
+        for label, workers in (("batch, inline", 1), (f"batch, {max(cpus, 2)} processes", max(cpus, 2))):
+            results, summary = evaluate_batch(messages, workers=workers, min_pool_batch=1)
+            assert len(results) == MESSAGES
+            rates[label] = summary["messages_per_second"]
+            print(f"  {label}: p50 {summary['latency_ms']['p50']} ms, p99 {summary['latency_ms']['p99']} ms "
+                  f"per message, snapshot {summary['snapshot_seconds']} s")
+
+    print(f"{MESSAGES} messages, {RESTAURANTS} restaurants, {cpus} CPU(s)")
+    for label, rate in rates.items():
+        print(f"  {label:<24} {rate:8.0f} msg/s   100k corpus: {CORPUS / rate / 60:6.1f} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+benchmarks/bench_chat_sessions.py
+
+Chatbot follow-ups after "I'm craving chicken", answered by narrowing the
+cached candidates of the previous answer, versus asking the combined
+question from scratch (a full search returning the same restaurants),
+on a seeded database. The default size keeps every chicken match under
+MAX_CANDIDATES, so both return the same restaurants; above it, follow-ups
+narrow only the candidates the first answer kept.
+
+Usage: python benchmarks/bench_chat_sessions.py [restaurants]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 450
+ROUNDS = 200
+FIRST = "I'm craving chicken"
+# follow-up -> the same question asked without a conversation
+FOLLOW_UPS = {
+    "only certified ones": "I'm craving chicken, certified",
+    "top rated": "I'm craving chicken, certified top rated",
+}
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+
+from app import create_app  # noqa: E402
+from query_budgets import seed  # noqa: E402
+from routes.chatbot_routes import CONVERSATION_KEY  # noqa: E402
+from utils.conversations import conversation_store  # noqa: E402
+from utils.db import db  # noqa: E402
+
+
+def timed_post(client, message):
+    start = time.perf_counter()
+    response = client.post("/api/chat", json={"message": message})
+    assert response.status_code == 200
+    return time.perf_counter() - start, response.get_json()
+
+
+def run(client, refine):
+    """Median ms and result count per follow-up."""
+    timings = {message: [] for message in FOLLOW_UPS}
+    counts = {}
+    for _ in range(ROUNDS):
+        timed_post(client, FIRST)
+        for message, standalone in FOLLOW_UPS.items():
+            if not refine:
+                with client.session_transaction() as session:
+                    session.pop(CONVERSATION_KEY, None)
+            elapsed, payload = timed_post(client, message if refine else standalone)
+            assert payload["refined"] is refine
+            timings[message].append(elapsed)
+            counts[message] = payload["count"]
+    return {message: (statistics.median(t) * 1000, counts[message])
+            for message, t in timings.items()}
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        seed(db, RESTAURANTS)
+    client = app.test_client()
+    timed_post(client, "hi")
+
+    full = run(client, refine=False)
+    refined = run(client, refine=True)
+    print(f"{RESTAURANTS} restaurants, median of {ROUNDS} follow-ups")
+    for message in FOLLOW_UPS:
+        print(f"  {message!r:22} full search {full[message][0]:6.2f} ms ({full[message][1]} results)   "
+              f"refined {refined[message][0]:6.2f} ms ({refined[message][1]} results)")
+    with app.app_context():
+        print("  store:", conversation_store().stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+benchmarks/bench_export.py
+
+Peak Python memory and throughput of exporting the review table as
+NDJSON at two table sizes: the streaming export (utils/export.py) versus
+loading everything with Review.query.all() + to_dict-style dicts.
+
+Usage: python benchmarks/bench_export.py [small rows] [large rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SIZES = [int(arg) for arg in sys.argv[1:3]] or [50_000, 400_000]
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+
+from sqlalchemy import delete, insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models.restaurant import Restaurant  # noqa: E402
+from models.review import Review  # noqa: E402
+from utils.db import db  # noqa: E402
+from utils.export import export_stream  # noqa: E402
+from utils.projection import dumps  # noqa: E402
+
+
+def seed(rows):
+    db.session.execute(delete(Review))
+    for start in range(0, rows, 50_000):
+        db.session.execute(insert(Review), [
+            {"restaurant_id": 1, "rating": 1 + i % 5, "comment": f"Great platter, visit {i}" * 3}
+            for i in range(start, min(rows, start + 50_000))
+        ])
+    db.session.commit()
+
+
+def streaming(compress):
+    size = 0
+    for chunk in export_stream("reviews", compress=compress):
+        size += len(chunk)
+    return size
+
+
+def load_all():
+    reviews = Review.query.all()
+    body = "".join(
+        dumps({"id": r.id, "restaurant_id": r.restaurant_id, "rating": r.rating,
+               "comment": r.comment, "date": r.date}) + "\n"
+        for r in reviews
+    ).encode()
+    db.session.remove()
+    return len(body)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, size
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.session.execute(insert(Restaurant), [{"id": 1, "name": "Spot"}])
+        db.session.commit()
+        for rows in SIZES:
+            seed(rows)
+            print(f"{rows} reviews")
+            for label, fn in (("streaming", lambda: streaming(False)),
+                              ("streaming + gzip", lambda: streaming(True)),
+                              (".all() + dicts", load_all)):
+                seconds, peak, size = measure(fn)
+                print(f"  {label:<17} peak {peak / 2**20:7.1f} MiB   {rows / seconds:9.0f} rows/s   "
+                      f"{size / 2**20:6.1f} MiB out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+benchmarks/bench_hours.py
+
+"Who is open at T" over a synthetic catalog with weekly hours on the
+half hour (some overnight, some days closed) and a few holiday
+exceptions: the minute-of-week interval index (utils/hours.py) versus
+checking every restaurant's spans. No database needed.
+
+Usage: python benchmarks/bench_hours.py [restaurants]
+"""
+
+import datetime
+import os
+import random
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.hours import HoursSnapshot  # noqa: E402
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+QUERIES = 200
+
+Weekly = namedtuple("Weekly", "restaurant_id day_of_week open_minute close_minute")
+Exception_ = namedtuple("Exception_", "restaurant_id date open_minute close_minute")
+
+
+def synthetic(restaurants, today):
+    rng = random.Random(7)
+    weekly = []
+    for restaurant_id in range(1, restaurants + 1):
+        opens = rng.choice(range(6 * 60, 13 * 60, 30))
+        closes = rng.choice(range(20 * 60, 24 * 60, 30)) if rng.random() < 0.7 else rng.choice(range(0, 4 * 60, 30))
+        for day in range(7):
+            if rng.random() < 0.1:
+                continue  # closed that day
+            weekly.append(Weekly(restaurant_id, day, opens, closes))
+    exceptions = [Exception_(rng.randrange(1, restaurants + 1), today, None, None) for _ in range(restaurants // 100)]
+    return weekly, exceptions
+
+
+def timed(fn, times):
+    durations = []
+    for at in times:
+        start = time.perf_counter()
+        fn(at)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def main():
+    today = datetime.date(2026, 12, 25)
+    weekly, exceptions = synthetic(RESTAURANTS, today)
+    start = time.perf_counter()
+    hours = HoursSnapshot(weekly, exceptions, "America/New_York")
+    build = time.perf_counter() - start
+
+    rng = random.Random(1)
+    times = [datetime.datetime(2026, 12, 25) + datetime.timedelta(minutes=rng.randrange(0, 2 * 24 * 60))
+             for _ in range(QUERIES)]
+    ids = hours.ids.tolist()
+    for at in times[:20]:
+        assert hours.open_ids(at) == {i for i in ids if hours.is_open(i, at)}
+
+    indexed = timed(hours.open_ids, times)
+    scanned = timed(lambda at: [i for i in ids if hours.is_open(i, at)], times[:20])
+    print(f"{RESTAURANTS} restaurants, {len(weekly)} weekly spans, {len(exceptions)} exceptions")
+    print(f"  build {build * 1000:.0f} ms, {len(hours.breakpoints)} breakpoints, "
+          f"bitsets {hours.open_bits.nbytes / 2**20:.1f} MiB")
+    print(f"  open at T: index {indexed:.2f} ms   scan every restaurant {scanned:.1f} ms   (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+benchmarks/bench_live_counts.py
+
+Fan-out cost of the live FYP counts hub (utils/live_counts.py): many
+idle viewers subscribed to a few posts, then a burst of likes on those
+posts within one tick. Reports the memory per idle subscription, the
+tick time, and the queries and messages sent, next to the messages a
+push-per-like design would send.
+
+Usage: python benchmarks/bench_live_counts.py [viewers] [likes]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VIEWERS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+LIKES = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+POSTS = 50
+IDS_PER_VIEWER = 3
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+os.environ["LIVE_TICK_SECONDS"] = "3600"  # ticks are run by hand below
+
+from sqlalchemy import update  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models.content import Content  # noqa: E402
+from query_budgets import seed  # noqa: E402
+from utils.db import db  # noqa: E402
+from utils.live_counts import live_hub  # noqa: E402
+from utils.regions import current_region  # noqa: E402
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        seed(db, POSTS)
+
+    with app.test_request_context("/api/fyp/live", method="POST"):
+        region = current_region()
+        threads = threading.active_count()
+        tracemalloc.start()
+        subs = [live_hub.subscribe(region, {1 + (v + k) % POSTS for k in range(IDS_PER_VIEWER)})[0]
+                for v in range(VIEWERS)]
+        per_sub = tracemalloc.get_traced_memory()[0] / VIEWERS
+        tracemalloc.stop()
+        extra_threads = threading.active_count() - threads
+
+        # A burst of likes, spread over the posts, all within one tick
+        for i in range(LIKES):
+            content_id = 1 + i % POSTS
+            db.session.execute(update(Content).where(Content.id == content_id)
+                               .values(likes_count=Content.likes_count + 1))
+            live_hub.mark(region, [content_id])
+        db.session.commit()
+
+        viewers_per_post = VIEWERS * IDS_PER_VIEWER / POSTS
+        start = time.perf_counter()
+        live_hub.tick()
+        seconds = time.perf_counter() - start
+        delivered = sum(1 for sub in subs if sub.wait(0))
+
+    print(f"{VIEWERS} idle viewers x {IDS_PER_VIEWER} posts, {LIKES} likes on {POSTS} posts in one tick")
+    print(f"  memory per idle subscription  {per_sub / 1024:.1f} KiB, extra threads {extra_threads}")
+    print(f"  tick: {seconds * 1000:.1f} ms, {live_hub.stats['queries']} query, "
+          f"{live_hub.stats['messages']} post updates to {delivered} streams")
+    print(f"  push per like would send {int(LIKES * viewers_per_post)} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+benchmarks/bench_prerender.py
+
+Cost of serving a restaurant profile dynamically versus from its
+pre-rendered file, and full-rebuild time with 1 worker versus one per
+core, on a seeded database.
+
+Usage: python benchmarks/bench_prerender.py [restaurants]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+REQUESTS = 300
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+os.environ["PRERENDER_DIR"] = os.path.join(tmp, "prerendered")
+
+from app import create_app  # noqa: E402
+from query_budgets import seed  # noqa: E402
+from utils.db import db  # noqa: E402
+
+
+def rebuild(workers):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "prerender.py", "--workers", str(workers)],
+                   cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        seed(db, RESTAURANTS)
+    client = app.test_client()
+    paths = [f"/restaurants/{1 + i * 7 % RESTAURANTS}" for i in range(REQUESTS)]
+
+    for path in paths[:20]:
+        client.get(path)
+    start = time.perf_counter()
+    for path in paths:
+        client.get(path)
+    dynamic = (time.perf_counter() - start) / REQUESTS
+
+    cores = os.cpu_count() or 1
+    serial = rebuild(1)
+    parallel = rebuild(cores)
+
+    files = [os.path.join(tmp, "prerendered", app.config["DEFAULT_REGION"], p.strip("/"), "index.html")
+             for p in paths]
+    start = time.perf_counter()
+    for name in files:
+        with open(name, "rb") as f:
+            f.read()
+    static = (time.perf_counter() - start) / REQUESTS
+
+    print(f"{RESTAURANTS} restaurants, {cores} cores")
+    print(f"  profile page, dynamic (Flask):  {dynamic * 1000:7.3f} ms")
+    print(f"  profile page, pre-rendered file: {static * 1000:7.3f} ms (file read)")
+    print(f"  full rebuild, 1 worker:    {serial:6.2f} s")
+    print(f"  full rebuild, {cores} workers:   {parallel:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
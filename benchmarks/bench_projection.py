@@ -0,0 +1,88 @@
+"""
+benchmarks/bench_projection.py
+
+Compares the old full-row path (Restaurant.query.all() + to_dict() + jsonify)
+with the column-projected path (project() + namedtuple rows + fast JSON)
+for the map payload over N restaurants.
+
+Usage: python benchmarks/bench_projection.py [rows]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+# Point the app at a throwaway database before config is imported
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models.restaurant import Restaurant  # noqa: E402
+from routes.restaurant_routes import MAP_FIELDS  # noqa: E402
+from utils.db import db  # noqa: E402
+from utils.projection import dumps, project, rows_to_dicts  # noqa: E402
+
+
+def seed(rows):
+    description = "Halal platters, grilled kabobs and fresh naan. " * 20
+    db.session.execute(
+        Restaurant.__table__.insert(),
+        [
+            {
+                "name": f"Restaurant {i}",
+                "description": description,
+                "address": f"{i} Walnut St, Philadelphia, PA",
+                "latitude": 39.95 + i * 1e-6,
+                "longitude": -75.16 - i * 1e-6,
+                "cuisine": "Middle Eastern",
+                "halal_status": "Halal",
+                "image_url": f"/static/images/{i}.jpg",
+            }
+            for i in range(rows)
+        ],
+    )
+    db.session.commit()
+
+
+def full_rows():
+    return json.dumps([r.to_dict() for r in Restaurant.query.all()])
+
+
+def projected_rows():
+    return dumps(rows_to_dicts(project(Restaurant, MAP_FIELDS)))
+
+
+def measure(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    db.session.expunge_all()
+    tracemalloc.start()
+    payload = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, len(payload)
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(ROWS)
+        print(f"{ROWS} rows, map payload")
+        for label, fn in (("to_dict()", full_rows), ("projected", projected_rows)):
+            seconds, peak, size = measure(fn)
+            print(f"  {label:<10} {seconds * 1000:8.1f} ms  peak {peak / 1e6:6.1f} MB  body {size / 1e6:5.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+benchmarks/bench_regions.py
+
+Region shards:
+1. Read latency in one region while writer threads commit reviews into
+   the same region versus into another region's file.
+2. A cross-region query (rating summaries in every region) run serially
+   versus with fan_out() over the thread pool.
+
+Usage: python benchmarks/bench_regions.py [restaurants per region] [regions]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+REGIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+READERS = 4
+WRITERS = 4
+SECONDS = 3.0
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "default.db")
+os.environ["REGIONS_DIR"] = os.path.join(tmp, "regions")
+with open(os.path.join(tmp, "regions.json"), "w") as f:
+    json.dump({f"r{i}": {"name": f"Region {i}"} for i in range(REGIONS)}, f)
+os.environ["REGIONS_FILE"] = os.path.join(tmp, "regions.json")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models.restaurant import Restaurant  # noqa: E402
+from models.review import Review  # noqa: E402
+from utils.db import db  # noqa: E402
+from utils.projection import rating_summaries  # noqa: E402
+from utils.regions import fan_out, region_scope  # noqa: E402
+
+app = create_app()
+
+
+def seed(region):
+    with app.app_context(), region_scope(region):
+        db.session.execute(insert(Restaurant), [
+            {"name": f"Spot {i}", "cuisine": "Halal", "halal_status": "Halal"}
+            for i in range(1, RESTAURANTS + 1)
+        ])
+        db.session.execute(insert(Review), [
+            {"restaurant_id": 1 + i % RESTAURANTS, "rating": 1 + i % 5, "comment": "ok"}
+            for i in range(RESTAURANTS * 3)
+        ])
+        db.session.commit()
+
+
+def write_loop(region, stop):
+    with app.app_context(), region_scope(region):
+        while not stop.is_set():
+            db.session.add(Review(restaurant_id=1, rating=5, comment="x" * 200))
+            db.session.commit()
+
+
+def read_loop(region, stop, latencies):
+    with app.app_context(), region_scope(region, read_only=True):
+        while not stop.is_set():
+            start = time.perf_counter()
+            rating_summaries([1, 2, 3])
+            db.session.rollback()  # fresh read transaction each time
+            latencies.append(time.perf_counter() - start)
+
+
+def contention(write_region):
+    stop, latencies = threading.Event(), []
+    threads = [threading.Thread(target=read_loop, args=("r0", stop, latencies)) for _ in range(READERS)]
+    if write_region is not None:
+        threads += [threading.Thread(target=write_loop, args=(write_region, stop)) for _ in range(WRITERS)]
+    for t in threads:
+        t.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return len(latencies) / SECONDS, statistics.median(latencies) * 1000, p99 * 1000
+
+
+def main():
+    regions = [f"r{i}" for i in range(REGIONS)]
+    for region in regions:
+        seed(region)
+    print(f"{REGIONS} regions x {RESTAURANTS} restaurants, {READERS} readers on r0")
+
+    for label, write_region in (("no writers", None), ("writers on r0 (same file)", "r0"),
+                                ("writers on r1 (other file)", "r1")):
+        rate, p50, p99 = contention(write_region)
+        print(f"  {label:<28} {rate:7.0f} reads/s  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+    def summaries(region):
+        with region_scope(region, read_only=True):
+            return len(rating_summaries())
+
+    with app.app_context():
+        start = time.perf_counter()
+        for region in regions:
+            with app.app_context():
+                summaries(region)
+        serial = time.perf_counter() - start
+        fan_out(summaries)  # start the pool threads
+        start = time.perf_counter()
+        fan_out(summaries)
+        parallel = time.perf_counter() - start
+    print(f"  rating summaries in all regions: serial {serial * 1000:.1f} ms, fan_out {parallel * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
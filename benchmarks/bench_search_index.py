@@ -0,0 +1,106 @@
+"""
+benchmarks/bench_search_index.py
+
+Builds the chatbot TF-IDF index over N synthetic venues and times
+ranking queries, an incremental update() of 100 venues (a delta of
+postings), queries with that delta pending, and folding it back into the
+base postings with rebuild().
+
+Usage: python benchmarks/bench_search_index.py [venues]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from config import Config  # noqa: E402
+from routes.chatbot_routes import parse_query  # noqa: E402
+from utils.search_index import TfidfIndex  # noqa: E402
+
+VENUES = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+WORDS = (
+    "halal chicken gyro shawarma platter kabob biryani curry naan tandoori burger "
+    "wings tenders fried spicy grilled falafel lamb beef rice wrap sandwich bakery "
+    "sweets cafe grill street food truck late night comfort crispy fresh bold sauce "
+    "lebanese pakistani indian ethiopian american fusion middle eastern philly"
+).split()
+
+QUERIES = [
+    "I'm craving chicken",
+    "I want biryani",
+    "Find Middle Eastern restaurants",
+    "spicy hot chicken tenders",
+    "recommend a good kabob place",
+]
+
+
+def make_documents(n, seed=7):
+    rng = random.Random(seed)
+    return {
+        i: f"Venue {i} " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        for i in range(1, n + 1)
+    }
+
+
+def main():
+    documents = make_documents(VENUES)
+
+    start = time.perf_counter()
+    index = TfidfIndex()
+    index.update(documents)
+    print(f"build {VENUES} venues: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # parse_query() reads the region keywords from config
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    with app.app_context():
+        keyword_sets = [parse_query(q)["keywords"] for q in QUERIES]
+    for keywords in keyword_sets:
+        index.search(keywords)  # warm up
+
+    timings = []
+    for _ in range(20):
+        for keywords in keyword_sets:
+            start = time.perf_counter()
+            index.search(keywords)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"query (full ranking): median {timings[len(timings) // 2] * 1000:.2f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms"
+    )
+
+    timings = []
+    for keywords in keyword_sets * 20:
+        start = time.perf_counter()
+        index.search(keywords, limit=500)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"query (top 500): median {timings[len(timings) // 2] * 1000:.2f} ms")
+
+    changed = {i: documents[i] + " biryani" for i in range(1, 101)}
+    start = time.perf_counter()
+    index.update(changed)
+    print(f"update() of 100 venues: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    timings = []
+    for keywords in keyword_sets * 20:
+        start = time.perf_counter()
+        index.search(keywords, limit=500)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"query (top 500, 100 venues in the delta): median {timings[len(timings) // 2] * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    index.rebuild()
+    print(f"rebuild() folding the delta: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
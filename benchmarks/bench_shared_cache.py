@@ -0,0 +1,134 @@
+"""
+benchmarks/bench_shared_cache.py
+
+The shared cache tier (utils/shared_cache.py) with several forked
+"workers" on one host, using the default SQLite file backend:
+
+- steady state: each worker renders the home page's rating summaries
+  many times; per-process caching would compute them once per worker,
+  the shared tier once per host. Reports hit latency next to the
+  grouped query it replaces.
+- stampede: every worker misses the same cold key at once (compute
+  takes 200 ms); single-flight computes it once, without it every worker
+  computes.
+- invalidation: a review written in one worker is seen by the others
+  on their next read.
+
+Usage: python benchmarks/bench_shared_cache.py [restaurants] [workers]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESTAURANTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+READS = 200
+COMPUTE_SECONDS = 0.2
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+os.environ["SHARED_CACHE_URL"] = os.path.join(tmp, "cache.db")
+
+from app import create_app  # noqa: E402
+from models.review import Review  # noqa: E402
+from query_budgets import seed  # noqa: E402
+from utils.db import db  # noqa: E402
+from utils.projection import rating_summaries  # noqa: E402
+from utils.shared_cache import SharedCache, cached  # noqa: E402
+
+
+def in_workers(app, job):
+    """Run job(worker) in WORKERS forked processes at once; returns their results."""
+    read_end, write_end = os.pipe()
+    pids = []
+    start_at = time.time() + 0.2
+    for worker in range(WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            time.sleep(max(start_at - time.time(), 0))
+            with app.test_request_context("/", method="POST"):
+                result = job(worker)
+            os.write(write_end, (repr(result) + "\n").encode())
+            os._exit(0)
+        pids.append(pid)
+    os.close(write_end)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    with os.fdopen(read_end) as f:
+        return [eval(line) for line in f]
+
+
+def main():
+    app = create_app()
+    cache = app.extensions["shared_cache"]
+    with app.app_context():
+        seed(db, RESTAURANTS)
+
+    with app.test_request_context("/"):
+        start = time.perf_counter()
+        for _ in range(20):
+            rating_summaries()
+        query_ms = (time.perf_counter() - start) / 20 * 1000
+
+    def steady(worker):
+        computed = 0
+
+        def compute():
+            nonlocal computed
+            computed += 1
+            return rating_summaries()
+
+        durations = []
+        for _ in range(READS):
+            start = time.perf_counter()
+            cached("ratings", compute, tags=("review",))
+            durations.append(time.perf_counter() - start)
+        return computed, statistics.median(durations) * 1000
+
+    results = in_workers(app, steady)
+    print(f"{RESTAURANTS} restaurants, {RESTAURANTS * 3} reviews, {WORKERS} workers x {READS} reads")
+    print(f"  rating_summaries() query: {query_ms:.2f} ms")
+    print(f"  shared tier: computed {sum(r[0] for r in results)}x in total "
+          f"(per-process caches: {WORKERS}x), median hit {statistics.median(r[1] for r in results):.2f} ms")
+
+    def stampede(wait_seconds):
+        def job(worker):
+            app.extensions["shared_cache"] = SharedCache(cache.backend, wait_seconds=wait_seconds)
+            computed = []
+
+            def compute():
+                time.sleep(COMPUTE_SECONDS)
+                computed.append(1)
+                return "value"
+
+            start = time.perf_counter()
+            cached(f"cold:{wait_seconds}", compute)
+            return len(computed), time.perf_counter() - start
+        return in_workers(app, job)
+
+    for label, wait in (("single-flight", 5.0), ("no waiting", 0)):
+        results = stampede(wait)
+        print(f"  stampede, {label}: computed {sum(r[0] for r in results)}x for {WORKERS} concurrent misses, "
+              f"slowest {max(r[1] for r in results) * 1000:.0f} ms")
+
+    # Invalidation: one worker writes a review, the others read after it
+    def write_then_read(worker):
+        if worker == 0:
+            db.session.add(Review(restaurant_id=1, rating=1, comment="Cold"))
+            db.session.commit()
+            return None
+        time.sleep(0.5)
+        return cached("ratings", rating_summaries, tags=("review",))[1][1]
+
+    counts = [c for c in in_workers(app, write_then_read) if c is not None]
+    print(f"  after a review in one worker, the others see restaurant 1 with {set(counts)} reviews (was 3)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+benchmarks/bench_suggest.py
+
+Typeahead index (utils/suggest.py) at 100k entries: build time, memory,
+p50/p99 completion latency for 1-4 character prefixes (the short ones
+match tens of thousands of keys), single-entry update latency, the cost
+of folding the delta, and a linear scan over the same entries for
+comparison.
+
+Usage: python benchmarks/bench_suggest.py [entries]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.suggest import Entry, SuggestIndex, normalize  # noqa: E402
+
+ENTRIES = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+QUERIES = 20_000
+K = 8
+
+WORDS = ("halal", "grill", "kabob", "house", "chicken", "hot", "shawarma", "cafe", "falafel",
+         "biryani", "express", "kitchen", "palace", "gyro", "bistro", "tandoori", "pizza",
+         "burger", "corner", "market", "bakery", "sweets", "platter", "spot", "king", "garden")
+
+
+def make_entries(rng):
+    entries = []
+    for i in range(ENTRIES):
+        name = " ".join(rng.sample(WORDS, rng.randint(2, 3))).title() + f" {rng.randint(1, 999)}"
+        weight = int(rng.paretovariate(1.2))  # a few very popular places
+        entries.append(Entry("restaurant", i, name, weight))
+    return entries
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    rng = random.Random(42)
+    entries = make_entries(rng)
+
+    start = time.perf_counter()
+    index = SuggestIndex()
+    index.update(entries)
+    index.rebuild()
+    build = time.perf_counter() - start
+    print(f"{ENTRIES} entries, {len(index._view.base)} keys: build {build:.2f} s, "
+          f"{index.nbytes() / 1e6:.1f} MB")
+
+    names = [normalize(entry.text) for entry in entries]
+    prefixes = []
+    for _ in range(QUERIES):
+        word = rng.choice(rng.choice(names).split())
+        prefixes.append(word[:rng.randint(1, 4)])
+
+    for label, fn in (
+        ("index", lambda prefix: index.complete(prefix, K)),
+        ("linear scan", lambda prefix: sorted(
+            (entry for entry, name in zip(entries, names)
+             if name.startswith(prefix) or f" {prefix}" in name),
+            key=lambda entry: -entry.weight)[:K]),
+    ):
+        timings = []
+        for prefix in prefixes[:QUERIES if label == "index" else 200]:
+            t = time.perf_counter()
+            fn(prefix)
+            timings.append(time.perf_counter() - t)
+        print(f"  {label:<12} p50 {percentile(timings, 0.5) * 1e6:8.1f} us   "
+              f"p99 {percentile(timings, 0.99) * 1e6:8.1f} us")
+
+    # Incremental updates land in the delta until it is folded in
+    timings = []
+    for i in range(400):
+        entry = entries[rng.randrange(ENTRIES)]
+        t = time.perf_counter()
+        index.update([entry._replace(weight=entry.weight + 1)])
+        timings.append(time.perf_counter() - t)
+    print(f"  update 1 entry: p50 {percentile(timings, 0.5) * 1e6:.1f} us   "
+          f"p99 {percentile(timings, 0.99) * 1e6:.1f} us")
+
+    timings = []
+    for prefix in prefixes:
+        t = time.perf_counter()
+        index.complete(prefix, K)
+        timings.append(time.perf_counter() - t)
+    print(f"  index with a {len(index._view.delta)}-key delta: p50 {percentile(timings, 0.5) * 1e6:.1f} us   "
+          f"p99 {percentile(timings, 0.99) * 1e6:.1f} us")
+
+    t = time.perf_counter()
+    index.rebuild()
+    print(f"  fold the delta into the base: {(time.perf_counter() - t) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
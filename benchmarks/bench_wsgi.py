@@ -0,0 +1,94 @@
+"""
+benchmarks/bench_wsgi.py
+
+Requests per second of the Flask dev server (app.run, threaded) versus
+gunicorn with gunicorn.conf.py, on a copy of halalyelp.db.
+
+Usage: python benchmarks/bench_wsgi.py [requests per URL] [clients]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+URLS = ["/", "/restaurants", "/api/fyp/content"]
+
+SERVERS = {
+    "dev server": lambda port: [
+        sys.executable, "-c",
+        f"from app import create_app; create_app().run(port={port}, threaded=True)",
+    ],
+    "gunicorn": lambda port: [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}", "wsgi:app",
+    ],
+}
+
+
+def fetch(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        return True
+    except OSError:
+        return False
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if fetch(url):
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def run(command, port, env):
+    server = subprocess.Popen(command, cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(base + "/")
+        results = {}
+        with ThreadPoolExecutor(CLIENTS) as pool:
+            for path in URLS:
+                list(pool.map(fetch, [base + path] * CLIENTS))  # warm connections/caches
+                start = time.perf_counter()
+                ok = sum(pool.map(fetch, [base + path] * REQUESTS))
+                results[path] = (ok / (time.perf_counter() - start), REQUESTS - ok)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    shutil.copy(os.path.join(ROOT, "halalyelp.db"), tmp)
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'halalyelp.db')}",
+               SECRET_KEY="bench")
+    try:
+        results = {}
+        for port, (name, make_command) in enumerate(SERVERS.items(), start=8765):
+            results[name] = run(make_command(port), port, env)
+        print(f"{REQUESTS} requests per URL, {CLIENTS} concurrent clients, {os.cpu_count()} cores")
+        print(f"  {'URL':<22}" + "".join(f"{name:>14}" for name in results))
+        for path in URLS:
+            print(f"  {path:<22}" + "".join(
+                f"{results[name][path][0]:>10.0f} r/s" + (f" ({results[name][path][1]} failed)" if results[name][path][1] else "")
+                for name in results))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+chat_eval.py
+
+Replays logged chatbot messages through the chatbot pipeline in bulk,
+on a process pool over one frozen catalog/rating snapshot (see
+utils/chat_eval.py):
+
+    python chat_eval.py messages.txt -o results.ndjson
+    python chat_eval.py chat_log.ndjson --workers 4 --region philly
+
+Input is one message per line, or NDJSON with a "message" field.
+Writes one NDJSON result per message (same order) and prints the
+latency/throughput summary to stderr.
+"""
+
+import argparse
+import json
+import sys
+
+from app import create_app
+from utils.chat_eval import evaluate_batch
+from utils.projection import dumps
+
+
+def read_messages(path):
+    """Messages from a text file (one per line) or NDJSON ({"message": ...} per line)."""
+    messages = []
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = (json.loads(line).get("message") or "").strip()
+                if not line:
+                    continue
+            messages.append(line)
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HalalSpot chatbot batch evaluation")
+    parser.add_argument("input", help="messages file ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="results file (default: stdout)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--region", help="region for messages without a location (default: the default region)")
+    parser.add_argument("--limit", type=int, help="only the first N messages")
+    args = parser.parse_args()
+
+    messages = read_messages(args.input)[:args.limit]
+    app = create_app()
+    with app.app_context():
+        if args.region and args.region not in app.config["REGIONS"]:
+            parser.error(f"unknown region: {args.region}")
+        results, summary = evaluate_batch(messages, args.region, args.workers, min_pool_batch=1)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in results:
+            out.write(dumps(result) + "\n")
+    finally:
+        if args.output:
+            out.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
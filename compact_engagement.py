@@ -0,0 +1,23 @@
+"""
+compact_engagement.py
+
+Rolls raw engagement events up into hourly and daily rollups and
+applies the retention policy, region by region. Run it from cron, e.g. every 15 minutes:
+
+    */15 * * * * cd /path/to/halalspot && python compact_engagement.py
+"""
+
+from app import create_app
+from utils.engagement import compact
+from utils.regions import region_names, region_scope
+
+app = create_app()
+
+with app.app_context():
+    for region in region_names():
+        with region_scope(region):
+            summary = compact()
+        print(
+            f"[{region}] Rolled up {summary['hourly_rows']} hourly and {summary['daily_rows']} daily rows; "
+            f"deleted {summary['raw_deleted']} raw events and {summary['hourly_deleted']} old hourly rows."
+        )
@@ -0,0 +1,60 @@
+"""
+compress_static.py
+
+Build step: writes precompressed siblings (`.gz`, and `.br` when the
+`brotli` package is installed) next to every CSS and JS file under
+static/. The app serves these directly instead of compressing per request.
+
+Usage: python compress_static.py
+"""
+
+import gzip
+import os
+
+from utils.compression import brotli
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIRS = [os.path.join(BASE_DIR, "static", "css"), os.path.join(BASE_DIR, "static", "js")]
+EXTENSIONS = (".css", ".js")
+
+
+def write_sibling(path, data, extension, compressor):
+    target = path + extension
+    compressed = compressor(data)
+    # Not worth serving if compression does not make the file smaller
+    if len(compressed) >= len(data):
+        if os.path.exists(target):
+            os.remove(target)
+        return None
+    with open(target, "wb") as f:
+        f.write(compressed)
+    return len(compressed)
+
+
+def compress_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    sizes = {"raw": len(data)}
+    sizes["gz"] = write_sibling(
+        path, data, ".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0)
+    )
+    if brotli is not None:
+        sizes["br"] = write_sibling(
+            path, data, ".br", lambda d: brotli.compress(d, quality=11)
+        )
+    return sizes
+
+
+def main():
+    for directory in STATIC_DIRS:
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            sizes = compress_file(path)
+            summary = ", ".join(f"{k} {v}" for k, v in sizes.items() if v is not None)
+            print(f"{os.path.relpath(path, BASE_DIR)}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
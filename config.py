@@ -15,5 +15,105 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
     
     # SQLite file located inside the project folder
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'halalyelp.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(BASE_DIR, 'halalyelp.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Read/write routing: GET requests use a read-only engine.
+    # Left unset, a SQLite file database gets a `mode=ro` connection pool on
+    # the same file. Set READ_DATABASE_URL to point reads at a replica instead.
+    SQLALCHEMY_READ_ROUTING = os.environ.get('READ_ROUTING', '1') != '0'
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get('READ_DATABASE_URL')
+
+    # Regions (utils/regions.py): each city's restaurants, reviews and content
+    # live in their own database. The default region uses the database above;
+    # others default to regions/<slug>.db. REGIONS_FILE can add more regions
+    # as JSON: {"nyc": {"name": "New York", "keywords": ["nyc", "brooklyn"],
+    #                   "database_url": "sqlite:///..."}}
+    # `keywords` let the chatbot pick the region from a message; opening
+    # hours are in the region's `timezone` (default: DEFAULT_TIMEZONE).
+    DEFAULT_REGION = os.environ.get('DEFAULT_REGION', 'philadelphia')
+    DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE', 'America/New_York')
+    REGIONS = {
+        'philadelphia': {
+            'name': 'Philadelphia',
+            'keywords': ['philadelphia', 'philly', 'west philly', 'temple', 'center city'],
+            'timezone': 'America/New_York',
+        },
+    }
+    REGIONS_FILE = os.environ.get('REGIONS_FILE')
+    REGIONS_DIR = os.environ.get('REGIONS_DIR') or os.path.join(BASE_DIR, 'regions')
+    REGION_FANOUT_WORKERS = int(os.environ.get('REGION_FANOUT_WORKERS', '8'))
+
+    # Request profiling (utils/profiling.py). Off unless PROFILE_ENABLED=1;
+    # then requests with a signed token (python profile_token.py) or
+    # 1 in PROFILE_SAMPLE_RATE requests are profiled into PROFILE_DIR.
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', '0') == '1'
+    PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(BASE_DIR, 'profiles')
+
+    # Static pre-rendering (utils/prerender.py, prerender.py). When enabled,
+    # restaurant pages (plus home and map) in PRERENDER_DIR are re-rendered
+    # in the background after each write that affects them.
+    PRERENDER_ENABLED = os.environ.get('PRERENDER_ENABLED', '0') == '1'
+    PRERENDER_DIR = os.environ.get('PRERENDER_DIR') or os.path.join(BASE_DIR, 'prerendered')
+    PRERENDER_WORKERS = int(os.environ.get('PRERENDER_WORKERS', '2'))
+
+    # Chatbot conversation state (utils/conversations.py): follow-ups like
+    # "only certified ones" narrow the previous answer in memory. Entries
+    # expire CHAT_SESSION_TTL seconds after last use; at most CHAT_SESSION_MAX.
+    CHAT_SESSION_TTL = int(os.environ.get('CHAT_SESSION_TTL', '900'))
+    CHAT_SESSION_MAX = int(os.environ.get('CHAT_SESSION_MAX', '10000'))
+
+    # Batch chatbot evaluation over HTTP (/api/chat/batch): off unless
+    # CHAT_BATCH_TOKEN is set, then callers send "Authorization: Bearer <token>".
+    # Batches run inline in the request, at most CHAT_BATCH_MAX messages;
+    # use chat_eval.py for large replays on a process pool.
+    CHAT_BATCH_TOKEN = os.environ.get('CHAT_BATCH_TOKEN')
+    CHAT_BATCH_MAX = int(os.environ.get('CHAT_BATCH_MAX', '500'))
+
+    # Chatbot TF-IDF index (utils/search_index.py): changed documents collect
+    # in a delta of postings that is folded in past this many documents.
+    SEARCH_DELTA_LIMIT = int(os.environ.get('SEARCH_DELTA_LIMIT', '1000'))
+
+    # Typeahead index (utils/suggest.py): changed entries collect in a
+    # sorted delta that is folded into the base arrays past this many keys.
+    SUGGEST_DELTA_LIMIT = int(os.environ.get('SUGGEST_DELTA_LIMIT', '2000'))
+
+    # Bulk exports (/api/export/<table>, export.py): off unless EXPORT_TOKEN
+    # is set, then callers send "Authorization: Bearer <token>"; rows per keyset batch
+    EXPORT_TOKEN = os.environ.get('EXPORT_TOKEN')
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+    # FYP: the first post's video is fully preloaded when at most this
+    # many bytes (Content.video_bytes, set by fast_start.py); others load metadata only
+    FYP_PRELOAD_MAX_BYTES = int(os.environ.get('FYP_PRELOAD_MAX_BYTES', str(4 * 1024 * 1024)))
+
+    # FYP live counts (/api/fyp/live, utils/live_counts.py): changes are pushed
+    # at most once per tick per post; watched posts are re-read every poll
+    # interval to catch writes from other workers. Streams close after
+    # LIVE_STREAM_SECONDS and the browser reconnects. gunicorn runs gevent
+    # workers by default, where streams are greenlets (up to
+    # LIVE_MAX_SUBSCRIBERS); each stream on a thread worker (gthread, the dev
+    # server) holds a thread, so those accept only LIVE_THREAD_STREAMS and
+    # the other viewers poll.
+    LIVE_TICK_SECONDS = float(os.environ.get('LIVE_TICK_SECONDS', '0.5'))
+    LIVE_POLL_SECONDS = float(os.environ.get('LIVE_POLL_SECONDS', '5'))
+    LIVE_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_HEARTBEAT_SECONDS', '15'))
+    LIVE_STREAM_SECONDS = float(os.environ.get('LIVE_STREAM_SECONDS', '300'))
+    LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', '5000'))
+    LIVE_THREAD_STREAMS = int(os.environ.get('LIVE_THREAD_STREAMS', '1'))
+    # Set again from the actual worker class in gunicorn.conf.py post_fork
+    LIVE_ASYNC_WORKER = os.environ.get('GUNICORN_WORKER_CLASS', '') in ('gevent', 'eventlet')
+    LIVE_MAX_IDS = int(os.environ.get('LIVE_MAX_IDS', '50'))
+
+    # Shared cache tier (utils/shared_cache.py) for results every worker
+    # would otherwise compute separately: rating summaries, the reviews
+    # page, the FYP feed and restaurant profiles. Empty: instance/shared_cache.db,
+    # a SQLite file (0600) shared by the workers of this checkout; a path or
+    # sqlite:/// URL; redis://host:6379/0 (needs redis-py) to share it
+    # across hosts; "none" to turn it off. Entries live SHARED_CACHE_TTL
+    # seconds unless a restaurant, review or content write invalidates them.
+    SHARED_CACHE_URL = os.environ.get('SHARED_CACHE_URL', '')
+    SHARED_CACHE_TTL = int(os.environ.get('SHARED_CACHE_TTL', '300'))
+    SHARED_CACHE_LOCK_SECONDS = int(os.environ.get('SHARED_CACHE_LOCK_SECONDS', '30'))
+    SHARED_CACHE_WAIT_SECONDS = float(os.environ.get('SHARED_CACHE_WAIT_SECONDS', '5'))
@@ -0,0 +1,72 @@
+"""
+export.py
+
+Bulk export of restaurants, reviews or content to NDJSON or CSV, streamed
+in keyset batches so memory stays flat (see utils/export.py):
+
+    python export.py reviews > reviews.ndjson
+    python export.py reviews --format csv --gzip -o reviews.csv.gz
+    python export.py content --since 2025-06-01T12:00:00 -o content.ndjson
+
+Reads the default region unless --region is given. When done, prints the
+row count and the newest timestamp seen, to pass as --since next time.
+"""
+
+import argparse
+import sys
+
+from app import create_app
+from utils.export import EXPORTS, FORMATS, encode, gzip_stream, iter_batches, parse_since
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HalalSpot bulk export")
+    parser.add_argument("table", choices=list(EXPORTS))
+    parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    parser.add_argument("--since", type=parse_since,
+                        help="only rows stamped at or after this ISO date/time (reviews, content)")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per batch")
+    parser.add_argument("--region", help="region to export (default: the default region)")
+    args = parser.parse_args()
+
+    _, fields, since_field = EXPORTS[args.table]
+    if args.since is not None and since_field is None:
+        parser.error(f"{args.table} has no timestamp for --since")
+
+    app = create_app()
+    stats = {"rows": 0, "newest": None}
+
+    def counted(batches):
+        column = fields.index(since_field) if since_field else None
+        for rows in batches:
+            stats["rows"] += len(rows)
+            if column is not None:
+                stamps = [row[column] for row in rows if row[column] is not None]
+                if stamps and (stats["newest"] is None or max(stamps) > stats["newest"]):
+                    stats["newest"] = max(stamps)
+            yield rows
+
+    with app.app_context():
+        region = args.region or app.config["DEFAULT_REGION"]
+        batches = counted(iter_batches(args.table, args.since, region, args.batch))
+        chunks = encode(fields, batches, args.format)
+        if args.gzip:
+            chunks = gzip_stream(chunks)
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+
+    summary = f"{stats['rows']} {args.table} rows exported"
+    if stats["newest"] is not None:
+        summary += f"; next incremental export: --since {stats['newest'].isoformat()}"
+    print(summary, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+fast_start.py
+
+Checks the FYP videos are "fast start" (moov box before the media data,
+so playback starts before the whole file has downloaded), rewrites the
+ones that are not, and records each video's duration, size and byte
+count on the Content rows that use it (see utils/mp4.py):
+
+    python fast_start.py                 # every video in static/videos
+    python fast_start.py --check         # report only, exit 1 if any needs fixing
+    python fast_start.py static/videos/daves.mp4
+
+Run it after adding a video; no ffmpeg needed.
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import update
+
+from app import create_app
+from models.content import Content
+from utils.db import db
+from utils.mp4 import Mp4Error, fast_start, probe
+from utils.regions import region_names, region_scope
+
+VIDEO_EXTENSIONS = (".mp4", ".m4v", ".mov")
+
+
+def video_url(app, path):
+    """/static/... URL of a file inside the static folder (None if outside)."""
+    relative = os.path.relpath(os.path.abspath(path), app.static_folder)
+    if relative.startswith(".."):
+        return None
+    return app.static_url_path + "/" + relative.replace(os.sep, "/")
+
+
+def record(app, url, info):
+    """Store a video's metadata on every Content row (in every region) using it."""
+    values = {
+        "video_duration": info["duration"],
+        "video_width": info["width"],
+        "video_height": info["height"],
+        "video_bytes": info["bytes"],
+    }
+    updated = 0
+    with app.app_context():
+        for region in region_names():
+            with region_scope(region):
+                result = db.session.execute(update(Content).where(Content.video_url == url).values(**values))
+                db.session.commit()
+                updated += result.rowcount
+        db.session.remove()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HalalSpot MP4 fast-start check")
+    parser.add_argument("paths", nargs="*", help="video files (default: every video in static/videos)")
+    parser.add_argument("--check", action="store_true", help="only report, change nothing")
+    args = parser.parse_args()
+
+    app = create_app()
+    paths = args.paths
+    if not paths:
+        folder = os.path.join(app.static_folder, "videos")
+        paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+                 if name.lower().endswith(VIDEO_EXTENSIONS)]
+
+    slow = failed = 0
+    for path in paths:
+        try:
+            info = probe(path)
+        except (OSError, Mp4Error) as e:
+            print(f"{path}: cannot read ({e})")
+            failed += 1
+            continue
+
+        status = "fast start"
+        if not info["fast_start"]:
+            slow += 1
+            status = "NOT fast start"
+            if not args.check:
+                fast_start(path)
+                info = probe(path)
+                status = "rewritten with moov first"
+        print(f"{path}: {status}, {info['duration']}s, {info['width']}x{info['height']}, "
+              f"{info['bytes'] / 2**20:.1f} MiB")
+
+        url = video_url(app, path)
+        if url and not args.check:
+            print(f"  metadata saved on {record(app, url, info)} post(s) using {url}")
+
+    if args.check and slow:
+        print(f"{slow} video(s) need fast_start.py")
+    sys.exit(1 if failed or (args.check and slow) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+hours.py
+
+Manage opening hours (models/hours.py) from the command line:
+
+    python hours.py show "Crown Fried Chicken"
+    python hours.py set "Crown Fried Chicken" "mon-sun 11:00-03:00"
+    python hours.py closed "The Halal Guys" 2026-12-25 --note "Christmas"
+    python hours.py special "The Halal Guys" 2026-12-31 "10:00-01:00" --note "New Year's Eve"
+
+`set` replaces the restaurant's weekly hours; a close time at or before
+the open time runs past midnight. `closed` and `special` add a date
+exception. Writes go through the ORM, so every process picks them up
+with the next catalog version check.
+"""
+
+import argparse
+import datetime
+import sys
+
+from app import create_app
+from models.hours import RestaurantHours, RestaurantHoursException, format_minute
+from models.restaurant import Restaurant
+from utils.db import db
+from utils.hours import hours_index, parse_minute, parse_schedule
+from utils.regions import region_scope
+
+
+def find_restaurant(name):
+    matches = Restaurant.query.filter(Restaurant.name.ilike(name)).all()
+    if len(matches) != 1:
+        print(f"{len(matches)} restaurants named {name!r}", file=sys.stderr)
+        sys.exit(1)
+    return matches[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HalalSpot opening hours")
+    parser.add_argument("action", choices=("show", "set", "closed", "special"))
+    parser.add_argument("restaurant", help="restaurant name (case-insensitive)")
+    parser.add_argument("args", nargs="*", help="schedule (set), date (closed), date and HH:MM-HH:MM (special)")
+    parser.add_argument("--note", help="reason for a date exception")
+    parser.add_argument("--region", help="region (default: the default region)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context(), region_scope(args.region or app.config["DEFAULT_REGION"]):
+        restaurant = find_restaurant(args.restaurant)
+        try:
+            if args.action == "set":
+                RestaurantHours.query.filter_by(restaurant_id=restaurant.id).delete()
+                for day, opens, closes in parse_schedule(" ".join(args.args)):
+                    db.session.add(RestaurantHours(restaurant_id=restaurant.id, day_of_week=day,
+                                                   open_minute=opens, close_minute=closes))
+            elif args.action in ("closed", "special"):
+                date = datetime.date.fromisoformat(args.args[0])
+                opens = closes = None
+                if args.action == "special":
+                    opens, closes = (parse_minute(t) for t in args.args[1].split("-"))
+                db.session.add(RestaurantHoursException(restaurant_id=restaurant.id, date=date,
+                                                        open_minute=opens, close_minute=closes,
+                                                        note=args.note))
+        except (ValueError, IndexError) as e:
+            parser.error(f"bad {args.action} arguments: {e}")
+        db.session.commit()
+
+        hours = hours_index.get()
+        print(restaurant.name)
+        for day, spans in hours.week_table(restaurant.id) or [("(no hours)", "")]:
+            print(f"  {day:<10} {spans}")
+        for date, by_restaurant in sorted(hours.exceptions.items()):
+            if restaurant.id in by_restaurant:
+                spans = by_restaurant[restaurant.id]
+                print(f"  {date}  " + (", ".join(f"{format_minute(o)}-{format_minute(c)}" for o, c in spans)
+                                       or "Closed"))
+        print(f"  open now: {hours.is_open(restaurant.id, hours.local_now())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+maintenance.py
+
+Housekeeping for the hot tables in halalyelp.db. Run one step, or `all`:
+
+    python maintenance.py archive [--comments-days 180] [--reviews-days 730]
+    python maintenance.py recount [--engagement]
+    python maintenance.py engagement          # roll up + retention (utils/engagement.py)
+    python maintenance.py analyze             # ANALYZE + PRAGMA optimize
+    python maintenance.py reindex
+    python maintenance.py vacuum
+    python maintenance.py all
+
+Every region's database is maintained in turn (or just --region).
+Archived comments and reviews go to a separate SQLite file per region
+(--archive, default halalyelp_archive.db; other regions get
+halalyelp_archive_<region>.db). Archived reviews no longer
+count towards ratings, and comments_count is recounted to the comments
+left in the live table. Each step prints its time and, where it applies,
+the rows moved and bytes reclaimed.
+
+VACUUM rewrites the whole file and blocks writers while it runs; run it
+at a quiet time. Everything else works in short chunks.
+"""
+
+import argparse
+import datetime
+import os
+import time
+
+from app import create_app
+from config import BASE_DIR
+from utils import maintenance
+from utils.engagement import compact
+from utils.regions import region_names, region_scope
+
+
+def step(name):
+    print(f"== {name}")
+    return time.perf_counter()
+
+
+def done(start, detail=""):
+    print(f"   {time.perf_counter() - start:.2f}s{'  ' + detail if detail else ''}")
+
+
+def archive_path(path, region, default_region):
+    if region == default_region:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{region}{ext}"
+
+
+def archive(args):
+    path = archive_path(args.archive, args.current_region, args.default_region)
+    start = step(f"archive into {path}")
+    archive_engine = maintenance.open_archive(path)
+    now = datetime.datetime.utcnow()
+    for kind, days in (("comments", args.comments_days), ("reviews", args.reviews_days)):
+        if days is None:
+            continue
+        cutoff = now - datetime.timedelta(days=days)
+        moved, parents = maintenance.archive_rows(kind, cutoff, archive_engine, args.chunk, args.pause)
+        print(f"   {kind}: moved {moved} rows older than {days} days")
+        if kind == "comments" and parents:
+            changed = maintenance.recount_comments(args.chunk, parents)
+            print(f"   comments_count updated on {changed} posts")
+    archive_engine.dispose()
+    done(start)
+
+
+def recount(args):
+    start = step("recount content counters")
+    print(f"   comments_count changed on {maintenance.recount_comments(args.chunk)} posts")
+    if args.engagement:
+        changed = maintenance.recount_engagement(args.chunk)
+        print(f"   likes/shares/saves changed on {changed} posts")
+    done(start)
+
+
+def engagement(args):
+    start = step("engagement rollups and retention")
+    summary = compact()
+    done(start, ", ".join(f"{key} {value}" for key, value in summary.items()))
+
+
+def pragma(statements):
+    def run(args):
+        for statement in statements:
+            start = step(statement)
+            seconds, reclaimed = maintenance.run_pragma(statement)
+            print(f"   {seconds:.2f}s  {reclaimed / 1024:.0f} KiB reclaimed")
+    return run
+
+
+COMMANDS = {
+    "archive": archive,
+    "recount": recount,
+    "engagement": engagement,
+    "analyze": pragma(["ANALYZE", "PRAGMA optimize"]),
+    "reindex": pragma(["REINDEX"]),
+    "vacuum": pragma(["VACUUM"]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HalalSpot database maintenance")
+    parser.add_argument("command", choices=list(COMMANDS) + ["all"])
+    parser.add_argument("--archive", default=os.environ.get("ARCHIVE_DATABASE_PATH")
+                        or os.path.join(BASE_DIR, "halalyelp_archive.db"),
+                        help="archive SQLite file")
+    parser.add_argument("--comments-days", type=int, default=180,
+                        help="archive comments older than this many days")
+    parser.add_argument("--reviews-days", type=int, default=None,
+                        help="archive reviews older than this many days (off by default)")
+    parser.add_argument("--engagement", action="store_true",
+                        help="recount: also rebuild likes/shares/saves from engagement events")
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per transaction")
+    parser.add_argument("--pause", type=float, default=0.0,
+                        help="seconds to sleep between chunks to let the app write")
+    parser.add_argument("--region", help="only this region (default: all regions)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        args.default_region = app.config["DEFAULT_REGION"]
+        regions = [args.region] if args.region else region_names()
+        for region in regions:
+            args.current_region = region
+            print(f"## region {region}")
+            with region_scope(region):
+                maintain(args)
+
+
+def maintain(args):
+    """Run the requested steps on the current region's database."""
+    if maintenance.database_path() is None:
+        print("Only SQLite file databases are supported.")
+        return
+    before = maintenance.database_stats()
+    counts = maintenance.table_counts()
+    print(f"{before['bytes'] / 1024:.0f} KiB, {before['free_bytes'] / 1024:.0f} KiB free; "
+          + ", ".join(f"{name} {count}" for name, count in counts.items()))
+
+    started = time.perf_counter()
+    names = ["engagement", "archive", "recount", "analyze", "vacuum"] if args.command == "all" else [args.command]
+    for name in names:
+        COMMANDS[name](args)
+
+    after = maintenance.database_stats()
+    print(f"Done in {time.perf_counter() - started:.2f}s: {after['bytes'] / 1024:.0f} KiB "
+          f"({(before['bytes'] - after['bytes']) / 1024:.0f} KiB reclaimed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+models/catalog_version.py
+
+Single-row version stamp for the restaurant catalog.
+Bumped in the same transaction as any restaurant insert/update/delete,
+so every process can tell when its in-memory catalog snapshot is stale.
+Each bump also logs which restaurants it touched (CatalogChange), so
+indexes can reload just those.
+"""
+
+import datetime
+from utils.db import db
+
+class CatalogVersion(db.Model):
+    __tablename__ = "catalog_version"
+
+    id = db.Column(db.Integer, primary_key=True)  # always 1
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+class CatalogChange(db.Model):
+    """One restaurant touched by one version bump; restaurant_id NULL means reload everything."""
+    __tablename__ = "catalog_change"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, index=True)
+    table_name = db.Column(db.String(40), nullable=False)  # table written, e.g. "content"
+    restaurant_id = db.Column(db.Integer)
@@ -20,6 +20,12 @@ class Content(db.Model):
     description = db.Column(db.Text)
     image_url = db.Column(db.String(255))
     video_url = db.Column(db.String(255), nullable=True)  # For future video support
+
+    # Video metadata, read from the MP4 boxes by fast_start.py
+    video_duration = db.Column(db.Float, nullable=True)  # seconds
+    video_width = db.Column(db.Integer, nullable=True)
+    video_height = db.Column(db.Integer, nullable=True)
+    video_bytes = db.Column(db.Integer, nullable=True)
     
     # Engagement metrics
     likes_count = db.Column(db.Integer, default=0)
@@ -43,6 +49,10 @@ class Content(db.Model):
             "description": self.description,
             "image_url": self.image_url,
             "video_url": self.video_url,
+            "video_duration": self.video_duration,
+            "video_width": self.video_width,
+            "video_height": self.video_height,
+            "video_bytes": self.video_bytes,
             "likes_count": self.likes_count,
             "comments_count": self.comments_count,
             "shares_count": self.shares_count,
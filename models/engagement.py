@@ -0,0 +1,49 @@
+"""
+models/engagement.py
+
+Engagement analytics for FYP content.
+- EngagementEvent: append-only raw events (one per like/share/save/...)
+- EngagementRollup: hourly and daily sums per content and metric,
+  produced by the compaction job in utils/engagement.py
+- EngagementWatermark: how far raw events have been rolled up
+"""
+
+import datetime
+from utils.db import db
+
+class EngagementEvent(db.Model):
+    __tablename__ = "engagement_event"
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id'), nullable=False)
+    metric = db.Column(db.String(20), nullable=False)  # likes, comments, shares, saves, orders
+    delta = db.Column(db.Integer, nullable=False, default=1)  # -1 for unlike/unsave
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
+
+class EngagementRollup(db.Model):
+    __tablename__ = "engagement_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("content_id", "metric", "granularity", "bucket_start"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_id = db.Column(db.Integer, db.ForeignKey('content.id'), nullable=False)
+    metric = db.Column(db.String(20), nullable=False)
+    granularity = db.Column(db.String(10), nullable=False)  # "hour" or "day"
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "content_id": self.content_id,
+            "metric": self.metric,
+            "granularity": self.granularity,
+            "bucket_start": self.bucket_start.isoformat() if self.bucket_start else None,
+            "count": self.count
+        }
+
+class EngagementWatermark(db.Model):
+    __tablename__ = "engagement_watermark"
+
+    id = db.Column(db.Integer, primary_key=True)  # always 1
+    rolled_until = db.Column(db.DateTime, nullable=False)  # events before this are in the rollups
@@ -0,0 +1,57 @@
+"""
+models/hours.py
+
+Weekly opening hours of restaurants, plus date exceptions (holidays,
+closures, special hours). Times are minutes after local midnight in the
+region's timezone; a span whose close is at or before its open runs past
+midnight into the next day (e.g. 18:00-03:00).
+"""
+
+from utils.db import db
+
+
+def format_minute(minute):
+    """Minutes after midnight -> "HH:MM" (1440 -> "24:00")."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class RestaurantHours(db.Model):
+    __tablename__ = "restaurant_hours"
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False, index=True)
+    day_of_week = db.Column(db.Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    open_minute = db.Column(db.Integer, nullable=False)
+    close_minute = db.Column(db.Integer, nullable=False)  # <= open_minute: closes the next day
+
+    def to_dict(self):
+        return {
+            "restaurant_id": self.restaurant_id,
+            "day_of_week": self.day_of_week,
+            "opens": format_minute(self.open_minute),
+            "closes": format_minute(self.close_minute),
+        }
+
+
+class RestaurantHoursException(db.Model):
+    __tablename__ = "restaurant_hours_exception"
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    # Both null: closed all day. Otherwise replaces that day's weekly hours
+    # (several rows on one date give several spans)
+    open_minute = db.Column(db.Integer, nullable=True)
+    close_minute = db.Column(db.Integer, nullable=True)
+    note = db.Column(db.String(255), nullable=True)  # e.g. "Eid al-Fitr"
+
+    def to_dict(self):
+        closed = self.open_minute is None or self.close_minute is None
+        return {
+            "restaurant_id": self.restaurant_id,
+            "date": self.date.isoformat() if self.date else None,
+            "closed": closed,
+            "opens": None if closed else format_minute(self.open_minute),
+            "closes": None if closed else format_minute(self.close_minute),
+            "note": self.note,
+        }
@@ -0,0 +1,66 @@
+"""
+prerender.py
+
+Full rebuild of the pre-rendered pages (see utils/prerender.py), spread
+over one process per core:
+
+    python prerender.py [--region philadelphia] [--workers 4]
+
+Each process builds its own app and renders its share of the pages.
+"""
+
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from app import create_app
+from utils.prerender import render_page, site_paths
+from utils.regions import region_names
+
+_app = None
+
+
+def _init_worker():
+    global _app
+    _app = create_app()
+
+
+def _render_chunk(region, paths):
+    client = _app.test_client()
+    return Counter(render_page(_app, region, path, client) for path in paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render restaurant, home and map pages")
+    parser.add_argument("--region", help="only this region (default: all regions)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=50, help="pages per task")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        regions = [args.region] if args.region else region_names()
+    tasks = [
+        (region, paths[i:i + args.chunk])
+        for region in regions
+        for paths in [site_paths(app, region)]
+        for i in range(0, len(paths), args.chunk)
+    ]
+
+    start = time.perf_counter()
+    totals = Counter()
+    if tasks:
+        task_regions, chunks = zip(*tasks)
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            for counts in pool.map(_render_chunk, task_regions, chunks):
+                totals.update(counts)
+    pages = sum(totals.values())
+    seconds = time.perf_counter() - start
+    print(f"Rendered {pages} pages into {app.config['PRERENDER_DIR']} in {seconds:.2f}s "
+          f"with {args.workers} workers ({dict(totals)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+profile_token.py
+
+Prints a signed token that turns on profiling for one or more requests
+(see utils/profiling.py). The server must run with PROFILE_ENABLED=1 and
+the same SECRET_KEY.
+
+    python profile_token.py [cprofile|sampler]
+    curl -H "X-Profile: <token>" https://.../reviews
+    # or https://.../reviews?_profile=<token>
+"""
+
+import sys
+
+from app import create_app
+from utils.profiling import make_token
+
+mode = sys.argv[1] if len(sys.argv) > 1 else "cprofile"
+print(make_token(create_app(), mode))
@@ -0,0 +1,208 @@
+"""
+query_budgets.py
+
+SQL query budgets for every route. Seeds a fresh database at two sizes
+(10 and 1,000 restaurants, each with reviews, a post and comments),
+calls each route once to warm caches and once more while recording
+every SQL statement, then checks that
+- no route runs more statements than its budget, and
+- no route runs more statements on the large dataset than the small one
+  (a count that grows with the data is an N+1 query).
+
+Offending routes are reported with their statements, repeated ones
+first. Exits with status 1 if any budget is broken, so it can run in CI:
+
+    python query_budgets.py
+
+Each dataset is measured in its own process so the process-wide catalog
+snapshot and search index start empty. The catalog version is checked
+on every request (CATALOG_CHECK_INTERVAL = 0), and engagement events are
+never flushed mid-run, so the counts are the same on every run. The
+shared cache tier is off, so cached routes are measured at their
+database cost.
+Statements from background threads (index refreshes after writes) are
+not part of a route's cost and are not counted.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+SIZES = (10, 1000)
+REVIEWS_PER_RESTAURANT = 3
+COMMENTS_PER_POST = 2
+# /api/chat/batch is only served with a token
+BATCH_TOKEN = "budget-check"
+
+# (method, url, JSON body or {"form": ...}, maximum SQL statements)
+BUDGETS = [
+    ("GET", "/", None, 2),
+    ("GET", "/contact", None, 0),
+    ("GET", "/reviews", None, 2),
+    ("GET", "/find?query=halal", None, 1),
+    ("GET", "/restaurants", None, 1),
+    # Opening hours come from the in-memory interval index
+    ("GET", "/restaurants?open=late_night", None, 1),
+    ("GET", "/find?query=halal&open=now", None, 1),
+    ("GET", "/restaurants/1", None, 3),
+    ("GET", "/restaurants/search?query=halal", None, 1),
+    # Catalog version check, so restaurants written by other workers show up
+    ("GET", "/api/suggest?q=chi", None, 1),
+    ("GET", "/restaurants/map", None, 1),
+    ("GET", "/fyp", None, 3),
+    ("GET", "/api/fyp/content", None, 3),
+    ("GET", "/api/fyp/content/1/comments", None, 1),
+    ("GET", "/api/fyp/content/1/stats", None, 1),
+    ("GET", "/chatbot", None, 0),
+    ("POST", "/api/chat", {"message": "I'm craving chicken"}, 3),
+    ("POST", "/api/chat", {"message": "certified halal places"}, 3),
+    ("POST", "/api/chat", {"message": "top rated pakistani"}, 3),
+    ("POST", "/api/chat", {"message": "what's open late night"}, 3),
+    # Follow-up narrowing the previous answer: served from the conversation store
+    ("POST", "/api/chat", {"message": "only certified ones"}, 0),
+    ("GET", "/api/chat/metrics", None, 0),
+    # Frozen snapshot: a catalog version check and a rating query per region, none per message
+    ("POST", "/api/chat/batch", {"messages": ["I'm craving chicken", "top rated pakistani", "certified halal places"]}, 2),
+    ("POST", "/api/fyp/content/1/like", {"action": "like"}, 3),
+    ("POST", "/api/fyp/content/1/comment", {"comment_text": "Looks great"}, 3),
+    ("POST", "/api/fyp/content/1/share", {}, 3),
+    ("POST", "/api/fyp/content/1/save", {"action": "save"}, 3),
+    ("POST", "/restaurants/1/reviews/add", {"form": {"rating": "4", "comment": "Good"}}, 3),
+    ("POST", "/reviews", {"form": {"restaurant_id": "1", "review_text": "Good", "rating": "5"}}, 3),
+]
+
+
+def seed(db, restaurants):
+    """Insert `restaurants` restaurants with reviews, one post each and comments."""
+    from sqlalchemy import insert
+
+    from models.content import Content, ContentComment
+    from models.hours import RestaurantHours
+    from models.restaurant import Restaurant
+    from models.review import Review
+
+    cuisines = ["Middle Eastern", "Pakistani", "American", "Turkish", "Chicken"]
+    statuses = ["Halal", "Certified Halal", "Halal-Friendly"]
+    db.session.execute(insert(Restaurant), [
+        {"id": i, "name": f"Halal Spot {i}", "description": "Chicken over rice and kabobs",
+         "address": f"{i} Walnut St", "latitude": 39.95, "longitude": -75.19,
+         "cuisine": cuisines[i % len(cuisines)], "halal_status": statuses[i % len(statuses)],
+         "image_url": f"/static/images/{i}.jpg"}
+        for i in range(1, restaurants + 1)
+    ])
+    db.session.execute(insert(Review), [
+        {"restaurant_id": i, "rating": 1 + (i + j) % 5, "comment": "Tasty"}
+        for i in range(1, restaurants + 1) for j in range(REVIEWS_PER_RESTAURANT)
+    ])
+    db.session.execute(insert(Content), [
+        {"id": i, "restaurant_id": i, "title": f"Special {i}", "description": "Fresh platter",
+         "image_url": f"/static/images/{i}.jpg", "likes_count": 0, "comments_count": COMMENTS_PER_POST,
+         "shares_count": 0, "saves_count": 0, "is_sponsored": False}
+        for i in range(1, restaurants + 1)
+    ])
+    db.session.execute(insert(RestaurantHours), [
+        {"restaurant_id": i, "day_of_week": day, "open_minute": 11 * 60,
+         "close_minute": 2 * 60 if i % 2 else 22 * 60}
+        for i in range(1, restaurants + 1) for day in range(7)
+    ])
+    db.session.execute(insert(ContentComment), [
+        {"content_id": i, "username": "Anonymous", "comment_text": "Yum"}
+        for i in range(1, restaurants + 1) for _ in range(COMMENTS_PER_POST)
+    ])
+    db.session.commit()
+
+
+def call(client, method, url, body):
+    if method == "GET":
+        return client.get(url)
+    if body and "form" in body:
+        return client.post(url, data=body["form"])
+    return client.post(url, json=body, headers={"Authorization": f"Bearer {BATCH_TOKEN}"})
+
+
+def measure(restaurants):
+    """Statements run by each route on a fresh database, in BUDGETS order."""
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(directory, "budget.db")
+    os.environ["SHARED_CACHE_URL"] = "none"
+
+    from sqlalchemy import event
+
+    from app import create_app
+    from utils.db import db
+
+    app = create_app()
+    app.config.update(TESTING=True, CATALOG_CHECK_INTERVAL=0, CHAT_BATCH_TOKEN=BATCH_TOKEN,
+                      ENGAGEMENT_FLUSH_INTERVAL=float("inf"), ENGAGEMENT_BATCH_SIZE=10**9)
+    statements = None
+
+    request_thread = threading.get_ident()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statements is not None and threading.get_ident() == request_thread:
+            statements.append(" ".join(statement.split()))
+
+    with app.app_context():
+        seed(db, restaurants)
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", record)
+
+    client = app.test_client()
+    results = []
+    for method, url, body, _ in BUDGETS:
+        call(client, method, url, body)  # warm caches, indexes and connections
+        statements = []
+        response = call(client, method, url, body)
+        if response.status_code >= 400:
+            statements.append(f"-- HTTP {response.status_code}")
+        results.append(statements)
+        statements = None
+    return results
+
+
+def report(route, counts, statements):
+    method, url, body, budget = route
+    print(f"\nFAIL {method} {url}" + (f" {json.dumps(body)}" if body else ""))
+    print("  statements: " + ", ".join(f"{size} restaurants -> {counts[size]}" for size in SIZES)
+          + f" (budget {budget})")
+    for statement, repeats in Counter(statements).most_common():
+        print(f"  {repeats:>4}x {statement[:160]}")
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(int(sys.argv[2]))))
+        return 0
+
+    measured = {}
+    for size in SIZES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure", str(size)],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        measured[size] = json.loads(output.strip().splitlines()[-1])
+
+    failures = 0
+    for i, route in enumerate(BUDGETS):
+        method, url, _, budget = route
+        counts = {size: len(measured[size][i]) for size in SIZES}
+        over = max(counts.values()) > budget
+        grows = counts[SIZES[-1]] > counts[SIZES[0]]
+        failed = any(s.startswith("-- HTTP") for size in SIZES for s in measured[size][i])
+        if over or grows or failed:
+            failures += 1
+            report(route, counts, measured[SIZES[-1]][i])
+        else:
+            print(f"ok   {counts[SIZES[-1]]:>2}/{budget:<2} {method} {url}")
+
+    print(f"\n{len(BUDGETS) - failures}/{len(BUDGETS)} routes within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
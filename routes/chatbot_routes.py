@@ -5,13 +5,46 @@ AI Chatbot for helping users find restaurants.
 Processes natural language queries and provides intelligent search results.
 """
 
-from flask import Blueprint, request, jsonify, render_template
-from models.restaurant import Restaurant
-from models.review import Review
-from sqlalchemy import or_, and_
+import hmac
+import secrets
+
+from flask import Blueprint, abort, current_app, request, jsonify, render_template, session
+from utils.projection import json_response, rating_summaries
+from utils.search_index import restaurant_index
+from utils.catalog import catalog
+from utils.hours import hours_index
+from utils.conversations import conversation_store
+from utils.regions import current_region, region_for_text, region_scope
 
 chatbot_bp = Blueprint("chatbot", __name__)
 
+# Fields rendered on the chatbot result cards
+CARD_FIELDS = ("id", "name", "cuisine", "halal_status", "description", "address", "image_url")
+# Most keyword-ranked candidates kept when no other filter narrows the catalog
+MAX_CANDIDATES = 500
+# Session key holding the visitor's conversation id (utils/conversations.py)
+CONVERSATION_KEY = "chat_id"
+# Words that mark a follow-up as narrowing the previous answer
+REFINEMENT_WORDS = {"only", "just", "those", "these", "them", "ones", "which", "narrow", "filter"}
+# Criteria a refinement applies to the previous candidates
+REFINEMENT_FILTERS = ("cuisine", "halal_status", "rating_min", "open")
+# Phrases asking for places open at a time -> criteria["open"] (utils/hours.py)
+OPEN_PHRASES = {
+    "open now": "now", "open right now": "now", "still open": "now", "currently open": "now",
+    "open late": "late_night", "late night": "late_night", "late-night": "late_night",
+    "after midnight": "late_night",
+}
+# Words dropped from the keywords of an opening-hours question
+OPEN_WORDS = {word for phrase in OPEN_PHRASES for word in phrase.replace("-", " ").split()} | {
+    "what's", "whats", "any", "anything", "anywhere", "places", "spots"}
+# Halal, rating and hours phrases parse_query() turns into filters; a
+# message of nothing but these narrows the previous answer
+FILTER_PHRASES = sorted(
+    ["certified halal", "certified", "halal-friendly", "halal", "high rating", "best rated",
+     "top rated", "good rating", "well rated", "4 stars", "4 star", "5 stars", "5 star", *OPEN_PHRASES],
+    key=len, reverse=True,
+)
+
 @chatbot_bp.route("/chatbot")
 def chatbot_page():
     """Render the chatbot page."""
@@ -111,6 +144,8 @@ def parse_query(query):
         "halal_status": None,
         "rating_min": None,
         "location": None,
+        "region": None,  # region picked by a location keyword
+        "open": None,  # "now" or "late_night": only places open then
         "intent": "search",  # search, recommend, question, craving
         "food_items": []  # Specific food items mentioned
     }
@@ -150,12 +185,18 @@ def parse_query(query):
     elif "5 star" in query_lower or "5 stars" in query_lower:
         criteria["rating_min"] = 5.0
     
-    # Extract location keywords
-    locations = ["philadelphia", "philly", "west philly", "temple", "center city"]
-    for loc in locations:
-        if loc in query_lower:
-            criteria["location"] = loc
-            break
+    # Extract location keywords (configured per region in REGIONS)
+    criteria["region"], criteria["location"] = region_for_text(query_lower)
+    
+    # Opening hours ("open now", "late night"); the phrase is not a keyword
+    keyword_text = query_lower
+    for phrase, when in OPEN_PHRASES.items():
+        if phrase in query_lower:
+            criteria["open"] = criteria["open"] or when
+    if criteria["open"]:
+        keyword_text = " ".join(
+            w for w in query_lower.replace("-", " ").split() if w.rstrip(".,!?") not in OPEN_WORDS
+        )
     
     # Determine intent (if not already set to craving)
     if criteria["intent"] != "craving":
@@ -173,7 +214,7 @@ def parse_query(query):
                   "am", "craving", "feel", "like", "some", "get", "give"]
     
     # Extract meaningful words
-    words = query_lower.split()
+    words = keyword_text.split()
     meaningful_words = [w.rstrip('.,!?') for w in words if w not in stop_words and len(w) > 2]
     
     # Add food-related words to keywords if not already added
@@ -194,61 +235,137 @@ def parse_query(query):
     
     return criteria
 
-def search_restaurants(criteria):
+def search_restaurants(criteria, snapshot=None, index=None, ratings=None, hours=None):
     """
     Search restaurants based on parsed criteria.
+    Keywords are ranked with the TF-IDF index (best match first);
+    cuisine, halal status, opening hours and rating are applied as filters.
+    `snapshot`, `index`, `ratings` and `hours` pin a catalog snapshot, TF-IDF
+    index, rating summaries and hours snapshot (batch evaluation); by default
+    the live ones are used.
     Returns list of matching restaurants.
     """
-    query = Restaurant.query
+    if snapshot is None:
+        snapshot = catalog.get()
+    if index is None:
+        index = restaurant_index
+    positions = None  # None means every restaurant
     
     # Filter by cuisine
     if criteria["cuisine"]:
-        query = query.filter(
-            or_(
-                Restaurant.cuisine.ilike(f"%{criteria['cuisine']}%"),
-                Restaurant.description.ilike(f"%{criteria['cuisine']}%")
-            )
-        )
+        positions = snapshot.search(criteria["cuisine"], ("cuisine", "description"))
     
     # Filter by halal status
     if criteria["halal_status"]:
-        query = query.filter(Restaurant.halal_status == criteria["halal_status"])
+        positions = snapshot.where(positions, "halal_status", criteria["halal_status"])
+    
+    # Filter by opening hours (interval index, no scan)
+    if criteria.get("open"):
+        hours = hours if hours is not None else hours_index.get()
+        positions = hours.filter_positions(snapshot, positions, criteria["open"])
     
-    # Filter by keywords (name, description) - use OR logic for more flexible matching
+    # Rank by keywords (name, cuisine, description and content posts)
     if criteria["keywords"]:
-        keyword_filters = []
-        for keyword in criteria["keywords"]:
-            keyword_filters.append(
-                or_(
-                    Restaurant.name.ilike(f"%{keyword}%"),
-                    Restaurant.description.ilike(f"%{keyword}%"),
-                    Restaurant.cuisine.ilike(f"%{keyword}%")
-                )
-            )
-        # Use OR between keywords (any match is good) for more flexible results
-        if keyword_filters:
-            query = query.filter(or_(*keyword_filters))
-    
-    restaurants = query.all()
+        # With other filters applied, rank every hit so none are cut off
+        limit = MAX_CANDIDATES if positions is None else None
+        ranked = index.search(criteria["keywords"], limit=limit)
+        ranked_positions = snapshot.positions_for([restaurant_id for restaurant_id, _ in ranked])
+        if positions is not None:
+            allowed = set(positions)
+            ranked_positions = [i for i in ranked_positions if i in allowed]
+        positions = ranked_positions
+    
+    restaurants = snapshot.rows(positions, CARD_FIELDS)
     
     # Filter by rating if specified
-    if criteria["rating_min"]:
-        filtered = []
-        for r in restaurants:
-            reviews = Review.query.filter_by(restaurant_id=r.id).all()
-            if reviews:
-                avg_rating = sum([rev.rating for rev in reviews]) / len(reviews)
-                if avg_rating >= criteria["rating_min"]:
-                    filtered.append(r)
-        restaurants = filtered
+    if criteria["rating_min"] and restaurants:
+        if ratings is None:
+            ratings = rating_summaries([r.id for r in restaurants])
+        restaurants = [
+            r for r in restaurants
+            if r.id in ratings and ratings[r.id][0] >= criteria["rating_min"]
+        ]
     
     return restaurants
 
-def generate_response(restaurants, criteria, original_query):
+def refinement_filters(criteria):
+    """Filters of a parsed message that can narrow a previous answer."""
+    filters = {key: criteria[key] for key in REFINEMENT_FILTERS if criteria[key]}
+    # Every listing is halal, so "halal" picks a status, not a cuisine
+    if filters.get("cuisine") == "halal":
+        del filters["cuisine"]
+    return filters
+
+def is_refinement(message, criteria):
+    """
+    True when a follow-up only narrows the previous answer ("only
+    certified ones", "top rated") instead of asking for something new.
+    """
+    filters = refinement_filters(criteria)
+    # Food words other than the cuisine itself ask for new dishes
+    if not filters or set(criteria["food_items"]) - {criteria["cuisine"]}:
+        return False
+    words = {w.strip(".,!?") for w in message.lower().split()}
+    if words & REFINEMENT_WORDS:
+        return True
+    # A bare "top rated" or "certified halal" narrows; "certified halal
+    # places" or a bare cuisine starts over
+    rest = message.lower()
+    for phrase in FILTER_PHRASES:
+        rest = rest.replace(phrase, " ")
+    return not rest.strip(" .,!?")
+
+def merge_criteria(previous, refinement):
+    """Previous criteria with the refinement's filters applied on top."""
+    merged = dict(previous)
+    merged.update(refinement_filters(refinement))
+    return merged
+
+def refine_candidates(state, refinement):
+    """
+    Filter the previous answer's restaurants in memory: cuisine and halal
+    status from the catalog snapshot, rating from the cached summaries.
+    """
+    filters = refinement_filters(refinement)
+    # peek() skips the periodic version query; ids that left the catalog drop out
+    snapshot = catalog.peek() or catalog.get()
+    positions = snapshot.positions_for(state["ids"])
+    
+    if "cuisine" in filters:
+        allowed = set(snapshot.search(filters["cuisine"], ("cuisine", "description")))
+        positions = [i for i in positions if i in allowed]
+    
+    if "halal_status" in filters:
+        positions = snapshot.where(positions, "halal_status", filters["halal_status"])
+    
+    if "open" in filters:
+        positions = hours_index.get().filter_positions(snapshot, positions, filters["open"])
+    
+    restaurants = snapshot.rows(positions, CARD_FIELDS)
+    
+    if "rating_min" in filters:
+        ratings = state["ratings"]
+        restaurants = [
+            r for r in restaurants
+            if r.id in ratings and ratings[r.id][0] >= filters["rating_min"]
+        ]
+    
+    return restaurants
+
+def generate_response(restaurants, criteria, original_query, ratings=None):
     """
     Generate a natural language response based on search results.
+    `ratings` are rating summaries already loaded for these restaurants.
     """
+    open_note = {"now": " open now", "late_night": " open late tonight"}.get(criteria.get("open"), "")
     if not restaurants:
+        if open_note:
+            return {
+                "message": f"I couldn't find any restaurants{open_note} matching your search. "
+                           "Try asking without the time, or for another cuisine or dish.",
+                "restaurants": [],
+                "count": 0
+            }
         # More helpful error message based on intent
         if criteria["intent"] == "craving" and criteria["food_items"]:
             food = criteria["food_items"][0]
@@ -272,12 +389,12 @@ def generate_response(restaurants, criteria, original_query):
         }
     
     # Format restaurant data
+    if ratings is None:
+        ratings = rating_summaries([r.id for r in restaurants])
+    region = current_region()
     restaurants_data = []
     for r in restaurants:
-        reviews = Review.query.filter_by(restaurant_id=r.id).all()
-        avg_rating = None
-        if reviews:
-            avg_rating = round(sum([rev.rating for rev in reviews]) / len(reviews), 1)
+        avg_rating, review_count = ratings.get(r.id, (None, 0))
         
         restaurants_data.append({
             "id": r.id,
@@ -287,18 +404,19 @@ def generate_response(restaurants, criteria, original_query):
             "description": r.description,
             "address": r.address,
             "image_url": r.image_url,
-            "avg_rating": avg_rating,
-            "review_count": len(reviews)
+            "avg_rating": round(avg_rating, 1) if avg_rating is not None else None,
+            "review_count": review_count,
+            "region": region
         })
     
     # Generate contextual message based on intent
     if criteria["intent"] == "craving" and criteria["food_items"]:
         food = criteria["food_items"][0]
-        message = f"Great choice! I found {len(restaurants_data)} restaurant{'s' if len(restaurants_data) != 1 else ''} that serve {food} or similar dishes:\n\n"
+        message = f"Great choice! I found {len(restaurants_data)} restaurant{'s' if len(restaurants_data) != 1 else ''} that serve {food} or similar dishes{open_note}:\n\n"
     elif criteria["intent"] == "recommend":
-        message = f"I found {len(restaurants_data)} restaurant{'s' if len(restaurants_data) != 1 else ''} that might interest you:\n\n"
+        message = f"I found {len(restaurants_data)} restaurant{'s' if len(restaurants_data) != 1 else ''} that might interest you{open_note}:\n\n"
     else:
-        message = f"I found {len(restaurants_data)} restaurant{'s' if len(restaurants_data) != 1 else ''} matching your search:\n\n"
+        message = f"I found {len(restaurants_data)} restaurant{'s' if len(restaurants_data) != 1 else ''} matching your search{open_note}:\n\n"
     
     # Add top recommendations
     if len(restaurants_data) <= 3:
@@ -348,7 +466,8 @@ def chat():
                        "• Find restaurants by cuisine (e.g., 'Find Middle Eastern restaurants')\n"
                        "• Search by halal status (e.g., 'Show me certified halal places')\n"
                        "• Get recommendations (e.g., 'Recommend a good Pakistani restaurant')\n"
-                       "• Find highly rated restaurants (e.g., 'Show me top rated halal restaurants')\n\n"
+                       "• Find highly rated restaurants (e.g., 'Show me top rated halal restaurants')\n"
+                       "• Find places open now or late (e.g., 'What's open late night?')\n\n"
                        "What would you like to search for?",
             "restaurants": [],
             "count": 0
@@ -357,10 +476,84 @@ def chat():
     # Parse the query
     criteria = parse_query(user_message)
     
-    # Search restaurants
-    restaurants = search_restaurants(criteria)
+    store = conversation_store()
+    conversation_id = session.get(CONVERSATION_KEY)
+    state = store.get(conversation_id)
+    refining = is_refinement(user_message, criteria)
+    refined = refining and state is not None and criteria["region"] in (None, state["region"])
+    
+    if refined:
+        # Narrow the previous answer in memory, without a database round trip
+        region = state["region"]
+        refinement = criteria
+        criteria = merge_criteria(state["criteria"], refinement)
+        ratings = state["ratings"]
+        with region_scope(region):
+            restaurants = refine_candidates(state, refinement)
+            response = generate_response(restaurants, criteria, user_message, ratings)
+        store.record("refinements_cached")
+    else:
+        # Search restaurants and generate the response; a location keyword
+        # searches that region instead of the visitor's
+        store.record("refinement_misses" if refining and state is None else "searches")
+        region = criteria["region"] or current_region()
+        with region_scope(region):
+            restaurants = search_restaurants(criteria)
+            ratings = rating_summaries([r.id for r in restaurants]) if restaurants else {}
+            response = generate_response(restaurants, criteria, user_message, ratings)
     
-    # Generate response
-    response = generate_response(restaurants, criteria, user_message)
+    # Remember the answer for follow-ups; a refinement that matched nothing
+    # keeps the previous one so the visitor can try another
+    if restaurants or not refined:
+        if conversation_id is None:
+            conversation_id = session[CONVERSATION_KEY] = secrets.token_urlsafe(16)
+        store.save(conversation_id, {
+            "criteria": criteria,
+            "region": region,
+            "ids": [r.id for r in restaurants],
+            "ratings": {r.id: ratings[r.id] for r in restaurants if r.id in ratings},
+        })
     
+    response["refined"] = refined
     return jsonify(response)
+
+@chatbot_bp.route("/api/chat/metrics")
+def chat_metrics():
+    """Conversation store counters: searches, refinements served from memory, misses."""
+    return jsonify(conversation_store().stats())
+
+@chatbot_bp.route("/api/chat/batch", methods=["POST"])
+def chat_batch():
+    """
+    Evaluate many messages against one frozen catalog/rating snapshot.
+    Body: {"messages": [...], "region": optional slug}.
+    Returns per-message results and latency/throughput totals.
+    Only available when CHAT_BATCH_TOKEN is set, to callers sending it.
+    Runs inline: forking a process pool from a threaded worker could
+    copy locks held by other requests (chat_eval.py uses the pool).
+    """
+    from utils.chat_eval import evaluate_batch
+
+    token = current_app.config.get("CHAT_BATCH_TOKEN")
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"success": False, "error": "Missing or wrong batch token"}), 401
+
+    data = request.get_json(silent=True) or {}
+    messages = data.get("messages")
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        return jsonify({"success": False, "error": "messages must be a list of strings"}), 400
+    limit = current_app.config.get("CHAT_BATCH_MAX", 500)
+    if len(messages) > limit:
+        return jsonify({"success": False, "error": f"At most {limit} messages per batch"}), 400
+    region = data.get("region")
+    if region is not None and region not in current_app.config["REGIONS"]:
+        return jsonify({"success": False, "error": f"Unknown region: {region}"}), 400
+
+    results, summary = evaluate_batch(
+        [m.strip() for m in messages],
+        region=region or current_region(),
+        workers=1,
+    )
+    return json_response({"results": results, "summary": summary})
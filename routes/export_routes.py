@@ -0,0 +1,59 @@
+"""
+routes/export_routes.py
+
+Streaming bulk exports for the data team (see utils/export.py):
+
+    GET /api/export/restaurants
+    GET /api/export/reviews?format=csv&since=2025-01-01
+    GET /api/export/content?since=2025-06-01T12:00:00
+
+NDJSON by default, CSV with format=csv. The body is gzipped on the fly
+when the client accepts gzip (gzip=0 turns it off).
+
+Exports are off unless EXPORT_TOKEN is set; callers then send
+"Authorization: Bearer <token>".
+"""
+
+import hmac
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+
+from utils.export import EXPORTS, FORMATS, export_stream, parse_since
+from utils.regions import current_region
+
+export_bp = Blueprint("export", __name__)
+
+
+@export_bp.route("/api/export/<table>")
+def export(table):
+    """Stream every row of a table (reviews/content: optionally since a timestamp)."""
+    token = current_app.config.get("EXPORT_TOKEN")
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"success": False, "error": "Missing or wrong export token"}), 401
+    if table not in EXPORTS:
+        return jsonify({"success": False, "error": f"Unknown table: {table}"}), 404
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        return jsonify({"success": False, "error": "format must be ndjson or csv"}), 400
+    try:
+        since = parse_since(request.args.get("since"))
+    except ValueError:
+        return jsonify({"success": False, "error": "since must be an ISO date or timestamp"}), 400
+    if since is not None and EXPORTS[table][2] is None:
+        return jsonify({"success": False, "error": f"{table} has no timestamp for since"}), 400
+
+    compress = request.args.get("gzip") != "0" and request.accept_encodings["gzip"] > 0
+    body = export_stream(
+        table, fmt, since,
+        region=current_region(),
+        batch_size=current_app.config.get("EXPORT_BATCH_SIZE", 1000),
+        compress=compress,
+    )
+    response = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{table}.{fmt}"'
+    response.vary.add("Accept-Encoding")
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
@@ -4,43 +4,132 @@ routes/fyp_routes.py
 Handles FYP (For You Page) routes for food content feed.
 """
 
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, session, current_app
 from models.content import Content, ContentComment
 from models.restaurant import Restaurant
 from utils.db import db
-import json
+from utils.projection import project, rows_to_dicts, json_response
+from utils.engagement import GRANULARITIES, METRICS, record_event, rollup_series
+from utils.bloom import RotatingBloomFilter
+from utils.live_counts import live_hub, load_counts, stream_limit
+from utils.regions import current_region
+from utils.shared_cache import cached
+import datetime
 
 fyp_bp = Blueprint("fyp", __name__)
 
+# Content fields shown in the feed, and the restaurant fields attached to each post
+FEED_FIELDS = ("id", "restaurant_id", "creator_name", "is_sponsored", "title",
+               "description", "image_url", "video_url", "video_duration",
+               "video_width", "video_height", "video_bytes", "likes_count",
+               "comments_count", "shares_count", "saves_count", "created_at",
+               "order_url")
+FEED_RESTAURANT_FIELDS = ("id", "name", "image_url", "cuisine", "halal_status")
+# Session key holding the serialized seen-content bloom filter
+SEEN_SESSION_KEY = "fyp_seen"
+
+def load_feed():
+    """
+    Load feed posts newest first with their restaurant attached.
+    Shared by all workers until a post or restaurant changes.
+    """
+    return cached("feed", query_feed, tags=("content", "restaurant"))
+
+def query_feed():
+    """Feed posts with their restaurant, in two queries regardless of the number of posts."""
+    contents_data = rows_to_dicts(
+        project(Content, FEED_FIELDS, order_by=Content.created_at.desc())
+    )
+
+    restaurant_ids = {c["restaurant_id"] for c in contents_data if c["restaurant_id"]}
+    restaurants = {}
+    if restaurant_ids:
+        rows = project(Restaurant, FEED_RESTAURANT_FIELDS, Restaurant.id.in_(restaurant_ids))
+        restaurants = {r.id: r._asdict() for r in rows}
+
+    for content in contents_data:
+        restaurant = restaurants.get(content["restaurant_id"])
+        if restaurant:
+            content["restaurant"] = restaurant
+    return contents_data
+
+def load_seen():
+    """The session's seen-content filter (empty for a new session)."""
+    return RotatingBloomFilter.loads(
+        session.get(SEEN_SESSION_KEY),
+        capacity=current_app.config.get("FYP_SEEN_CAPACITY", 200),
+        error_rate=current_app.config.get("FYP_SEEN_ERROR_RATE", 0.01),
+    )
+
+def assemble_feed(contents_data, limit=None, include_seen=True):
+    """
+    Order posts the session has not seen first, optionally drop seen ones,
+    cut to `limit` and mark the returned posts as seen.
+    A false positive only moves an unseen post behind the seen ones.
+    """
+    seen = load_seen()
+    unseen = [c for c in contents_data if c["id"] not in seen]
+    page = unseen
+    if include_seen:
+        page = unseen + [c for c in contents_data if c["id"] in seen]
+    if limit is not None:
+        page = page[:limit]
+
+    for content in page:
+        seen.add(content["id"])
+    session[SEEN_SESSION_KEY] = seen.dumps()
+    return page
+
 @fyp_bp.route("/fyp")
 def fyp_page():
     """Main FYP page"""
-    contents = Content.query.order_by(Content.created_at.desc()).all()
-    contents_data = [c.to_dict() for c in contents]
-    
-    # Attach restaurant info if available
-    for content in contents_data:
-        if content["restaurant_id"]:
-            restaurant = Restaurant.query.get(content["restaurant_id"])
-            if restaurant:
-                content["restaurant"] = restaurant.to_dict()
-    
-    return render_template("fyp.html", contents=contents_data)
+    return render_template(
+        "fyp.html",
+        contents=assemble_feed(load_feed()),
+        preload_max_bytes=current_app.config.get("FYP_PRELOAD_MAX_BYTES", 4 * 1024 * 1024),
+    )
 
 @fyp_bp.route("/api/fyp/content", methods=["GET"])
 def get_content():
-    """API endpoint to get all content"""
-    contents = Content.query.order_by(Content.created_at.desc()).all()
-    contents_data = [c.to_dict() for c in contents]
-    
-    # Attach restaurant info
-    for content in contents_data:
-        if content["restaurant_id"]:
-            restaurant = Restaurant.query.get(content["restaurant_id"])
-            if restaurant:
-                content["restaurant"] = restaurant.to_dict()
-    
-    return jsonify(contents_data)
+    """
+    API endpoint to get content, unseen posts first.
+    Query params: limit (int), include_seen (0/1, default 1).
+    """
+    limit = request.args.get("limit", type=int)
+    include_seen = request.args.get("include_seen", "1") != "0"
+    return json_response(assemble_feed(load_feed(), limit, include_seen))
+
+@fyp_bp.route("/api/fyp/live")
+def live_counts():
+    """
+    Server-Sent Events stream of engagement counts for the posts on the page.
+    Query params: ids (comma-separated content ids), poll=1 for one JSON
+    snapshot of the counts instead of a stream.
+    Sends the current counts, then only counters that changed, at most once
+    per tick per post (see utils/live_counts.py). Returns 503 when this
+    worker has no room for another stream; the page then polls.
+    """
+    try:
+        ids = {int(part) for part in request.args.get("ids", "").split(",") if part.strip()}
+    except ValueError:
+        return jsonify({"success": False, "error": "ids must be comma-separated integers"}), 400
+    max_ids = current_app.config.get("LIVE_MAX_IDS", 50)
+    if not ids or len(ids) > max_ids:
+        return jsonify({"success": False, "error": f"Give between 1 and {max_ids} ids"}), 400
+    if request.args.get("poll") == "1":
+        counts = load_counts(current_region(), ids)
+        return json_response([{"id": content_id, **values} for content_id, values in counts.items()])
+
+    subscribed = live_hub.subscribe(current_region(), ids, stream_limit(current_app))
+    if subscribed is None:
+        return jsonify({"success": False, "error": "Too many live viewers, poll instead"}), 503
+    response = Response(live_hub.stream(*subscribed), mimetype="text/event-stream")
+    # The stream's finally only runs once the body is iterated; a HEAD
+    # request or a client gone before the first byte would keep the slot
+    response.call_on_close(lambda: live_hub.unsubscribe(subscribed[0]))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # no proxy buffering
+    return response
 
 @fyp_bp.route("/api/fyp/content/<int:content_id>/like", methods=["POST"])
 def like_content(content_id):
@@ -49,12 +138,17 @@ def like_content(content_id):
     data = request.get_json() or {}
     action = data.get("action", "toggle")  # "like" or "unlike"
     
+    delta = 0
     if action == "like":
         content.likes_count += 1
+        delta = 1
     elif action == "unlike" and content.likes_count > 0:
         content.likes_count -= 1
+        delta = -1
     
     db.session.commit()
+    if delta:
+        record_event(content_id, "likes", delta)
     return jsonify({"success": True, "likes_count": content.likes_count})
 
 @fyp_bp.route("/api/fyp/content/<int:content_id>/comment", methods=["POST"])
@@ -76,13 +170,17 @@ def add_comment(content_id):
     )
     db.session.add(comment)
     content.comments_count += 1
-    db.session.commit()
-    
-    return jsonify({
+    # Build the payload before commit expires (and would reload) both rows
+    db.session.flush()
+    payload = {
         "success": True,
         "comment": comment.to_dict(),
         "comments_count": content.comments_count
-    })
+    }
+    db.session.commit()
+    record_event(content_id, "comments")
+    
+    return jsonify(payload)
 
 @fyp_bp.route("/api/fyp/content/<int:content_id>/comments", methods=["GET"])
 def get_comments(content_id):
@@ -96,6 +194,7 @@ def share_content(content_id):
     content = Content.query.get_or_404(content_id)
     content.shares_count += 1
     db.session.commit()
+    record_event(content_id, "shares")
     return jsonify({"success": True, "shares_count": content.shares_count})
 
 @fyp_bp.route("/api/fyp/content/<int:content_id>/save", methods=["POST"])
@@ -105,12 +204,17 @@ def save_content(content_id):
     data = request.get_json() or {}
     action = data.get("action", "toggle")
     
+    delta = 0
     if action == "save":
         content.saves_count += 1
+        delta = 1
     elif action == "unsave" and content.saves_count > 0:
         content.saves_count -= 1
+        delta = -1
     
     db.session.commit()
+    if delta:
+        record_event(content_id, "saves", delta)
     return jsonify({"success": True, "saves_count": content.saves_count})
 
 @fyp_bp.route("/api/fyp/content/<int:content_id>/order", methods=["POST"])
@@ -123,6 +227,7 @@ def order_from_content(content_id):
         if restaurant:
             # In a real app, this would integrate with ordering system
             # For now, return restaurant info
+            record_event(content_id, "orders")
             return jsonify({
                 "success": True,
                 "restaurant_id": restaurant.id,
@@ -132,3 +237,31 @@ def order_from_content(content_id):
     
     return jsonify({"success": False, "error": "No restaurant associated"}), 400
 
+def _parse_time(value):
+    """Parse an ISO timestamp query parameter (None if missing)."""
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+@fyp_bp.route("/api/fyp/content/<int:content_id>/stats", methods=["GET"])
+def content_stats(content_id):
+    """
+    Engagement time series for a content post, served from the rollups.
+    Query params: granularity (hour|day), metric (repeatable), since, until (ISO).
+    """
+    granularity = request.args.get("granularity", "hour")
+    metrics = request.args.getlist("metric") or list(METRICS)
+    if granularity not in GRANULARITIES or any(m not in METRICS for m in metrics):
+        return jsonify({"success": False, "error": "Invalid granularity or metric"}), 400
+    try:
+        since = _parse_time(request.args.get("since"))
+        until = _parse_time(request.args.get("until"))
+    except ValueError:
+        return jsonify({"success": False, "error": "since/until must be ISO timestamps"}), 400
+
+    series = rollup_series(content_id, granularity, since, until, metrics)
+    return jsonify({
+        "content_id": content_id,
+        "granularity": granularity,
+        "series": series
+    })
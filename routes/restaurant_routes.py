@@ -6,22 +6,49 @@ Handles views for:
 - search results
 - single restaurant details
 - map page
+- typeahead suggestions for the search box
+Listings take ?open=now or ?open=late_night to show only places open then.
 """
 
-from flask import Blueprint, request, render_template
+from flask import Blueprint, request, render_template, jsonify, url_for
 from models.restaurant import Restaurant
 from models.review import Review
 from models.content import Content
+from utils.projection import project, rows_to_dicts
+from utils.catalog import catalog
+from utils.hours import OPEN_FILTERS, hours_index
+from utils.regions import ALL_REGIONS, fan_out
+from utils.shared_cache import cached
+from utils.suggest import suggest_index
 
 restaurant_bp = Blueprint("restaurants", __name__)
 
+# Fields each view actually renders
+LIST_FIELDS = ("id", "name", "address", "cuisine", "halal_status", "image_url")
+MAP_FIELDS = ("id", "name", "address", "latitude", "longitude")
+PROFILE_REVIEW_FIELDS = ("rating", "comment", "date")
+PROFILE_CONTENT_FIELDS = ("id", "title", "description", "image_url", "video_url",
+                          "likes_count", "comments_count", "shares_count")
+# Completions returned by /api/suggest (default and most)
+SUGGEST_LIMIT = 8
+SUGGEST_MAX = 20
+
+def open_filter():
+    """The ?open= listing filter ("now", "late_night"), or None."""
+    value = request.args.get("open")
+    return value if value in OPEN_FILTERS else None
+
 @restaurant_bp.route("/restaurants")
 def list_restaurants():
     """
     Shows all restaurants. In a larger app you would paginate results.
     """
-    restaurants = Restaurant.query.all()
-    return render_template("search.html", restaurants=restaurants)
+    snapshot = catalog.get()
+    positions = None
+    if open_filter():
+        positions = hours_index.get().filter_positions(snapshot, None, open_filter())
+    restaurants = snapshot.rows(positions, LIST_FIELDS)
+    return render_template("search.html", restaurants=restaurants, open=open_filter())
 
 @restaurant_bp.route("/restaurants/<int:id>")
 def get_restaurant(id):
@@ -30,47 +57,90 @@ def get_restaurant(id):
     Loads the restaurant, its reviews, and associated content/videos.
     """
     restaurant = Restaurant.query.get_or_404(id)
-    # Fetch reviews associated with this restaurant
-    # Order by date descending (most recent first)
-    from sqlalchemy import desc
-    reviews = Review.query.filter_by(restaurant_id=id).order_by(desc(Review.date)).all()
-    # Fetch content/videos associated with this restaurant
-    contents = Content.query.filter_by(restaurant_id=id).order_by(Content.created_at.desc()).all()
-    contents_data = [c.to_dict() for c in contents]
+    # Reviews and content, shared by all workers until this restaurant's rows change
+    reviews, contents_data = cached(f"profile:{id}", lambda: load_profile(id), tags=(f"restaurant:{id}",))
     
     # Calculate average rating
     avg_rating = None
     if reviews:
-        avg_rating = round(sum([r.rating for r in reviews]) / len(reviews), 1)
+        avg_rating = round(sum([r["rating"] for r in reviews]) / len(reviews), 1)
+    
+    # Weekly hours from the in-memory hours snapshot (no query)
+    hours = hours_index.get().week_table(id)
     
     return render_template(
         "restaurant.html", 
         restaurant=restaurant, 
         reviews=reviews,
         contents=contents_data,
-        avg_rating=avg_rating
+        avg_rating=avg_rating,
+        hours=hours
     )
 
+def load_profile(id):
+    """(reviews, contents) of a restaurant page, as dicts."""
+    # Fetch reviews associated with this restaurant
+    # Order by date descending (most recent first)
+    from sqlalchemy import desc
+    reviews = project(Review, PROFILE_REVIEW_FIELDS, Review.restaurant_id == id,
+                      order_by=desc(Review.date))
+    # Fetch content/videos associated with this restaurant
+    contents = project(Content, PROFILE_CONTENT_FIELDS, Content.restaurant_id == id,
+                       order_by=Content.created_at.desc())
+    return rows_to_dicts(reviews), rows_to_dicts(contents)
+
 @restaurant_bp.route("/restaurants/search")
 def search_restaurants():
     """
     Basic search by name (case-insensitive contains).
     For production, use a proper full-text search or indexed fields.
+    ?region=all searches every region.
     """
     query = request.args.get("query", "")
-    if query:
-        results = Restaurant.query.filter(Restaurant.name.ilike(f"%{query}%")).all()
-    else:
+    when = open_filter()
+    if not query:
         results = []
-    return render_template("search.html", restaurants=results, query=query)
+    elif request.args.get("region") == ALL_REGIONS:
+        # Search every region's catalog in parallel
+        by_region = fan_out(lambda region: match_names(
+            catalog.for_region(region).get(), query, when and hours_index.for_region(region).get(), when
+        ))
+        results = [
+            dict(row._asdict(), region=region)
+            for region, rows in by_region.items() for row in rows
+        ]
+    else:
+        results = match_names(catalog.get(), query, when and hours_index.get(), when)
+    return render_template("search.html", restaurants=results, query=query, open=when)
+
+def match_names(snapshot, query, hours=None, when=None):
+    positions = snapshot.search(query, ("name",))
+    if when:
+        positions = hours.filter_positions(snapshot, positions, when)
+    return snapshot.rows(positions, LIST_FIELDS)
+
+@restaurant_bp.route("/api/suggest")
+def suggest():
+    """
+    Typeahead completions for ?q=: restaurant names, cuisines and dishes,
+    most popular first. Served from the in-memory index in utils/suggest.py.
+    """
+    query = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", SUGGEST_LIMIT, type=int), 1), SUGGEST_MAX)
+    suggestions = []
+    for entry in suggest_index.complete(query, limit):
+        if entry.kind == "restaurant":
+            url = url_for("restaurants.get_restaurant", id=entry.ref)
+        else:
+            url = url_for("find", query=entry.text)
+        suggestions.append({"text": entry.text, "kind": entry.kind, "url": url})
+    return jsonify({"query": query, "suggestions": suggestions})
 
 @restaurant_bp.route("/restaurants/map")
 def show_map():
     """
     Map view that shows all restaurants as markers.
-    Convert Restaurant objects to dicts before passing to template.
+    Only the columns map.js uses are sent, straight from the catalog snapshot.
     """
-    restaurants = Restaurant.query.all()
-    # Convert SQLAlchemy objects to dicts for JSON serialization
-    restaurants_dicts = [r.to_dict() for r in restaurants]
+    restaurants_dicts = rows_to_dicts(catalog.get().rows(fields=MAP_FIELDS))
     return render_template("map.html", restaurants=restaurants_dicts)
\ No newline at end of file
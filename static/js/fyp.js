@@ -15,6 +15,66 @@ function initializeFYP() {
     
     // Load comments for all posts
     loadAllComments();
+
+    // Live like/comment/share/save counts for the posts on screen
+    setupLiveCounts();
+}
+
+// Live engagement counts (Server-Sent Events from /api/fyp/live)
+const LIVE_COUNT_FIELDS = {
+    likes_count: 'likes',
+    comments_count: 'comments',
+    shares_count: 'shares',
+    saves_count: 'saves'
+};
+
+// Seconds between count polls when the server has no room for a live stream
+const LIVE_POLL_SECONDS = 15;
+
+function applyLiveCounts(posts) {
+    posts.forEach(post => {
+        Object.entries(LIVE_COUNT_FIELDS).forEach(([field, prefix]) => {
+            if (post[field] === undefined) return;
+            const countEl = document.getElementById(`${prefix}-${post.id}`);
+            if (countEl) {
+                countEl.textContent = post[field];
+            }
+        });
+    });
+}
+
+function setupLiveCounts() {
+    // One stream per page for the whole rendered feed (up to the server's id limit),
+    // so scrolling never opens new connections
+    const feed = document.getElementById('fypFeed');
+    const maxIds = Number(feed && feed.dataset.liveMaxIds) || 50;
+    const ids = Array.from(document.querySelectorAll('.fyp-post'))
+        .map(post => post.dataset.contentId)
+        .slice(0, maxIds)
+        .join(',');
+    if (!ids) return;
+
+    function poll() {
+        fetch(`/api/fyp/live?poll=1&ids=${ids}`)
+            .then(response => response.ok ? response.json() : [])
+            .then(applyLiveCounts)
+            .catch(() => {});
+    }
+
+    if (!window.EventSource) {
+        setInterval(poll, LIVE_POLL_SECONDS * 1000);
+        return;
+    }
+    const source = new EventSource(`/api/fyp/live?ids=${ids}`);
+    source.addEventListener('counts', event => applyLiveCounts(JSON.parse(event.data)));
+    source.addEventListener('error', () => {
+        // CLOSED (rather than reconnecting) means the server refused the stream (503)
+        if (source.readyState === EventSource.CLOSED) {
+            setInterval(poll, LIVE_POLL_SECONDS * 1000);
+        }
+    });
+    // Free the server's connection as soon as the page goes away
+    window.addEventListener('pagehide', () => source.close());
 }
 
 // Video playback functionality (TikTok-like)
@@ -37,7 +37,7 @@
     // Add "You Are Here" marker at the center
     const centerMarker = L.marker(center, {
         icon: L.icon({
-            iconUrl: '/static/images/you_are_here.png', // optional custom icon
+            iconUrl: window.youAreHereIcon || '/static/images/you_are_here.png', // optional custom icon
             iconSize: [30, 30],
             iconAnchor: [15, 30]
         })
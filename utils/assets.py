@@ -0,0 +1,100 @@
+"""
+utils/assets.py
+
+Static asset fingerprinting.
+- builds a manifest mapping each static file to a content-hashed name,
+  e.g. css/styles.css -> css/styles.1a2b3c4d.css
+- templates call asset_url('css/styles.css') to get the hashed URL, and
+  pass stored URLs like restaurant.image_url ("/static/images/...")
+  through the `asset` filter
+- hashed URLs are served from the original file with
+  Cache-Control: public, max-age=1y, immutable
+"""
+
+import hashlib
+import os
+
+from flask import request, send_from_directory, url_for
+
+from utils.compression import PRECOMPRESSED_EXTENSIONS, serve_precompressed
+
+# Folders under static/ that get fingerprinted
+FINGERPRINT_DIRS = ("css", "js", "images")
+HASH_LENGTH = 8
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+def hashed_name(filename, digest):
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def build_manifest(static_folder, subdirs=FINGERPRINT_DIRS):
+    """
+    Hash every file in the given static subfolders.
+    Returns {original relative path: hashed relative path}.
+    """
+    manifest = {}
+    for subdir in subdirs:
+        root_dir = os.path.join(static_folder, subdir)
+        for dirpath, _, filenames in os.walk(root_dir):
+            for name in filenames:
+                if name.startswith(".") or name.endswith(tuple(PRECOMPRESSED_EXTENSIONS.values())):
+                    continue
+                path = os.path.join(dirpath, name)
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                relative = os.path.relpath(path, static_folder).replace(os.sep, "/")
+                manifest[relative] = hashed_name(relative, digest)
+    return manifest
+
+
+class AssetManifest:
+    """Holds the manifest and its reverse lookup for one app."""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.reload()
+
+    def reload(self):
+        self.files = build_manifest(self.static_folder)
+        self.originals = {hashed: original for original, hashed in self.files.items()}
+
+    def url(self, filename):
+        return url_for("static", filename=self.files.get(filename, filename))
+
+    def rewrite(self, url):
+        """Hashed URL for a "/static/..." URL; anything else (None, external URLs) unchanged."""
+        prefix = url_for("static", filename="")
+        if url and url.startswith(prefix) and url[len(prefix):] in self.files:
+            return self.url(url[len(prefix):])
+        return url
+
+
+def init_assets(app):
+    """Build the manifest and register the template helper and static hook."""
+    manifest = AssetManifest(app.static_folder)
+    app.extensions["asset_manifest"] = manifest
+
+    app.jinja_env.globals["asset_url"] = manifest.url
+    app.jinja_env.filters["asset"] = manifest.rewrite
+
+    @app.before_request
+    def fingerprinted_static():
+        if request.endpoint != "static":
+            # Pick up edited files before each page render while developing
+            if app.debug:
+                manifest.reload()
+            return None
+        original = manifest.originals.get(request.view_args["filename"])
+        if original is None:
+            return None
+
+        response = serve_precompressed(app, original)
+        if response is None:
+            response = send_from_directory(app.static_folder, original)
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+        return response
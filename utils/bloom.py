@@ -0,0 +1,122 @@
+"""
+utils/bloom.py
+
+Compact bloom filters for per-session "seen content" sets.
+
+BloomFilter is a fixed-size filter sized from a capacity and a target
+false-positive rate. RotatingBloomFilter keeps two generations: when the
+current one fills up it becomes the previous one and a fresh filter
+starts, so memory stays fixed, the false-positive rate stays bounded
+(about twice the per-filter rate) and the oldest entries are forgotten.
+
+Both serialize to short URL-safe strings that fit in a session cookie.
+"""
+
+import base64
+import hashlib
+import math
+import struct
+
+_HEADER = struct.Struct(">IBI")  # bit count, hash count, items added
+
+
+def _indexes(key, num_bits, num_hashes):
+    """Bit positions for `key` via double hashing of one blake2b digest."""
+    digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+    h1, h2 = struct.unpack(">QQ", digest)
+    h2 |= 1  # odd step so positions do not repeat
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+class BloomFilter:
+    """Fixed-size bloom filter."""
+
+    def __init__(self, capacity=200, error_rate=0.01, num_bits=None, num_hashes=None):
+        if num_bits is None:
+            num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        if num_hashes is None:
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = 0
+        self.bits = bytearray((num_bits + 7) // 8)
+
+    def add(self, key):
+        for i in _indexes(key, self.num_bits, self.num_hashes):
+            self.bits[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in _indexes(key, self.num_bits, self.num_hashes))
+
+    @property
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def to_bytes(self):
+        return _HEADER.pack(self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data, capacity=200):
+        num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        bloom = cls(capacity=capacity, num_bits=num_bits, num_hashes=num_hashes)
+        bits = data[_HEADER.size:]
+        if len(bits) != len(bloom.bits):
+            raise ValueError("Bloom filter payload has the wrong length")
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        return bloom
+
+
+class RotatingBloomFilter:
+    """Two-generation bloom filter with fixed memory."""
+
+    def __init__(self, capacity=200, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous = None
+
+    def add(self, key):
+        if key in self.current:
+            return
+        if self.current.is_full:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+        self.current.add(key)
+
+    def __contains__(self, key):
+        return key in self.current or (self.previous is not None and key in self.previous)
+
+    def dumps(self):
+        """Serialize to a URL-safe string."""
+        data = self.current.to_bytes()
+        if self.previous is not None:
+            data += self.previous.to_bytes()
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    @classmethod
+    def loads(cls, value, capacity=200, error_rate=0.01):
+        """
+        Restore a filter from dumps() output. Anything unreadable, or made
+        with different sizing, gives an empty filter.
+        """
+        bloom = cls(capacity, error_rate)
+        if not value:
+            return bloom
+        try:
+            data = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            size = _HEADER.size + len(bloom.current.bits)
+            if len(data) not in (size, 2 * size):
+                return bloom
+            bloom.current = BloomFilter.from_bytes(data[:size], capacity)
+            if len(data) == 2 * size:
+                bloom.previous = BloomFilter.from_bytes(data[size:], capacity)
+        except (ValueError, struct.error):
+            return cls(capacity, error_rate)
+        return bloom
+
+    def nbytes(self):
+        return len(self.dumps())
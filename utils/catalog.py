@@ -0,0 +1,385 @@
+"""
+utils/catalog.py
+
+Process-wide, immutable snapshot of the restaurant catalog.
+
+Restaurants change rarely, so home, search, map, listing and chatbot
+reads are served from array-backed columns instead of re-running
+Restaurant.query.all() on every request:
+- ids and coordinates are `array` columns
+- cuisine and halal status are dictionary-encoded (small code array
+  plus the distinct values)
+- free text (name, description, address, image) is one UTF-8 blob plus
+  an offsets array per column, searched with bytes.find
+
+Restaurant writes (and opening-hours writes, see utils/hours.py, and
+edits to the post text the chatbot searches, see utils/search_index.py)
+bump the version stamp in the catalog_version table in the same
+transaction, and log the restaurants they touched per version in
+catalog_change. Each process checks the stamp at most once per
+CATALOG_CHECK_INTERVAL seconds and atomically swaps in a new snapshot
+when it changed (the same columns under the new stamp when no
+restaurant row changed). The hours, search and typeahead indexes follow
+the snapshot's version and reload only the restaurants logged since
+their own (Catalog.changes_since()), so writes in one worker reach every
+worker. Every region has its own snapshot, version stamp and log.
+"""
+
+import copy
+import datetime
+import math
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from flask import current_app
+from sqlalchemy import delete, event, insert, inspect, select, update
+
+from models.catalog_version import CatalogChange, CatalogVersion
+from models.content import Content
+from models.hours import RestaurantHours, RestaurantHoursException
+from models.restaurant import Restaurant
+from utils.db import RoutingSession, db
+from utils.events import data_changed
+from utils.projection import dto_class, project
+from utils.regions import PerRegion, region_scope
+
+FIELDS = ("id", "name", "description", "address", "latitude", "longitude",
+          "cuisine", "halal_status", "image_url")
+TEXT_FIELDS = ("name", "description", "address", "image_url")
+CATEGORY_FIELDS = ("cuisine", "halal_status")
+FLOAT_FIELDS = ("latitude", "longitude")
+# Models whose writes bump the version stamp
+VERSIONED_MODELS = (Restaurant, RestaurantHours, RestaurantHoursException)
+VERSIONED_TABLES = tuple(model.__tablename__ for model in VERSIONED_MODELS)
+# Content columns indexed for search; engagement counter updates do not bump the stamp
+VERSIONED_CONTENT_COLUMNS = ("restaurant_id", "title", "description")
+# Versions kept in the change log; a process further behind reloads everything
+CHANGE_LOG_VERSIONS = 1000
+# Bumps between deletions of old change log rows
+CHANGE_LOG_PRUNE_EVERY = 100
+
+
+class TextColumn:
+    """Strings stored as one UTF-8 blob plus row offsets."""
+
+    __slots__ = ("_blob", "_offsets", "_folded")
+
+    def __init__(self, values):
+        encoded = [(value or "").encode() for value in values]
+        offsets = [0]
+        total = 0
+        for value in encoded:
+            total += len(value)
+            offsets.append(total)
+        self._blob = b"".join(encoded)
+        self._offsets = array("I" if total < 2**32 else "Q", offsets)
+        self._folded = None
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode()
+
+    def contains(self, needle):
+        """Positions of rows containing `needle` (ASCII case-insensitive)."""
+        if not needle:
+            return list(range(len(self)))
+        if self._folded is None:
+            self._folded = self._blob.lower()
+        needle = needle.encode().lower()
+        offsets, find = self._offsets, self._folded.find
+        hits, start = [], 0
+        while True:
+            pos = find(needle, start)
+            if pos < 0:
+                return hits
+            row = bisect_right(offsets, pos) - 1
+            end = offsets[row + 1]
+            if pos + len(needle) <= end:
+                hits.append(row)
+            # Any other match in this row is redundant (or spans rows)
+            start = end
+
+    def nbytes(self):
+        size = sys.getsizeof(self._blob) + sys.getsizeof(self._offsets)
+        if self._folded is not None:
+            size += sys.getsizeof(self._folded)
+        return size
+
+
+class CategoryColumn:
+    """Low-cardinality strings stored as codes into a table of distinct values."""
+
+    __slots__ = ("codes", "values", "_lookup")
+
+    def __init__(self, values):
+        lookup = {}
+        codes = [lookup.setdefault(value, len(lookup)) for value in values]
+        self.codes = array("H" if len(lookup) <= 0xFFFF else "I", codes)
+        self.values = tuple(lookup)
+        self._lookup = lookup
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def equals(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            return []
+        return [i for i, c in enumerate(self.codes) if c == code]
+
+    def contains(self, needle):
+        needle = needle.lower()
+        matching = {code for code, value in enumerate(self.values) if value and needle in value.lower()}
+        if not matching:
+            return []
+        return [i for i, c in enumerate(self.codes) if c in matching]
+
+    def nbytes(self):
+        return sys.getsizeof(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+
+
+class FloatColumn:
+    """Nullable floats; None is stored as NaN."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = array("d", (math.nan if v is None else v for v in values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        value = self.values[i]
+        return None if math.isnan(value) else value
+
+    def nbytes(self):
+        return sys.getsizeof(self.values)
+
+
+class CatalogSnapshot:
+    """Immutable column store of every restaurant, ordered by id."""
+
+    def __init__(self, rows, version=0):
+        rows = list(rows)
+        self.version = version
+        # Rows are ordered by id, so positions are found by binary search
+        self.ids = array("q", (r.id for r in rows))
+        self.columns = {"id": self.ids}
+        for field in TEXT_FIELDS:
+            self.columns[field] = TextColumn(getattr(r, field) for r in rows)
+        for field in CATEGORY_FIELDS:
+            self.columns[field] = CategoryColumn(getattr(r, field) for r in rows)
+        for field in FLOAT_FIELDS:
+            self.columns[field] = FloatColumn(getattr(r, field) for r in rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def at_version(self, version):
+        """The same rows under a new version stamp (a write that changed no restaurant row)."""
+        snapshot = copy.copy(self)
+        snapshot.version = version
+        return snapshot
+
+    def search(self, text, fields=("name", "cuisine", "description")):
+        """Positions whose `fields` contain `text` (case-insensitive), in id order."""
+        hits = set()
+        for field in fields:
+            hits.update(self.columns[field].contains(text))
+        return sorted(hits)
+
+    def where(self, positions, field, value):
+        """Keep positions (None = all) where `field` equals `value`."""
+        matching = self.columns[field].equals(value)
+        if positions is None:
+            return matching
+        matching = set(matching)
+        return [i for i in positions if i in matching]
+
+    def position(self, restaurant_id):
+        """Position of a restaurant id, or None if it is not in the catalog."""
+        i = bisect_left(self.ids, restaurant_id)
+        if i < len(self.ids) and self.ids[i] == restaurant_id:
+            return i
+        return None
+
+    def positions_for(self, ids):
+        """Positions of the given restaurant ids, in the given order."""
+        positions = (self.position(restaurant_id) for restaurant_id in ids)
+        return [i for i in positions if i is not None]
+
+    def rows(self, positions=None, fields=FIELDS):
+        """Materialize rows as namedtuples (same DTOs as utils.projection.project)."""
+        if positions is None:
+            positions = range(len(self))
+        make_row = dto_class(Restaurant, tuple(fields))._make
+        columns = [self.columns[field] for field in fields]
+        return [make_row([column[i] for column in columns]) for i in positions]
+
+    def nbytes(self):
+        """Approximate memory held by the columns."""
+        size = sys.getsizeof(self.ids)
+        for field, column in self.columns.items():
+            if field != "id":
+                size += column.nbytes()
+        return size
+
+
+def read_version():
+    """Current catalog version stamp (0 before the first restaurant write)."""
+    with db.session.get_bind().connect() as conn:
+        version = conn.execute(
+            select(CatalogVersion.version).where(CatalogVersion.id == 1)
+        ).scalar()
+    return version or 0
+
+
+def bump_version(connection, changes=None):
+    """
+    Increment the version stamp on `connection` (inside the writer's
+    transaction) and log `changes`, (table name, restaurant id) pairs.
+    Call this after bulk statements that bypass the ORM; without
+    `changes`, every process reloads its indexes whole.
+    """
+    now = datetime.datetime.utcnow()
+    result = connection.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(CatalogVersion).values(id=1, version=1, updated_at=now))
+    version = connection.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar()
+    connection.execute(insert(CatalogChange), [
+        {"version": version, "table_name": table, "restaurant_id": restaurant_id}
+        for table, restaurant_id in sorted(changes or [("*", None)], key=str)
+    ])
+    if version % CHANGE_LOG_PRUNE_EVERY == 0:
+        connection.execute(delete(CatalogChange).where(CatalogChange.version <= version - CHANGE_LOG_VERSIONS))
+
+
+def read_changes(since, until):
+    """
+    {table name: restaurant ids} logged for versions after `since` up to
+    `until`, or None when they cannot all be listed (a write without
+    changes, or versions already pruned from the log).
+    """
+    if until < since:
+        return None
+    with db.session.get_bind().connect() as conn:
+        rows = conn.execute(
+            select(CatalogChange.version, CatalogChange.table_name, CatalogChange.restaurant_id)
+            .where(CatalogChange.version > since, CatalogChange.version <= until)
+        ).all()
+    if len({row.version for row in rows}) != until - since:
+        return None
+    changes = {}
+    for row in rows:
+        if row.restaurant_id is None:
+            return None
+        changes.setdefault(row.table_name, set()).add(row.restaurant_id)
+    return changes
+
+
+class Catalog:
+    """Holds one region's current snapshot and rebuilds it when the stamp changes."""
+
+    def __init__(self, region):
+        self.region = region
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._changes = None  # (from version, to version, changes) of the last move
+
+    def invalidate(self):
+        """Force a version check on the next get()."""
+        self._checked_at = 0.0
+
+    def peek(self):
+        """Current snapshot without a version check (None before the first get())."""
+        return self._snapshot
+
+    def get(self):
+        snapshot = self._snapshot
+        interval = current_app.config.get("CATALOG_CHECK_INTERVAL", 1.0)
+        if snapshot is not None and time.monotonic() - self._checked_at < interval:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not snapshot:  # another thread just rebuilt it
+                return self._snapshot
+            with region_scope(self.region):
+                version = read_version()
+                self._checked_at = time.monotonic()
+                if snapshot is None or snapshot.version != version:
+                    changes = None if snapshot is None else read_changes(snapshot.version, version)
+                    if changes is not None and Restaurant.__tablename__ not in changes:
+                        # Only hours or post text changed
+                        self._snapshot = snapshot.at_version(version)
+                    else:
+                        rows = project(Restaurant, FIELDS, order_by=Restaurant.id)
+                        self._snapshot = CatalogSnapshot(rows, version)
+                    if snapshot is not None:
+                        self._changes = (snapshot.version, version, changes)
+            return self._snapshot
+
+    def changes_since(self, version):
+        """
+        (current version, {table name: restaurant ids} written since
+        `version`); the changes are None when only a full reload is safe.
+        """
+        current = self.get().version
+        if current == version:
+            return current, {}
+        last = self._changes
+        if last is not None and last[:2] == (version, current):
+            return current, last[2]
+        with region_scope(self.region):
+            return current, read_changes(version, current)
+
+
+# catalog.get() returns the current region's snapshot
+catalog = PerRegion(Catalog)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _bump_on_catalog_write(session, flush_context):
+    changes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, VERSIONED_MODELS) or (isinstance(obj, Content) and _content_text_changed(session, obj)):
+            changes.update((obj.__tablename__, restaurant_id) for restaurant_id in _restaurant_ids(obj))
+    if changes:
+        bump_version(session.connection(), changes)
+
+
+def _restaurant_ids(obj):
+    """Restaurants an object belongs to, before and after this flush."""
+    if isinstance(obj, Restaurant):
+        return {obj.id}
+    history = inspect(obj).attrs.restaurant_id.history
+    ids = {obj.restaurant_id, *history.deleted}
+    ids.discard(None)
+    return ids
+
+
+def _content_text_changed(session, obj):
+    if obj in session.new or obj in session.deleted:
+        return True
+    attrs = inspect(obj).attrs
+    return any(attrs[column].history.has_changes() for column in VERSIONED_CONTENT_COLUMNS)
+
+
+@data_changed.connect
+def _on_data_changed(sender, changes):
+    if (any(changes.touches(table) for table in VERSIONED_TABLES)
+            or changes.touches("content", VERSIONED_CONTENT_COLUMNS)):
+        catalog.for_region(changes.region).invalidate()
@@ -0,0 +1,163 @@
+"""
+utils/chat_eval.py
+
+Batch evaluation of the chatbot pipeline, for replaying logged messages
+(POST /api/chat/batch and chat_eval.py).
+
+Each message runs parse_query() -> search_restaurants() ->
+generate_response(), like /api/chat, but against one frozen snapshot
+taken up front: every region's catalog snapshot, TF-IDF index, opening
+hours and rating summaries for all restaurants. No database queries run per
+message, and every message in a batch sees the same data.
+
+Large batches are split into chunks and spread over a process pool
+(forked, so the workers share the frozen snapshot copy-on-write instead
+of pickling it). Small batches, or platforms without fork, run inline.
+Only chat_eval.py uses the pool: /api/chat/batch runs inline (workers=1),
+since forking a threaded web worker can copy locks other threads hold.
+"""
+
+import copy
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import Flask, current_app
+
+from utils.catalog import catalog
+from utils.hours import hours_index
+from utils.projection import rating_summaries
+from utils.regions import region_names, region_scope
+from utils.search_index import restaurant_index
+
+# Restaurant ids kept per result (the count covers all of them)
+RESULT_IDS = 10
+# Messages sent to a worker at a time
+CHUNK_SIZE = 500
+# Config the workers need for parse_query() and the region helpers
+WORKER_CONFIG = ("REGIONS", "DEFAULT_REGION")
+
+# Set in each worker by _init_worker: {region: (snapshot, index, ratings, hours)}
+_frozen = None
+
+
+def freeze():
+    """Snapshot every region's catalog, search index, ratings and hours (one rating query per region)."""
+    frozen = {}
+    for region in region_names():
+        with region_scope(region, read_only=True):
+            frozen[region] = (
+                catalog.for_region(region).get(),
+                # A shallow copy keeps today's postings if the live index is updated
+                copy.copy(restaurant_index.for_region(region).refresh()),
+                rating_summaries(),
+                hours_index.for_region(region).get(),
+            )
+    return frozen
+
+
+def evaluate(message, region, frozen):
+    """Run one message through the pipeline; returns its result dict."""
+    from routes.chatbot_routes import generate_response, parse_query, search_restaurants
+
+    start = time.perf_counter()
+    criteria = parse_query(message)
+    region = criteria["region"] or region
+    snapshot, index, ratings, hours = frozen[region]
+    with region_scope(region):
+        restaurants = search_restaurants(criteria, snapshot, index, ratings, hours)
+        response = generate_response(restaurants, criteria, message, ratings)
+    return {
+        "message": message,
+        "region": region,
+        "intent": criteria["intent"],
+        "cuisine": criteria["cuisine"],
+        "halal_status": criteria["halal_status"],
+        "rating_min": criteria["rating_min"],
+        "open": criteria["open"],
+        "food_items": criteria["food_items"],
+        "count": response["count"],
+        "restaurant_ids": [r["id"] for r in response["restaurants"][:RESULT_IDS]],
+        "reply": response["message"],
+        "ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def _init_worker(frozen, config):
+    global _frozen
+    _frozen = frozen
+    # A bare app: the pipeline only reads config, never the database
+    app = Flask(__name__)
+    app.config.update(config)
+    app.app_context().push()
+
+
+def _evaluate_chunk(messages, region):
+    return [evaluate(message, region, _frozen) for message in messages]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(results, seconds, workers, snapshot_seconds=0.0):
+    """Aggregate latency (per message, ms) and throughput of a batch."""
+    latencies = sorted(result["ms"] for result in results)
+    intents = {}
+    for result in results:
+        intents[result["intent"]] = intents.get(result["intent"], 0) + 1
+    return {
+        "messages": len(results),
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "snapshot_seconds": round(snapshot_seconds, 3),
+        "messages_per_second": round(len(results) / seconds, 1) if seconds else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+        "empty_results": sum(1 for result in results if not result["count"]),
+        "intents": intents,
+    }
+
+
+def evaluate_batch(messages, region=None, workers=None, min_pool_batch=2000):
+    """
+    Evaluate `messages` (in order) against one frozen snapshot.
+    `region` is the region of messages without a location keyword
+    (default: the default region). `workers` defaults to the CPU count;
+    batches under `min_pool_batch` messages run inline.
+    Returns (results, summary).
+    """
+    region = region or current_app.config["DEFAULT_REGION"]
+    workers = workers or os.cpu_count() or 1
+    if len(messages) < min_pool_batch or "fork" not in multiprocessing.get_all_start_methods():
+        workers = 1
+
+    started = time.perf_counter()
+    frozen = freeze()
+    snapshot_seconds = time.perf_counter() - started
+    if workers == 1:
+        results = [evaluate(message, region, frozen) for message in messages]
+    else:
+        config = {key: current_app.config[key] for key in WORKER_CONFIG}
+        chunks = [messages[i:i + CHUNK_SIZE] for i in range(0, len(messages), CHUNK_SIZE)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(frozen, config),
+        ) as pool:
+            results = [
+                result
+                for chunk in pool.map(_evaluate_chunk, chunks, [region] * len(chunks))
+                for result in chunk
+            ]
+    return results, summarize(results, time.perf_counter() - started, workers, snapshot_seconds)
@@ -0,0 +1,142 @@
+"""
+utils/compression.py
+
+Response compression.
+- negotiates gzip (and brotli when the `brotli` package is installed)
+  from the Accept-Encoding header
+- only compresses text-like content types above a size threshold
+- serves precompressed `.br`/`.gz` siblings of static files when they
+  exist (see compress_static.py), so CSS/JS are not compressed per request
+"""
+
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_file
+from werkzeug.security import safe_join
+
+try:  # optional dependency
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing. Images and video are already compressed.
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+
+# File extension of the precompressed sibling for each encoding
+PRECOMPRESSED_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encodings, encodings=None):
+    """
+    Pick the best encoding the client accepts, in server preference order.
+    Returns None if the client accepts none of them.
+    """
+    if encodings is None:
+        encodings = available_encodings()
+    for encoding in encodings:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=6):
+    if encoding == "br":
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _add_vary(response):
+    response.vary.add("Accept-Encoding")
+
+
+def serve_precompressed(app, filename):
+    """
+    Return a response for a precompressed sibling of a static file,
+    or None if there is no usable sibling.
+    """
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    for encoding, extension in PRECOMPRESSED_EXTENSIONS.items():
+        if request.accept_encodings[encoding] <= 0:
+            continue
+        sibling = path + extension
+        # A stale sibling (older than the source) is ignored
+        if os.path.isfile(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+            response = send_file(
+                sibling,
+                mimetype=mimetypes.guess_type(path)[0],
+                conditional=True,
+                max_age=app.get_send_file_max_age(filename),
+            )
+            response.headers["Content-Encoding"] = encoding
+            _add_vary(response)
+            return response
+    return None
+
+
+def init_compression(app):
+    """Register the compression hooks on the app."""
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)  # bytes
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_TYPES", COMPRESSIBLE_TYPES)
+
+    if not app.config["COMPRESS_ENABLED"]:
+        return
+
+    @app.before_request
+    def precompressed_static():
+        if request.endpoint == "static" and request.method in ("GET", "HEAD"):
+            return serve_precompressed(app, request.view_args["filename"])
+        return None
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in app.config["COMPRESS_TYPES"]:
+            return response
+        _add_vary(response)
+
+        if (
+            response.status_code < 200
+            or response.status_code >= 300
+            or response.status_code == 204
+            or (response.is_streamed and not response.direct_passthrough)
+            or "Content-Encoding" in response.headers
+            or "Content-Range" in response.headers
+        ):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        # Static files are passed through as file wrappers; read them so they
+        # can be compressed like any other body.
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        response.set_data(compress(data, encoding, app.config["COMPRESS_LEVEL"]))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -0,0 +1,100 @@
+"""
+utils/conversations.py
+
+Server-side chatbot conversation state, so follow-ups like "only
+certified ones" or "top rated" can narrow the previous answer instead of
+searching again.
+
+Each conversation (one per browser session, see routes/chatbot_routes.py)
+keeps its merged criteria, its region, the candidate restaurant ids in
+result order and their rating summaries (as of that search, so a "top
+rated" follow-up may miss reviews posted since). Entries live in a
+bounded LRU that drops a conversation CHAT_SESSION_TTL seconds after its
+last answer and evicts the least recently used one past CHAT_SESSION_MAX.
+
+The store is per process: with several gunicorn workers a follow-up can
+land on a worker that never saw the conversation. That is counted as a
+refinement miss and answered with a normal search.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# Counters reported by ConversationStore.stats()
+COUNTERS = ("searches", "refinements_cached", "refinement_misses", "expired", "evicted")
+
+
+class ConversationStore:
+    """Thread-safe LRU of conversation states with a time-to-live."""
+
+    def __init__(self, maxsize=10000, ttl=900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, state)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(COUNTERS, 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """State of a live conversation, or None."""
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._counts["expired"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def save(self, key, state):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counts["evicted"] += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def record(self, counter):
+        with self._lock:
+            self._counts[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            counts["active"] = len(self._entries)
+        refinements = counts["refinements_cached"] + counts["refinement_misses"]
+        # Share of refinements answered without a database round trip
+        counts["refinement_hit_rate"] = (
+            round(counts["refinements_cached"] / refinements, 3) if refinements else None
+        )
+        return counts
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def conversation_store():
+    """The process-wide store, sized from config on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore(
+                    maxsize=current_app.config.get("CHAT_SESSION_MAX", 10000),
+                    ttl=current_app.config.get("CHAT_SESSION_TTL", 900),
+                )
+    return _store
@@ -4,7 +4,156 @@ utils/db.py
 We keep a single db instance here and import it anywhere we need it.
 This avoids circular import problems that commonly occur when models
 and the app try to import each other.
+
+The session routes reads and writes to different engines:
+- GET/HEAD/OPTIONS requests read through a read-only engine
+  (a `mode=ro` SQLite connection pool, or a replica URL from config)
+- everything else, and any flush, goes to the primary engine
+Both are picked for the current region (see utils/regions.py); the
+default region uses the bind-less primary engine and READ_BIND.
 """
+import sqlalchemy as sa
+from flask import current_app, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+
+from utils.regions import current_region, read_only_scope
+
+# Bind key of the read-only engine inside SQLALCHEMY_BINDS
+READ_BIND = "__read__"
+READ_SUFFIX = ":read"
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def bind_key_for(region, read=False):
+    """SQLALCHEMY_BINDS key of a region's primary (or read) engine."""
+    if region == current_app.config.get("DEFAULT_REGION"):
+        return READ_BIND if read else None
+    return f"region:{region}{READ_SUFFIX if read else ''}"
+
+
+def is_read_bind(key):
+    return key == READ_BIND or (key or "").endswith(READ_SUFFIX)
+
+
+class RoutingSession(Session):
+    """Session that sends queries to the current region, reads to its read engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            region = current_region()
+            if self._wants_read_bind():
+                engine = self._db.engines.get(bind_key_for(region, read=True))
+                if engine is not None:
+                    return engine
+            key = bind_key_for(region)
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _wants_read_bind(self):
+        if not has_request_context():
+            if not read_only_scope():
+                return False
+        elif request.method not in READ_ONLY_METHODS:
+            return False
+        # Anything being flushed or waiting to be flushed must hit the primary
+        if self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        return True
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def read_uri_for(primary_uri):
+    """
+    Derive a read-only URI for a SQLite file database.
+    Returns None for anything else (in-memory SQLite, other backends),
+    those need SQLALCHEMY_READ_DATABASE_URI set explicitly.
+    """
+    url = sa.engine.make_url(primary_uri)
+    if not url.drivername.startswith("sqlite"):
+        return None
+    if url.database in (None, "", ":memory:") or url.query.get("uri"):
+        return None
+    return url.set(
+        database=f"file:{url.database}",
+        query={"mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+
+def configure_read_bind(app):
+    """
+    Register the read-only engine as a bind. Call before db.init_app().
+    """
+    if not app.config.get("SQLALCHEMY_READ_ROUTING", True):
+        return
+    read_uri = app.config.get("SQLALCHEMY_READ_DATABASE_URI") or read_uri_for(
+        app.config["SQLALCHEMY_DATABASE_URI"]
+    )
+    if read_uri:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds[READ_BIND] = read_uri
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets the read-only connections read while a writer is active
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _set_read_only_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=1")
+    cursor.close()
+
+
+def engine_for(region=None, read=False):
+    """Engine of a region (default: the current one); primary unless `read`."""
+    key = bind_key_for(region or current_region(), read=read)
+    if read and key not in db.engines:
+        key = bind_key_for(region or current_region())
+    return db.engines[key]
+
+
+def init_engines(app):
+    """
+    Attach connection pragmas to the engines (every region's primary and
+    read engine). Call after db.init_app().
+    """
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            if is_read_bind(key):
+                sa.event.listen(engine, "connect", _set_read_only_pragmas)
+            else:
+                sa.event.listen(engine, "connect", _set_sqlite_pragmas)
+
 
-db = SQLAlchemy()
\ No newline at end of file
+def add_missing_columns(engine):
+    """
+    ALTER TABLE ... ADD COLUMN for model columns missing from existing
+    tables (create_all only creates whole tables). New columns must be
+    nullable; anything else is reported and left alone.
+    """
+    inspector = sa.inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable or column.primary_key:
+                    print(f"Cannot add NOT NULL column {table.name}.{column.name}; migrate it by hand")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(sa.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
@@ -0,0 +1,302 @@
+"""
+utils/engagement.py
+
+Append-only engagement events and their hourly/daily rollups.
+
+record_event() is called by the FYP endpoints after a like, comment,
+share, save or order. Events are buffered in memory and written with a
+single executemany INSERT once ENGAGEMENT_BATCH_SIZE events are queued,
+by a background thread every ENGAGEMENT_FLUSH_INTERVAL seconds (so a
+worker that goes quiet still writes its events), and at process exit.
+A crash can lose at most one unflushed batch.
+
+compact() only rolls up hours that ended ENGAGEMENT_COMPACTION_GRACE
+seconds ago, so every worker has flushed them first. An event that
+could not be written within the grace (e.g. the database was locked)
+is written with its time moved up to just inside it, so it still lands
+in a rollup instead of below the watermark.
+
+compact() rolls complete hours of raw events into engagement_rollup
+(granularity "hour"), recomputes the affected "day" rows from the hourly
+ones, then applies the retention policy:
+- raw events older than ENGAGEMENT_RAW_RETENTION_DAYS are deleted
+  (only once they are rolled up)
+- hourly rollups older than ENGAGEMENT_HOURLY_RETENTION_DAYS are deleted
+- daily rollups are kept
+
+Events are written to the database of the region they happened in, and
+compact() works on the current region (compact_engagement.py runs it
+for each region).
+"""
+
+import atexit
+import datetime
+import math
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+
+from models.engagement import EngagementEvent, EngagementRollup, EngagementWatermark
+from utils.db import engine_for
+from utils.regions import current_region
+
+METRICS = ("likes", "comments", "shares", "saves", "orders")
+GRANULARITIES = ("hour", "day")
+
+DEFAULTS = {
+    "ENGAGEMENT_BATCH_SIZE": 100,
+    "ENGAGEMENT_FLUSH_INTERVAL": 2.0,        # seconds
+    "ENGAGEMENT_COMPACTION_GRACE": 300,      # seconds; lets other workers flush first
+    "ENGAGEMENT_RAW_RETENTION_DAYS": 7,
+    "ENGAGEMENT_HOURLY_RETENTION_DAYS": 90,
+    "ENGAGEMENT_DELETE_CHUNK": 5000,
+}
+
+
+def _config(key):
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+class EventBuffer:
+    """Thread-safe in-memory queue of events waiting to be inserted."""
+
+    def __init__(self):
+        self._events = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._app = None
+        self._flusher_pid = None
+        atexit.register(self._flush_at_exit)
+
+    def add(self, content_id, metric, delta):
+        with self._lock:
+            if self._app is None:
+                self._app = current_app._get_current_object()
+            if self._flusher_pid != os.getpid():
+                # Started on first use, so each gunicorn worker runs its own
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._run, name="engagement-flush", daemon=True).start()
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.append({
+                "region": current_region(),
+                "content_id": content_id,
+                "metric": metric,
+                "delta": delta,
+                "created_at": datetime.datetime.utcnow(),
+            })
+            due = (
+                len(self._events) >= _config("ENGAGEMENT_BATCH_SIZE")
+                or time.monotonic() - self._oldest >= _config("ENGAGEMENT_FLUSH_INTERVAL")
+            )
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                # Keep serving; the events stay queued for the next flush
+                print(f"Error flushing engagement events: {e}")
+
+    def _run(self):
+        app = self._app
+        while True:
+            interval = app.config.get("ENGAGEMENT_FLUSH_INTERVAL", DEFAULTS["ENGAGEMENT_FLUSH_INTERVAL"])
+            if not math.isfinite(interval):
+                return  # timed flushes turned off
+            time.sleep(interval)
+            if not self._events:
+                continue
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception as e:
+                # The events stay queued for the next flush
+                print(f"Error flushing engagement events: {e}")
+
+    def flush(self):
+        """Insert all queued events, one statement per region. Returns the count."""
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+        # Events older than the compaction grace may already be behind the
+        # watermark; move them up to just inside it (half the grace as margin)
+        earliest = datetime.datetime.utcnow() - datetime.timedelta(
+            seconds=_config("ENGAGEMENT_COMPACTION_GRACE") / 2
+        )
+        by_region = {}
+        for e in events:
+            row = {key: value for key, value in e.items() if key != "region"}
+            row["created_at"] = max(row["created_at"], earliest)
+            by_region.setdefault(e["region"], []).append(row)
+        regions = list(by_region)
+        written = 0
+        for i, region in enumerate(regions):
+            # Own connection on the region's primary engine, independent of the request session
+            try:
+                with engine_for(region).begin() as conn:
+                    conn.execute(insert(EngagementEvent), by_region[region])
+            except Exception:
+                unwritten = set(regions[i:])
+                with self._lock:  # retry this and the remaining regions with the next batch
+                    self._events[:0] = [e for e in events if e["region"] in unwritten]
+                raise
+            written += len(by_region[region])
+        return written
+
+    def _flush_at_exit(self):
+        if self._app is not None and self._events:
+            with self._app.app_context():
+                self.flush()
+
+    def __len__(self):
+        return len(self._events)
+
+
+event_buffer = EventBuffer()
+
+
+def record_event(content_id, metric, delta=1):
+    """Queue an engagement event for `content_id` (metric from METRICS)."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown engagement metric: {metric}")
+    event_buffer.add(content_id, metric, delta)
+
+
+def truncate_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_bucket(column):
+    """SQL expression truncating a timestamp to the hour."""
+    if engine_for().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    return func.date_trunc("hour", column)
+
+
+def _as_datetime(value):
+    if isinstance(value, str):  # SQLite strftime() returns text
+        return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def _delete_in_chunks(engine, table, condition, chunk):
+    """Delete matching rows a chunk per transaction, so the write lock is never held long."""
+    total = 0
+    while True:
+        ids = select(table.c.id).where(condition).limit(chunk).scalar_subquery()
+        with engine.begin() as conn:
+            deleted = conn.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        total += deleted
+        if deleted < chunk:
+            return total
+
+
+def compact(now=None):
+    """
+    Roll raw events up into hourly/daily buckets and apply retention.
+    Returns a summary dict.
+    """
+    # Events queued in this process; web workers flush their own on a timer
+    event_buffer.flush()
+    now = now or datetime.datetime.utcnow()
+    # Only complete hours, and only once other workers have had time to flush
+    rolled_until = truncate_hour(now - datetime.timedelta(seconds=_config("ENGAGEMENT_COMPACTION_GRACE")))
+    events = EngagementEvent.__table__
+    rollups = EngagementRollup.__table__
+    summary = {"hourly_rows": 0, "daily_rows": 0, "raw_deleted": 0, "hourly_deleted": 0}
+
+    engine = engine_for()
+    with engine.begin() as conn:
+        watermark = conn.execute(
+            select(EngagementWatermark.rolled_until).where(EngagementWatermark.id == 1)
+        ).scalar()
+        if watermark is None:
+            watermark = conn.execute(select(func.min(events.c.created_at))).scalar()
+            if watermark is not None:
+                watermark = truncate_hour(watermark)
+
+        if watermark is not None and watermark < rolled_until:
+            bucket = _hour_bucket(events.c.created_at)
+            hourly = conn.execute(
+                select(events.c.content_id, events.c.metric, bucket, func.sum(events.c.delta))
+                .where(events.c.created_at >= watermark, events.c.created_at < rolled_until)
+                .group_by(events.c.content_id, events.c.metric, bucket)
+            ).all()
+            hourly_rows = [
+                {"content_id": content_id, "metric": metric, "granularity": "hour",
+                 "bucket_start": _as_datetime(hour), "count": count}
+                for content_id, metric, hour, count in hourly
+            ]
+            if hourly_rows:
+                conn.execute(insert(rollups), hourly_rows)
+            summary["hourly_rows"] = len(hourly_rows)
+
+            # Recompute the daily rows of every day that received new hours
+            days = sorted({truncate_hour(r["bucket_start"]).replace(hour=0) for r in hourly_rows})
+            for day in days:
+                next_day = day + datetime.timedelta(days=1)
+                totals = conn.execute(
+                    select(rollups.c.content_id, rollups.c.metric, func.sum(rollups.c.count))
+                    .where(rollups.c.granularity == "hour",
+                           rollups.c.bucket_start >= day, rollups.c.bucket_start < next_day)
+                    .group_by(rollups.c.content_id, rollups.c.metric)
+                ).all()
+                conn.execute(delete(rollups).where(
+                    rollups.c.granularity == "day", rollups.c.bucket_start == day
+                ))
+                conn.execute(insert(rollups), [
+                    {"content_id": content_id, "metric": metric, "granularity": "day",
+                     "bucket_start": day, "count": count}
+                    for content_id, metric, count in totals
+                ])
+                summary["daily_rows"] += len(totals)
+
+        if watermark is None or watermark < rolled_until:
+            result = conn.execute(
+                update(EngagementWatermark).where(EngagementWatermark.id == 1)
+                .values(rolled_until=rolled_until)
+            )
+            if result.rowcount == 0:
+                conn.execute(insert(EngagementWatermark).values(id=1, rolled_until=rolled_until))
+
+    chunk = _config("ENGAGEMENT_DELETE_CHUNK")
+    raw_cutoff = min(rolled_until, now - datetime.timedelta(days=_config("ENGAGEMENT_RAW_RETENTION_DAYS")))
+    hourly_cutoff = now - datetime.timedelta(days=_config("ENGAGEMENT_HOURLY_RETENTION_DAYS"))
+    summary["raw_deleted"] = _delete_in_chunks(engine, events, events.c.created_at < raw_cutoff, chunk)
+    summary["hourly_deleted"] = _delete_in_chunks(
+        engine, rollups,
+        (rollups.c.granularity == "hour") & (rollups.c.bucket_start < hourly_cutoff),
+        chunk,
+    )
+    return summary
+
+
+def rollup_series(content_id, granularity="hour", since=None, until=None, metrics=METRICS):
+    """
+    Time series for one content item: [{"bucket_start": ..., "likes": n, ...}]
+    ordered by bucket, with 0 for metrics that had no events in a bucket.
+    """
+    from utils.projection import project
+
+    criteria = [
+        EngagementRollup.content_id == content_id,
+        EngagementRollup.granularity == granularity,
+        EngagementRollup.metric.in_(metrics),
+    ]
+    if since is not None:
+        criteria.append(EngagementRollup.bucket_start >= since)
+    if until is not None:
+        criteria.append(EngagementRollup.bucket_start < until)
+
+    buckets = {}
+    for row in project(EngagementRollup, ("bucket_start", "metric", "count"), *criteria,
+                       order_by=EngagementRollup.bucket_start):
+        point = buckets.setdefault(row.bucket_start, {m: 0 for m in metrics})
+        point[row.metric] = row.count
+    return [
+        {"bucket_start": bucket.isoformat(), **counts}
+        for bucket, counts in buckets.items()
+    ]
@@ -0,0 +1,106 @@
+"""
+utils/events.py
+
+Change notifications for caches and indexes built from the database.
+Rows inserted, updated or deleted through db.session are collected on
+flush and announced once, after the transaction commits, with the
+`data_changed` signal:
+
+    @data_changed.connect
+    def on_change(sender, changes):
+        changes.tables            # {"restaurant": {1, 2}, "review": {7}}
+        changes.restaurant_ids    # restaurants whose row, reviews or content changed
+        changes.region            # region whose database changed
+        changes.touches("content", ["title", "description"])
+
+Handlers run inside the committing request, so they should only mark
+things stale; the session cannot run queries at that point.
+Bulk UPDATE/DELETE statements bypass the ORM; call notify() after them.
+"""
+
+from blinker import Namespace
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from utils.db import RoutingSession
+from utils.regions import current_region
+
+_signals = Namespace()
+data_changed = _signals.signal("data-changed")
+
+
+class ChangeSet:
+    """Tables, row ids and columns touched by one transaction."""
+
+    def __init__(self, tables=None, restaurant_ids=None, region=None, columns=None):
+        self.region = region or current_region()
+        self.tables = tables or {}
+        self.restaurant_ids = set(restaurant_ids or ())
+        # table -> changed column names; "*" means rows were inserted/deleted
+        self.columns = {table: {"*"} for table in self.tables}
+        for table, names in (columns or {}).items():
+            self.columns[table] = set(names)
+
+    def add(self, obj, columns=None):
+        """Record a changed object. `columns` is None for inserts/deletes."""
+        table = getattr(obj, "__tablename__", None)
+        if table is None:
+            return
+        touched = self.columns.setdefault(table, set())
+        if columns is None:
+            touched.add("*")
+        else:
+            touched.update(columns)
+        # Primary keys of new rows are assigned by the time after_flush runs
+        row_id = inspect(obj).mapper.primary_key_from_instance(obj)[0]
+        if row_id is not None:
+            self.tables.setdefault(table, set()).add(row_id)
+            if table == "restaurant":
+                self.restaurant_ids.add(row_id)
+        restaurant_id = getattr(obj, "restaurant_id", None)
+        if restaurant_id is not None:
+            self.restaurant_ids.add(restaurant_id)
+
+    def touches(self, table, columns=None):
+        """True if `table` changed (optionally: any of `columns`)."""
+        touched = self.columns.get(table)
+        if not touched:
+            return False
+        return columns is None or "*" in touched or not touched.isdisjoint(columns)
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    def __repr__(self):
+        return (f"ChangeSet(region={self.region!r}, tables={self.tables!r}, "
+                f"restaurant_ids={self.restaurant_ids!r})")
+
+
+def notify(changes):
+    """Announce a ChangeSet, e.g. after a bulk statement or an external import."""
+    if changes:
+        data_changed.send(current_app._get_current_object(), changes=changes)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault("pending_changes", ChangeSet())
+    for obj in list(session.new) + list(session.deleted):
+        changes.add(obj)
+    for obj in session.dirty:
+        # Attribute history is still available in after_flush
+        columns = [attr.key for attr in inspect(obj).attrs if attr.history.has_changes()]
+        if columns:
+            changes.add(obj, columns)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _announce_changes(session):
+    changes = session.info.pop("pending_changes", None)
+    if changes:
+        notify(changes)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("pending_changes", None)
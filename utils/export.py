@@ -0,0 +1,115 @@
+"""
+utils/export.py
+
+Streaming bulk export of restaurants, reviews and content as NDJSON or
+CSV, used by /api/export/<table> and export.py.
+
+Rows are read in keyset batches (WHERE id > last ORDER BY id LIMIT n),
+each on its own short read connection, and encoded one batch at a time,
+so memory stays flat whatever the table size, and no read transaction
+stays open for the whole export (which would stop WAL checkpoints).
+
+Reviews and content can be exported incrementally with `since`, on
+Review.date and Content.created_at. It is inclusive: rows stamped
+exactly `since` come again, so consumers should upsert by id.
+"""
+
+import csv
+import datetime
+import io
+import zlib
+
+from sqlalchemy import select
+
+from models.content import Content
+from models.restaurant import Restaurant
+from models.review import Review
+from utils.db import engine_for
+from utils.projection import dumps
+
+# table -> (model, exported fields, timestamp field for `since`)
+EXPORTS = {
+    "restaurants": (Restaurant, ("id", "name", "description", "address", "latitude", "longitude",
+                                 "cuisine", "halal_status", "image_url"), None),
+    "reviews": (Review, ("id", "restaurant_id", "rating", "comment", "date"), "date"),
+    "content": (Content, ("id", "restaurant_id", "creator_name", "is_sponsored", "title",
+                          "description", "image_url", "video_url", "likes_count",
+                          "comments_count", "shares_count", "saves_count", "created_at",
+                          "order_url"), "created_at"),
+}
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_since(value):
+    """ISO date or timestamp -> naive UTC datetime (None if missing)."""
+    if not value:
+        return None
+    since = datetime.datetime.fromisoformat(value)
+    if since.tzinfo is not None:
+        since = since.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def iter_batches(table, since=None, region=None, batch_size=1000):
+    """Yield lists of row tuples (in EXPORTS field order), by ascending id."""
+    model, fields, since_field = EXPORTS[table]
+    stmt = select(*[getattr(model, field) for field in fields]).order_by(model.id).limit(batch_size)
+    if since is not None:
+        if since_field is None:
+            raise ValueError(f"{table} cannot be exported incrementally")
+        stmt = stmt.where(getattr(model, since_field) >= since)
+
+    engine = engine_for(region, read=True)
+    last_id = None
+    while True:
+        batch = stmt if last_id is None else stmt.where(model.id > last_id)
+        with engine.connect() as conn:
+            rows = conn.execute(batch).all()
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def encode(fields, batches, fmt="ndjson"):
+    """Encode batches of rows to bytes, one chunk per batch (CSV starts with a header)."""
+    if fmt == "ndjson":
+        for rows in batches:
+            yield "".join(dumps(dict(zip(fields, row))) + "\n" for row in rows).encode()
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header only: the table is empty
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(table, fmt="ndjson", since=None, region=None, batch_size=1000, compress=False):
+    """The whole export of a table as a generator of byte chunks."""
+    fields = EXPORTS[table][1]
+    chunks = encode(fields, iter_batches(table, since, region, batch_size), fmt)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,258 @@
+"""
+utils/hours.py
+
+"Open now" / "open late" filtering over the whole catalog without
+scanning it.
+
+HoursSnapshot precomputes a minute-of-week interval structure from the
+weekly hours (models/hours.py): the sorted breakpoints where any
+restaurant opens or closes, and for each segment between two breakpoints
+a packed bitset of the restaurants open during it. "Who is open at T" is
+a binary search plus one bitset unpack. Overnight spans are split at
+midnight and Sunday->Monday. The breakpoints are bounded by the distinct
+opening/closing times (a few hundred), not by the number of restaurants.
+
+Date exceptions (holidays, closures, special hours) are few, so they are
+applied on top: only restaurants with an exception on T's date (or the
+day before, for spans running past midnight) are re-checked one by one.
+
+Each region has one snapshot, in its REGIONS "timezone". Hours rows bump
+the catalog version like restaurant writes, so every process rebuilds its
+snapshot (two queries) once its catalog snapshot moves to the new
+version, and again each local day. When the catalog's change log shows
+no hours rows among the writes, the snapshot only takes the new version.
+"""
+
+import copy
+import datetime
+import threading
+from bisect import bisect_right
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from flask import current_app
+
+from models.hours import RestaurantHours, RestaurantHoursException, format_minute
+from utils.catalog import catalog
+from utils.projection import project
+from utils.regions import PerRegion, region_config, region_scope
+
+DAY = 24 * 60
+WEEK = 7 * DAY
+# When "late night" is asked before this time, it means the night already under way
+NIGHT_ENDS = 5 * 60
+LATE_NIGHT = 23 * 60 + 30
+# ?open= / criteria["open"] values
+OPEN_FILTERS = ("now", "late_night")
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def parse_minute(text):
+    """ "HH:MM" -> minutes after midnight ("24:00" allowed)."""
+    hours, minutes = text.strip().split(":")
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute <= DAY or not 0 <= int(minutes) < 60:
+        raise ValueError(f"Bad time: {text}")
+    return minute
+
+
+def parse_schedule(spec):
+    """
+    Weekly spans from text like "mon-thu 11:00-22:00, fri-sat 11:00-03:00".
+    Returns [(day_of_week, open_minute, close_minute)].
+    """
+    spans = []
+    for part in spec.lower().split(","):
+        days, times = part.split()
+        first, _, last = days.partition("-")
+        start, end = DAY_NAMES.index(first), DAY_NAMES.index(last or first)
+        opens, closes = (parse_minute(t) for t in times.split("-"))
+        day = start
+        while True:
+            spans.append((day, opens, closes))
+            if day == end:
+                break
+            day = (day + 1) % 7
+    return spans
+
+
+def week_intervals(day, open_minute, close_minute):
+    """[start, end) minute-of-week intervals of one weekly span."""
+    start = day * DAY + open_minute
+    end = day * DAY + close_minute
+    if close_minute <= open_minute:  # runs past midnight
+        end += DAY
+    if end <= WEEK:
+        return [(start, end)]
+    return [(start, WEEK), (0, end - WEEK)]
+
+
+def _open_in_spans(minute, spans, previous_spans):
+    """Open at `minute` of a day with `spans`, given the spans of the day before."""
+    for open_minute, close_minute in spans:
+        if close_minute > open_minute:
+            if open_minute <= minute < close_minute:
+                return True
+        elif minute >= open_minute:
+            return True
+    return any(close_minute <= open_minute and minute < close_minute
+               for open_minute, close_minute in previous_spans)
+
+
+class HoursSnapshot:
+    """Immutable interval index of one region's weekly hours plus exceptions."""
+
+    def __init__(self, weekly_rows, exception_rows, timezone, version=0, day=None):
+        self.timezone = timezone
+        self.version = version
+        self.day = day
+        # restaurant id -> day of week -> [(open, close)]
+        self.weekly = {}
+        for row in weekly_rows:
+            days = self.weekly.setdefault(row.restaurant_id, {})
+            days.setdefault(row.day_of_week, []).append((row.open_minute, row.close_minute))
+        # date -> restaurant id -> [(open, close)] ([] = closed all day)
+        self.exceptions = {}
+        for row in exception_rows:
+            spans = self.exceptions.setdefault(row.date, {}).setdefault(row.restaurant_id, [])
+            if row.open_minute is not None and row.close_minute is not None:
+                spans.append((row.open_minute, row.close_minute))
+
+        self.ids = np.asarray(sorted(self.weekly), dtype=np.int64)
+        column = {restaurant_id: i for i, restaurant_id in enumerate(self.ids.tolist())}
+        intervals = [
+            (start, end, column[restaurant_id])
+            for restaurant_id, days in self.weekly.items()
+            for day_of_week, spans in days.items()
+            for open_minute, close_minute in spans
+            for start, end in week_intervals(day_of_week, open_minute, close_minute)
+        ]
+        self.breakpoints = sorted({0, WEEK} | {t for start, end, _ in intervals for t in (start, end)})
+        index = {t: k for k, t in enumerate(self.breakpoints)}
+        # +1 where a span starts, -1 where it ends; running sum > 0 means open
+        delta = np.zeros((len(self.breakpoints), len(self.ids)), dtype=np.int16)
+        for start, end, col in intervals:
+            delta[index[start], col] += 1
+            delta[index[end], col] -= 1
+        self.open_bits = np.packbits(np.cumsum(delta, axis=0)[:-1] > 0, axis=1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def weekly_open_ids(self, minute_of_week):
+        """Ids open at a minute of the week (weekly hours only)."""
+        if not len(self.ids):
+            return set()
+        segment = bisect_right(self.breakpoints, minute_of_week % WEEK) - 1
+        row = np.unpackbits(self.open_bits[segment], count=len(self.ids)).astype(bool)
+        return set(self.ids[row].tolist())
+
+    def week_table(self, restaurant_id):
+        """[(day name, "11:00-03:00, ...")] Monday first, "Closed" on days without hours."""
+        days = self.weekly.get(restaurant_id)
+        if not days:
+            return []
+        return [
+            (DAY_NAMES[day].capitalize(),
+             ", ".join(f"{format_minute(o)}-{format_minute(c)}" for o, c in sorted(days.get(day, []))) or "Closed")
+            for day in range(7)
+        ]
+
+    def _day_spans(self, restaurant_id, date):
+        exception = self.exceptions.get(date, {}).get(restaurant_id)
+        if exception is not None:
+            return exception
+        return self.weekly.get(restaurant_id, {}).get(date.weekday(), [])
+
+    def is_open(self, restaurant_id, at):
+        """Open at local naive datetime `at`, exceptions included."""
+        minute = at.hour * 60 + at.minute
+        date = at.date()
+        return _open_in_spans(
+            minute,
+            self._day_spans(restaurant_id, date),
+            self._day_spans(restaurant_id, date - datetime.timedelta(days=1)),
+        )
+
+    def open_ids(self, at):
+        """Ids of restaurants open at local naive datetime `at`."""
+        open_ids = self.weekly_open_ids(at.weekday() * DAY + at.hour * 60 + at.minute)
+        date = at.date()
+        overridden = set(self.exceptions.get(date, ())) | set(
+            self.exceptions.get(date - datetime.timedelta(days=1), ())
+        )
+        for restaurant_id in overridden:
+            if self.is_open(restaurant_id, at):
+                open_ids.add(restaurant_id)
+            else:
+                open_ids.discard(restaurant_id)
+        return open_ids
+
+    def local_now(self):
+        return datetime.datetime.now(ZoneInfo(self.timezone)).replace(tzinfo=None)
+
+    def resolve(self, which, now=None):
+        """Local time meant by an OPEN_FILTERS value ("now" or "late_night")."""
+        now = now or self.local_now()
+        if which == "late_night" and now.hour * 60 + now.minute >= NIGHT_ENDS:
+            return now.replace(hour=LATE_NIGHT // 60, minute=LATE_NIGHT % 60, second=0, microsecond=0)
+        return now
+
+    def filter_positions(self, snapshot, positions, which, now=None):
+        """Catalog positions (None = all) of restaurants open at the time meant by `which`."""
+        open_positions = snapshot.positions_for(sorted(self.open_ids(self.resolve(which, now))))
+        if positions is None:
+            return open_positions
+        allowed = set(open_positions)
+        return [i for i in positions if i in allowed]
+
+
+def region_timezone(region):
+    return region_config(region).get("timezone") or current_app.config.get("DEFAULT_TIMEZONE", "UTC")
+
+
+# Tables whose writes change the intervals
+HOURS_TABLES = {RestaurantHours.__tablename__, RestaurantHoursException.__tablename__}
+
+
+class RegionHours:
+    """Holds one region's snapshot; rebuilt when the catalog version or the local day changes."""
+
+    def __init__(self, region):
+        self.region = region
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        # Follow the catalog snapshot the request already checked (peek), so
+        # no second version query; the catalog picks up hours writes too
+        region_catalog = catalog.for_region(self.region)
+        version = (region_catalog.peek() or region_catalog.get()).version
+        timezone = region_timezone(self.region)
+        today = datetime.datetime.now(ZoneInfo(timezone)).date()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version and snapshot.day == today:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not snapshot:  # another thread just rebuilt it
+                return self._snapshot
+            if snapshot is not None and snapshot.day == today:
+                current, changes = region_catalog.changes_since(snapshot.version)
+                if changes is not None and not changes.keys() & HOURS_TABLES:
+                    # No hours row changed: the same intervals under the new stamp
+                    moved = copy.copy(snapshot)
+                    moved.version = current
+                    self._snapshot = moved
+                    return moved
+            with region_scope(self.region, read_only=True):
+                weekly = project(RestaurantHours, ("restaurant_id", "day_of_week", "open_minute", "close_minute"))
+                exceptions = project(
+                    RestaurantHoursException, ("restaurant_id", "date", "open_minute", "close_minute"),
+                    RestaurantHoursException.date >= today - datetime.timedelta(days=1),
+                )
+            self._snapshot = HoursSnapshot(weekly, exceptions, timezone, version, today)
+            return self._snapshot
+
+
+# hours_index.get() returns the current region's snapshot
+hours_index = PerRegion(RegionHours)
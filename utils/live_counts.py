@@ -0,0 +1,232 @@
+"""
+utils/live_counts.py
+
+In-process pub/sub hub pushing live engagement counts to FYP viewers
+over Server-Sent Events (GET /api/fyp/live?ids=1,2,3).
+
+- Each stream subscribes to the posts its page is showing.
+- Likes, comments, shares and saves committed in this process mark their
+  post dirty (through data_changed). Nothing is read at that point.
+- Once per LIVE_TICK_SECONDS, one ticker thread re-reads the counts of
+  the dirty posts that someone is watching, in one query per region.
+  It pushes only the counters that changed since the last tick.
+  However many likes a viral post gets within a tick, each of its
+  viewers receives a single message for that tick.
+- Counts changed by other worker processes are picked up by re-reading
+  every watched post each LIVE_POLL_SECONDS.
+
+A stream only waits on a threading.Event between messages. Under
+gunicorn's gevent worker (the default in gunicorn.conf.py) that wait is
+a greenlet, so thousands of idle viewers cost no threads, and up to
+LIVE_MAX_SUBSCRIBERS streams are accepted. Under gthread each open
+stream holds one of the worker's few threads, so only
+LIVE_THREAD_STREAMS streams per worker are accepted (see stream_limit());
+past that the request gets a 503 and the page polls
+/api/fyp/live?poll=1 instead. Streams end after LIVE_STREAM_SECONDS and
+the browser's EventSource reconnects.
+"""
+
+import json
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from models.content import Content
+from utils.db import engine_for
+from utils.events import data_changed
+
+COUNT_FIELDS = ("likes_count", "comments_count", "shares_count", "saves_count")
+
+DEFAULTS = {
+    "LIVE_TICK_SECONDS": 0.5,
+    "LIVE_POLL_SECONDS": 5.0,
+    "LIVE_HEARTBEAT_SECONDS": 15.0,
+    "LIVE_STREAM_SECONDS": 300.0,
+    "LIVE_MAX_SUBSCRIBERS": 5000,
+    "LIVE_THREAD_STREAMS": 1,
+    "LIVE_ASYNC_WORKER": False,
+    "LIVE_MAX_IDS": 50,
+}
+
+
+def _config(app, key):
+    return app.config.get(key, DEFAULTS[key])
+
+
+def stream_limit(app):
+    """Open streams this process accepts: many on an async worker, a few when each holds a thread."""
+    if _config(app, "LIVE_ASYNC_WORKER"):
+        return _config(app, "LIVE_MAX_SUBSCRIBERS")
+    return _config(app, "LIVE_THREAD_STREAMS")
+
+
+def load_counts(region, ids):
+    """{content_id: {field: value}} for the given posts, on the region's read engine."""
+    stmt = select(Content.id, *[getattr(Content, field) for field in COUNT_FIELDS]).where(
+        Content.id.in_(list(ids))
+    )
+    with engine_for(region, read=True).connect() as conn:
+        return {row[0]: dict(zip(COUNT_FIELDS, row[1:])) for row in conn.execute(stmt)}
+
+
+def sse(event, payload):
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """One stream's watched posts and the updates waiting to be sent to it."""
+
+    def __init__(self, region, ids):
+        self.region = region
+        self.ids = frozenset(ids)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def push(self, content_id, changed):
+        with self._lock:
+            self._pending.setdefault(content_id, {}).update(changed)
+        self._ready.set()
+
+    def wait(self, timeout):
+        """Updates collected since the last call ({} after `timeout` seconds of quiet)."""
+        self._ready.wait(timeout)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._ready.clear()
+        return pending
+
+
+class LiveHub:
+    """Subscriptions per post, dirty posts and the ticker that fans counts out."""
+
+    def __init__(self):
+        self._subscribers = {}   # (region, content_id) -> set of Subscription
+        self._streams = set()    # every open Subscription
+        self._last = {}          # (region, content_id) -> counts last pushed
+        self._dirty = set()      # (region, content_id) changed since the last tick
+        self._lock = threading.Lock()
+        self._app = None
+        self._ticker = None
+        self._polled_at = 0.0
+        self.stats = {"ticks": 0, "queries": 0, "messages": 0}
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._streams)
+
+    def subscribe(self, region, ids, limit=None):
+        """Register a stream; returns (subscription, current counts), or None with `limit` streams open."""
+        sub = Subscription(region, ids)
+        with self._lock:
+            if limit is not None and len(self._streams) >= limit:
+                return None
+            self._streams.add(sub)
+        try:
+            counts = load_counts(region, sub.ids)
+        except Exception:
+            with self._lock:
+                self._streams.discard(sub)
+            raise
+        with self._lock:
+            if self._app is None:
+                self._app = current_app._get_current_object()
+            for content_id in sub.ids:
+                self._subscribers.setdefault((region, content_id), set()).add(sub)
+                if content_id in counts:
+                    self._last.setdefault((region, content_id), counts[content_id])
+            if self._ticker is None:
+                # Started on first use, so each gunicorn worker runs its own
+                self._ticker = threading.Thread(target=self._run, name="live-counts", daemon=True)
+                self._ticker.start()
+        return sub, counts
+
+    def unsubscribe(self, sub):
+        """Release a stream's slot (safe to call more than once)."""
+        with self._lock:
+            self._streams.discard(sub)
+            for content_id in sub.ids:
+                key = (sub.region, content_id)
+                subs = self._subscribers.get(key)
+                if subs is None:
+                    continue
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[key]
+                    self._last.pop(key, None)
+
+    def mark(self, region, ids):
+        """Note that posts changed; only watched ones are re-read on the next tick."""
+        with self._lock:
+            for content_id in ids:
+                key = (region, content_id)
+                if key in self._subscribers:
+                    self._dirty.add(key)
+
+    def tick(self, poll=False):
+        """Re-read dirty (or with `poll`, all watched) posts and push what changed."""
+        with self._lock:
+            keys = set(self._subscribers) if poll else self._dirty & set(self._subscribers)
+            self._dirty = set()
+        by_region = {}
+        for region, content_id in keys:
+            by_region.setdefault(region, set()).add(content_id)
+
+        self.stats["ticks"] += 1
+        for region, ids in by_region.items():
+            counts = load_counts(region, ids)
+            self.stats["queries"] += 1
+            with self._lock:
+                for content_id, values in counts.items():
+                    key = (region, content_id)
+                    last = self._last.get(key, {})
+                    changed = {field: value for field, value in values.items() if last.get(field) != value}
+                    if not changed or key not in self._subscribers:
+                        continue
+                    self._last[key] = values
+                    for sub in self._subscribers[key]:
+                        sub.push(content_id, changed)
+                        self.stats["messages"] += 1
+
+    def _run(self):
+        app = self._app
+        while True:
+            time.sleep(_config(app, "LIVE_TICK_SECONDS"))
+            poll = time.monotonic() - self._polled_at >= _config(app, "LIVE_POLL_SECONDS")
+            if poll:
+                self._polled_at = time.monotonic()
+            try:
+                with app.app_context():
+                    self.tick(poll)
+            except Exception as e:
+                # Keep ticking; the next poll catches up on anything missed
+                print(f"Error pushing live counts: {e}")
+
+    def stream(self, sub, counts):
+        """SSE messages for one subscription: current counts, then changes and heartbeats."""
+        app = self._app
+        heartbeat = _config(app, "LIVE_HEARTBEAT_SECONDS")
+        deadline = time.monotonic() + _config(app, "LIVE_STREAM_SECONDS")
+        try:
+            yield "retry: 3000\n\n"
+            yield sse("counts", [{"id": content_id, **values} for content_id, values in counts.items()])
+            while time.monotonic() < deadline:
+                pending = sub.wait(min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if pending:
+                    yield sse("counts", [{"id": content_id, **values} for content_id, values in pending.items()])
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(sub)
+
+
+live_hub = LiveHub()
+
+
+@data_changed.connect
+def _on_data_changed(sender, changes):
+    if changes.touches("content", COUNT_FIELDS):
+        live_hub.mark(changes.region, changes.tables.get("content", ()))
@@ -0,0 +1,223 @@
+"""
+utils/maintenance.py
+
+Database housekeeping used by maintenance.py:
+- archive_rows(): move old comments/reviews into a separate "cold"
+  SQLite archive file, a chunk per transaction
+- recount_comments() / recount_engagement(): recompute the denormalized
+  counters on content with set-based UPDATEs over id ranges
+- database_stats() / run_pragma(): VACUUM, ANALYZE, REINDEX and
+  PRAGMA optimize, with the file size before and after
+
+Every bulk step works in chunks with its own short transaction, so the
+SQLite write lock is released between chunks and the app keeps serving.
+The statements bypass the ORM, so each committed chunk is announced with
+notify() (utils/events.py) to refresh shared-cache entries and
+pre-rendered pages. All functions work on the current region's database
+(region_scope()).
+"""
+
+import os
+import time
+
+from sqlalchemy import create_engine, delete, func, insert, select, update
+
+from models.content import Content, ContentComment
+from models.engagement import EngagementEvent, EngagementRollup, EngagementWatermark
+from models.review import Review
+from utils.db import db, engine_for
+from utils.events import ChangeSet, notify
+
+# Tables that can be archived, with the column holding the row's age
+ARCHIVABLE = {
+    "comments": (ContentComment.__table__, ContentComment.__table__.c.created_at),
+    "reviews": (Review.__table__, Review.__table__.c.date),
+}
+
+# content counter column -> engagement metric
+ENGAGEMENT_COUNTERS = {"likes_count": "likes", "shares_count": "shares", "saves_count": "saves"}
+
+
+def database_path(engine=None):
+    """File path of a SQLite engine's database, or None."""
+    engine = engine or engine_for()
+    if engine.dialect.name != "sqlite":
+        return None
+    path = engine.url.database
+    return path if path and path != ":memory:" else None
+
+
+def file_size(path):
+    """Size of a SQLite database including its WAL file, in bytes."""
+    if path is None:
+        return 0
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def database_stats():
+    """Page counts for the primary database (SQLite only)."""
+    with engine_for().connect() as conn:
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        return {
+            "bytes": file_size(database_path()),
+            "pages": conn.exec_driver_sql("PRAGMA page_count").scalar(),
+            "free_bytes": conn.exec_driver_sql("PRAGMA freelist_count").scalar() * page_size,
+        }
+
+
+def run_pragma(statement):
+    """
+    Run a maintenance statement (VACUUM, ANALYZE, REINDEX, PRAGMA optimize)
+    outside a transaction. Returns (seconds, bytes reclaimed).
+    """
+    path = database_path()
+    with engine_for().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Fold the WAL back into the main file so both sizes are real
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        before = file_size(path)
+        start = time.perf_counter()
+        conn.exec_driver_sql(statement)
+        seconds = time.perf_counter() - start
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return seconds, before - file_size(path)
+
+
+def _id_ranges(table, chunk):
+    """(low, high) id ranges covering `table` in steps of `chunk`."""
+    with engine_for().connect() as conn:
+        low, high = conn.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, chunk):
+        yield start, start + chunk - 1
+
+
+def open_archive(path):
+    """Engine for the archive database, creating the archive tables if needed."""
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine, tables=[table for table, _ in ARCHIVABLE.values()])
+    return engine
+
+
+def archive_rows(kind, cutoff, archive_engine, chunk=1000, pause=0.0):
+    """
+    Move rows of `kind` ("comments" or "reviews") older than `cutoff` into
+    the archive, oldest first. Each chunk is copied into the archive and
+    committed there before it is deleted from the primary, so a crash
+    never loses rows; a re-run skips rows already archived (same ids).
+    Returns (rows moved, ids of content/restaurants affected).
+    """
+    table, age_column = ARCHIVABLE[kind]
+    parent = table.c.content_id if kind == "comments" else table.c.restaurant_id
+    moved, parents = 0, set()
+    while True:
+        with engine_for().begin() as conn:
+            rows = conn.execute(
+                select(table).where(age_column < cutoff).order_by(table.c.id).limit(chunk)
+            ).mappings().all()
+            if not rows:
+                break
+            rows = [dict(row) for row in rows]
+            with archive_engine.begin() as archive:
+                archive.execute(insert(table).prefix_with("OR IGNORE"), rows)
+            ids = [row["id"] for row in rows]
+            conn.execute(delete(table).where(table.c.id.in_(ids)))
+            changes = _archive_changes(conn, kind, rows)
+        notify(changes)
+        moved += len(rows)
+        parents.update(row[parent.key] for row in rows)
+        if len(rows) < chunk:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved, parents
+
+
+def _archive_changes(conn, kind, rows):
+    """ChangeSet for archived rows, with the restaurants whose pages showed them."""
+    table, _ = ARCHIVABLE[kind]
+    if kind == "reviews":
+        restaurant_ids = {row["restaurant_id"] for row in rows}
+    else:
+        content_ids = {row["content_id"] for row in rows}
+        restaurant_ids = set(conn.execute(
+            select(Content.restaurant_id).where(Content.id.in_(content_ids))
+        ).scalars())
+    return ChangeSet({table.name: {row["id"] for row in rows}}, restaurant_ids)
+
+
+def recount_comments(chunk=1000, content_ids=None):
+    """
+    Set content.comments_count to the number of comments on each post.
+    Returns the number of rows that changed.
+    """
+    content = Content.__table__
+    actual = (
+        select(func.count())
+        .where(ContentComment.__table__.c.content_id == content.c.id)
+        .scalar_subquery()
+    )
+    return _recount(content, {"comments_count": actual}, chunk, content_ids)
+
+
+def recount_engagement(chunk=1000, content_ids=None):
+    """
+    Set likes/shares/saves counts to the engagement history: the daily
+    rollups plus raw events not yet rolled up. Only meaningful once every
+    interaction has been recorded as an event. Returns rows changed.
+    """
+    content = Content.__table__
+    rollups = EngagementRollup.__table__
+    events = EngagementEvent.__table__
+    watermark = select(EngagementWatermark.rolled_until).where(EngagementWatermark.id == 1).scalar_subquery()
+    values = {}
+    for column, metric in ENGAGEMENT_COUNTERS.items():
+        rolled = (
+            select(func.coalesce(func.sum(rollups.c.count), 0))
+            .where(rollups.c.content_id == content.c.id, rollups.c.metric == metric,
+                   rollups.c.granularity == "day")
+            .scalar_subquery()
+        )
+        pending = (
+            select(func.coalesce(func.sum(events.c.delta), 0))
+            .where(events.c.content_id == content.c.id, events.c.metric == metric,
+                   (watermark.is_(None)) | (events.c.created_at >= watermark))
+            .scalar_subquery()
+        )
+        values[column] = rolled + pending
+    return _recount(content, values, chunk, content_ids)
+
+
+def _recount(content, values, chunk, content_ids):
+    """Apply `values` (column -> SQL expression) to content rows that differ, a chunk at a time."""
+    differs = None
+    for column, expression in values.items():
+        condition = func.coalesce(content.c[column], -1) != expression
+        differs = condition if differs is None else differs | condition
+
+    changed = 0
+    if content_ids is not None:
+        ids = sorted(content_ids)
+        batches = [content.c.id.in_(ids[i:i + chunk]) for i in range(0, len(ids), chunk)]
+    else:
+        batches = [content.c.id.between(low, high) for low, high in _id_ranges(content, chunk)]
+    for batch in batches:
+        with engine_for().begin() as conn:
+            # Ids first, so the commit can be announced for just these posts
+            rows = conn.execute(select(content.c.id, content.c.restaurant_id).where(batch, differs)).all()
+            if rows:
+                ids = [row.id for row in rows]
+                conn.execute(update(content).where(content.c.id.in_(ids)).values(values))
+        if rows:
+            changed += len(rows)
+            notify(ChangeSet({"content": set(ids)}, {row.restaurant_id for row in rows},
+                             columns={"content": values}))
+    return changed
+
+
+def table_counts():
+    """Row counts of the tables that grow over time."""
+    tables = [ContentComment.__table__, Review.__table__,
+              EngagementEvent.__table__, EngagementRollup.__table__]
+    with engine_for().connect() as conn:
+        return {t.name: conn.execute(select(func.count()).select_from(t)).scalar() for t in tables}
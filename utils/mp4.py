@@ -0,0 +1,248 @@
+"""
+utils/mp4.py
+
+Pure-Python MP4 box parsing for the FYP videos (no ffmpeg needed):
+- probe(path): duration, display size, byte size and whether the file
+  is "fast start" (moov before mdat)
+- fast_start(path): rewrite a file with its moov box moved in front of
+  the media data, fixing every chunk offset (stco/co64) to match
+
+Browsers cannot start playing an MP4 until they have the moov box (the
+sample tables). With moov at the end, the whole file has to download
+before the first frame; fast_start() fixes that.
+
+Only moov is read into memory; mdat is copied in blocks.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+from bisect import bisect_right
+from collections import namedtuple
+
+# Boxes on the path from moov down to the chunk offset tables
+CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+COPY_BLOCK = 1 << 20
+
+Box = namedtuple("Box", ("type", "offset", "size", "header"))
+
+
+class Mp4Error(ValueError):
+    """Not an MP4 file we can read."""
+
+
+def top_level_boxes(f):
+    """Box headers of an open file, in file order."""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    boxes, offset = [], 0
+    while offset < end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            raise Mp4Error(f"truncated box header at {offset}")
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:  # runs to the end of the file
+            size = end - offset
+        if size < header_size or offset + size > end:
+            raise Mp4Error(f"bad size for {box_type!r} box at {offset}")
+        boxes.append(Box(box_type, offset, size, header_size))
+        offset += size
+    return boxes
+
+
+def parse(data):
+    """
+    Split a box payload into [(type, children or raw box bytes)];
+    only CONTAINERS are descended into.
+    """
+    nodes, offset = [], 0
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header_size or offset + size > len(data):
+            raise Mp4Error(f"bad size for {box_type!r} box")
+        if box_type in CONTAINERS:
+            nodes.append((box_type, parse(data[offset + header_size:offset + size])))
+        else:
+            nodes.append((box_type, data[offset:offset + size]))
+        offset += size
+    return nodes
+
+
+def serialize(nodes):
+    out = []
+    for box_type, value in nodes:
+        if isinstance(value, list):
+            payload = serialize(value)
+            out.append(struct.pack(">I4s", 8 + len(payload), box_type) + payload)
+        else:
+            out.append(value)
+    return b"".join(out)
+
+
+def find(nodes, *path):
+    """Every box at `path` below `nodes` (e.g. find(moov, b"trak", b"tkhd"))."""
+    matches = [value for box_type, value in nodes if box_type == path[0]]
+    if len(path) == 1:
+        return matches
+    return [match for value in matches if isinstance(value, list) for match in find(value, *path[1:])]
+
+
+def _full_box(raw):
+    """(version, payload after version/flags) of a leaf full box."""
+    header_size = 16 if struct.unpack_from(">I", raw)[0] == 1 else 8
+    return raw[header_size], raw[header_size + 4:]
+
+
+def movie_info(moov):
+    """Duration (seconds) and display width/height of the first video track."""
+    info = {"duration": None, "width": None, "height": None}
+    for raw in find(moov, b"mvhd"):
+        version, body = _full_box(raw)
+        if version == 1:
+            timescale, duration = struct.unpack_from(">IQ", body, 16)
+        else:
+            timescale, duration = struct.unpack_from(">II", body, 8)
+        if timescale:
+            info["duration"] = round(duration / timescale, 3)
+
+    for trak in find(moov, b"trak"):
+        handlers = find(trak, b"mdia", b"hdlr")
+        if not handlers or _full_box(handlers[0])[1][4:8] != b"vide":
+            continue
+        version, body = _full_box(find(trak, b"tkhd")[0])
+        fixed = 32 if version == 1 else 20  # times, ids and duration
+        a, b = struct.unpack_from(">ii", body, fixed + 16)  # first matrix row
+        width, height = struct.unpack_from(">II", body, fixed + 16 + 36)
+        width, height = width >> 16, height >> 16
+        if a == 0 and abs(b) == 0x10000:  # rotated 90/270 degrees
+            width, height = height, width
+        info["width"], info["height"] = width, height
+        break
+    return info
+
+
+def probe(path):
+    """Metadata of an MP4 file: duration, width, height, bytes, fast_start."""
+    with open(path, "rb") as f:
+        boxes = top_level_boxes(f)
+        moov = next((box for box in boxes if box.type == b"moov"), None)
+        if moov is None:
+            raise Mp4Error("no moov box")
+        f.seek(moov.offset + moov.header)
+        nodes = parse(f.read(moov.size - moov.header))
+    info = movie_info(nodes)
+    info["bytes"] = os.path.getsize(path)
+    info["fast_start"] = _is_fast_start(boxes)
+    return info
+
+
+def _is_fast_start(boxes):
+    types = [box.type for box in boxes]
+    if b"mdat" not in types:
+        return True
+    return b"moov" in types and types.index(b"moov") < types.index(b"mdat")
+
+
+def _chunk_tables(moov):
+    """(stbl node list, index) of every stco/co64 box in the moov tree."""
+    return [(stbl, i) for stbl in find(moov, b"trak", b"mdia", b"minf", b"stbl")
+            for i, (box_type, _) in enumerate(stbl) if box_type in (b"stco", b"co64")]
+
+
+def _read_offsets(raw):
+    code = "Q" if raw[4:8] == b"co64" else "I"
+    count = struct.unpack_from(">I", raw, 12)[0]
+    return struct.unpack_from(f">{count}{code}", raw, 16)
+
+
+def _write_offsets(raw, offsets, wide):
+    """An stco (or co64 when `wide`) box holding `offsets`, keeping version/flags."""
+    code = "Q" if wide else "I"
+    payload = raw[8:12] + struct.pack(f">I{len(offsets)}{code}", len(offsets), *offsets)
+    return struct.pack(">I4s", 8 + len(payload), b"co64" if wide else b"stco") + payload
+
+
+def fast_start(path, output=None):
+    """
+    Move the moov box in front of the media data. Writes to `output`
+    (default: replaces `path` atomically). Returns False if the file
+    already starts with moov (nothing written), True otherwise.
+    """
+    with open(path, "rb") as f:
+        boxes = top_level_boxes(f)
+        if _is_fast_start(boxes):
+            return False
+        moov = next(box for box in boxes if box.type == b"moov")
+        f.seek(moov.offset + moov.header)
+        nodes = parse(f.read(moov.size - moov.header))
+
+        rest = [box for box in boxes if box is not moov]
+        split = next(i for i, box in enumerate(rest) if box.type == b"mdat")
+        order = rest[:split] + [moov] + rest[split:]
+        starts = [box.offset for box in rest]
+        tables = _chunk_tables(nodes)
+        originals = [_read_offsets(stbl[i][1]) for stbl, i in tables]
+
+        def build(moov_size, wide):
+            """The moov box for a layout where it takes `moov_size` bytes (None on 32-bit overflow)."""
+            new_start, position = {}, 0
+            for box in order:
+                new_start[box.offset] = position
+                position += moov_size if box is moov else box.size
+            for (stbl, i), offsets in zip(tables, originals):
+                moved = []
+                for offset in offsets:
+                    box = rest[bisect_right(starts, offset) - 1]
+                    moved.append(new_start[box.offset] + offset - box.offset)
+                if not wide and moved and max(moved) > 0xFFFFFFFF:
+                    return None
+                stbl[i] = (stbl[i][0], _write_offsets(stbl[i][1], moved, wide))
+            payload = serialize(nodes)
+            return struct.pack(">I4s", 8 + len(payload), b"moov") + payload
+
+        # The new moov size depends only on the table width, not the values;
+        # the first build measures it, the second uses it
+        for wide in (False, True):
+            moov_bytes = build(moov.size, wide)
+            if moov_bytes is not None:
+                moov_bytes = build(len(moov_bytes), wide)
+            if moov_bytes is not None:
+                break
+        else:
+            raise Mp4Error("could not lay out the moov box")
+
+        directory = os.path.dirname(os.path.abspath(output or path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".mp4")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for box in order:
+                    if box is moov:
+                        out.write(moov_bytes)
+                        continue
+                    f.seek(box.offset)
+                    remaining = box.size
+                    while remaining:
+                        block = f.read(min(COPY_BLOCK, remaining))
+                        if not block:
+                            raise Mp4Error("file changed while rewriting")
+                        out.write(block)
+                        remaining -= len(block)
+            shutil.copymode(path, tmp)
+            os.replace(tmp, output or path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    return True
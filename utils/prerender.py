@@ -0,0 +1,148 @@
+"""
+utils/prerender.py
+
+Static pre-rendering of read-heavy pages so nginx can serve them
+without touching Flask:
+- every restaurant profile: /restaurants/<id>
+- optionally the home page and the map (PRERENDER_EXTRA_PAGES)
+
+Pages are rendered through the app itself (a test client request), so
+the HTML is exactly what the live route returns, and written atomically
+to PRERENDER_DIR/<region>/<path>/index.html.
+
+With PRERENDER_ENABLED set, writes keep the files current: after a
+commit, only the affected pages are queued (the profiles of the changed
+restaurants; home and map too when restaurants or reviews changed) and
+re-rendered on a small background thread pool. A page whose restaurant
+is gone is deleted. prerender.py rebuilds everything in parallel
+across cores.
+
+Pages served from disk cannot show flash messages, and for a moment
+after a write nginx may still serve the previous version.
+
+Example nginx config (default region unless ?region= is given):
+
+    set $region philadelphia;
+    if ($arg_region) { set $region $arg_region; }
+    location / {
+        root /srv/halalspot/prerendered;
+        try_files /$region$uri/index.html @app;
+    }
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.events import data_changed
+from utils.projection import project
+
+EXTRA_PAGES = ("/", "/restaurants/map")
+
+
+def restaurant_path(restaurant_id):
+    return f"/restaurants/{restaurant_id}"
+
+
+def output_file(directory, region, path):
+    return os.path.join(directory, region, path.strip("/"), "index.html")
+
+
+def _write_atomic(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, filename)
+
+
+def render_page(app, region, path, client=None):
+    """
+    Render one page of `region` to disk. Returns "written", "removed"
+    (the page is gone) or "skipped" (any other non-200 response).
+    """
+    client = client or app.test_client()
+    response = client.get(path, query_string={"region": region})
+    filename = output_file(app.config["PRERENDER_DIR"], region, path)
+    if response.status_code == 404:
+        if os.path.exists(filename):
+            os.remove(filename)
+        return "removed"
+    if response.status_code != 200:
+        return "skipped"
+    _write_atomic(filename, response.get_data())
+    return "written"
+
+
+def site_paths(app, region):
+    """Every pre-rendered path of a region."""
+    from models.restaurant import Restaurant
+    from utils.regions import region_scope
+
+    with app.app_context(), region_scope(region, read_only=True):
+        ids = [r.id for r in project(Restaurant, ("id",), order_by=Restaurant.id)]
+    paths = [restaurant_path(restaurant_id) for restaurant_id in ids]
+    if app.config["PRERENDER_EXTRA_PAGES"]:
+        paths.extend(EXTRA_PAGES)
+    return paths
+
+
+class Regenerator:
+    """Queues pages to re-render and renders them on a thread pool, de-duplicated."""
+
+    def __init__(self, app):
+        self.app = app
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config["PRERENDER_WORKERS"], thread_name_prefix="prerender"
+        )
+
+    def schedule(self, region, paths):
+        for path in paths:
+            key = (region, path)
+            with self._lock:
+                if key in self._pending:
+                    continue  # already queued; it will render the latest data
+                self._pending.add(key)
+            self._executor.submit(self._render, key)
+
+    def _render(self, key):
+        with self._lock:
+            self._pending.discard(key)
+        try:
+            render_page(self.app, *key)
+        except Exception as e:
+            print(f"Error pre-rendering {key[1]} ({key[0]}): {e}")
+
+
+def affected_paths(app, changes):
+    """Pages whose output depends on the rows in a ChangeSet."""
+    paths = [restaurant_path(restaurant_id) for restaurant_id in sorted(changes.restaurant_ids)]
+    if app.config["PRERENDER_EXTRA_PAGES"] and (
+        changes.touches("restaurant") or changes.touches("review")
+    ):
+        paths.extend(EXTRA_PAGES)
+    return paths
+
+
+def init_prerender(app):
+    """Keep pre-rendered pages current on writes, if PRERENDER_ENABLED is set."""
+    app.config.setdefault("PRERENDER_ENABLED", False)
+    app.config.setdefault("PRERENDER_DIR", os.path.join(app.root_path, "prerendered"))
+    app.config.setdefault("PRERENDER_WORKERS", 2)
+    app.config.setdefault("PRERENDER_EXTRA_PAGES", True)
+    if not app.config["PRERENDER_ENABLED"]:
+        return
+
+    regenerator = Regenerator(app)
+    app.extensions["prerender"] = regenerator
+
+    def on_data_changed(sender, changes):
+        paths = affected_paths(app, changes)
+        if paths:
+            regenerator.schedule(changes.region, paths)
+
+    data_changed.connect(on_data_changed, sender=app, weak=False)
@@ -0,0 +1,214 @@
+"""
+utils/profiling.py
+
+Opt-in per-request profiling for finding slow routes in production.
+
+Nothing is registered unless PROFILE_ENABLED is set, so a disabled
+profiler costs nothing. When enabled, a request is profiled if
+- it carries a signed token (see profile_token.py) in the X-Profile
+  header or the `_profile` query parameter, or
+- it is picked by sampling 1 in PROFILE_SAMPLE_RATE requests.
+
+Two modes:
+- "cprofile": deterministic cProfile, written as a .pstats file
+  (open with `python -m pstats` or snakeviz)
+- "sampler": a background thread samples the request thread's stack
+  every PROFILE_SAMPLE_INTERVAL seconds, written as collapsed stacks
+  (.folded, one "frame;frame;frame count" line per stack) for
+  flamegraph.pl or speedscope
+
+Files go to PROFILE_DIR, named with the time, endpoint, duration and
+number of SQL statements; only the newest PROFILE_MAX_FILES are kept.
+The file name is also returned in the X-Profile-File response header.
+"""
+
+import cProfile
+import datetime
+import os
+import random
+import sys
+import threading
+import time
+
+from flask import g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+
+from utils.db import db
+
+MODES = ("cprofile", "sampler")
+TOKEN_HEADER = "X-Profile"
+TOKEN_PARAM = "_profile"
+TOKEN_SALT = "request-profile"
+
+DEFAULTS = {
+    "PROFILE_ENABLED": False,
+    "PROFILE_SAMPLE_RATE": 0,            # 1 in N requests; 0 = tokens only
+    "PROFILE_SAMPLE_MODE": "sampler",
+    "PROFILE_SAMPLE_INTERVAL": 0.005,    # seconds between stack samples
+    "PROFILE_DIR": "profiles",
+    "PROFILE_MAX_FILES": 200,
+    "PROFILE_TOKEN_MAX_AGE": 24 * 60 * 60,
+}
+
+# cProfile can only profile one request at a time per process
+_cprofile_lock = threading.Lock()
+
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+
+def make_token(app, mode="cprofile"):
+    """Signed token that turns on profiling for the requests carrying it."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+    return _serializer(app).dumps(mode)
+
+
+def _token_mode(app):
+    token = request.headers.get(TOKEN_HEADER) or request.args.get(TOKEN_PARAM)
+    if not token:
+        return None
+    try:
+        mode = _serializer(app).loads(token, max_age=app.config["PROFILE_TOKEN_MAX_AGE"])
+    except BadSignature:
+        return None
+    return mode if mode in MODES else None
+
+
+class StackSampler:
+    """Samples one thread's stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def _rotate(directory, max_files):
+    """Delete the oldest profiles beyond `max_files`."""
+    entries = [e for e in os.scandir(directory) if e.is_file()]
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _start(app, mode):
+    if mode == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            return  # another request is being profiled
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident(), app.config["PROFILE_SAMPLE_INTERVAL"])
+        profiler.start()
+    g.profile = {"mode": mode, "profiler": profiler, "sql": 0, "start": time.perf_counter()}
+
+
+def _finish(app, response=None):
+    state = g.pop("profile", None)
+    if state is None:
+        return None
+    profiler = state["profiler"]
+    if state["mode"] == "cprofile":
+        profiler.disable()
+        _cprofile_lock.release()
+    else:
+        profiler.stop()
+    elapsed_ms = (time.perf_counter() - state["start"]) * 1000
+
+    endpoint = (request.endpoint or "unknown").replace(".", "-")
+    extension = "pstats" if state["mode"] == "cprofile" else "folded"
+    name = (
+        f"{datetime.datetime.utcnow():%Y%m%d-%H%M%S-%f}-{endpoint}-{elapsed_ms:.0f}ms"
+        f"-{state['sql']}sql-{os.getpid()}.{extension}"
+    )
+    directory = app.config["PROFILE_DIR"]
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        if state["mode"] == "cprofile":
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
+        _rotate(directory, app.config["PROFILE_MAX_FILES"])
+    except OSError as e:
+        print(f"Error writing profile {name}: {e}")
+        return None
+    if response is not None:
+        response.headers["X-Profile-File"] = name
+    return name
+
+
+def _count_sql(conn, cursor, statement, parameters, context, executemany):
+    state = g.get("profile") if g else None
+    if state is not None:
+        state["sql"] += 1
+
+
+def init_profiling(app):
+    """Register the profiling hooks, only if PROFILE_ENABLED is set."""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    if not app.config["PROFILE_ENABLED"]:
+        return
+    if not os.path.isabs(app.config["PROFILE_DIR"]):
+        app.config["PROFILE_DIR"] = os.path.join(app.root_path, app.config["PROFILE_DIR"])
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _count_sql)
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint == "static":
+            return
+        mode = _token_mode(app)
+        rate = app.config["PROFILE_SAMPLE_RATE"]
+        if mode is None and rate and random.randrange(rate) == 0:
+            mode = app.config["PROFILE_SAMPLE_MODE"]
+        if mode is not None:
+            _start(app, mode)
+
+    @app.after_request
+    def finish_profile(response):
+        _finish(app, response)
+        return response
+
+    @app.teardown_request
+    def abandon_profile(exc):
+        # Requests that raised never reach after_request
+        _finish(app)
@@ -0,0 +1,85 @@
+"""
+utils/projection.py
+
+Column-projected reads.
+Each route declares the fields it needs; only those columns are selected
+and rows come back as small namedtuple DTOs instead of identity-mapped
+ORM objects. Use `rows_to_dicts()` / `json_response()` to serialize them.
+"""
+
+import datetime
+import json
+from collections import namedtuple
+from functools import lru_cache
+
+from flask import Response
+from sqlalchemy import func, select
+
+from utils.db import db
+
+try:  # optional, much faster JSON encoder
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def dto_class(model, fields):
+    """Namedtuple class for a (model, fields) projection, built once."""
+    return namedtuple(f"{model.__name__}Row", fields)
+
+
+def project(model, fields, *criteria, order_by=None):
+    """
+    Select only `fields` of `model`, filtered by `criteria`.
+    Returns a list of namedtuple rows.
+    """
+    fields = tuple(fields)
+    make_row = dto_class(model, fields)._make
+    stmt = select(*[getattr(model, f) for f in fields])
+    if criteria:
+        stmt = stmt.where(*criteria)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    return [make_row(row) for row in db.session.execute(stmt)]
+
+
+def rows_to_dicts(rows):
+    return [row._asdict() for row in rows]
+
+
+def rating_summaries(restaurant_ids=None):
+    """
+    Average rating and review count per restaurant in a single query.
+    Returns {restaurant_id: (avg_rating, review_count)}; the average is not
+    rounded, so filters compare the exact value (round it for display).
+    """
+    from models.review import Review
+
+    stmt = select(
+        Review.restaurant_id, func.avg(Review.rating), func.count(Review.id)
+    ).group_by(Review.restaurant_id)
+    if restaurant_ids is not None:
+        stmt = stmt.where(Review.restaurant_id.in_(list(restaurant_ids)))
+    return {
+        restaurant_id: (avg, count)
+        for restaurant_id, avg, count in db.session.execute(stmt)
+    }
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Serialize to a compact JSON string, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default).decode()
+    return json.dumps(payload, default=_default, separators=(",", ":"))
+
+
+def json_response(payload, status=200):
+    """Fast-path replacement for jsonify() on large payloads."""
+    return Response(dumps(payload), status=status, mimetype="application/json")
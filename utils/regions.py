@@ -0,0 +1,208 @@
+"""
+utils/regions.py
+
+Region partitioning. Each region (city) keeps its restaurants, reviews,
+content and engagement data in its own SQLite file:
+- the default region (DEFAULT_REGION) lives in SQLALCHEMY_DATABASE_URI
+- every other region in REGIONS gets its own primary and read-only
+  binds (default file: regions/<slug>.db)
+Separate files mean separate write locks and WALs, so heavy writes in
+one region never hold up reads in another.
+
+The region of a request comes from ?region=, the X-Region header or the
+visitor's last choice (kept in the session), else the default.
+RoutingSession (utils/db.py) sends every query to the current region.
+
+- region_scope(slug) switches region for a block of code (scripts,
+  column-only cache loads); do not load ORM objects from two regions
+  into one session, since ids overlap between regions
+- PerRegion(factory) keeps one cache/index per region, so each warms
+  and invalidates independently
+- fan_out(fn) runs fn(region) for every region on a thread pool, each
+  in its own app context and session, for cross-region reads
+"""
+
+import contextvars
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from flask import current_app, g, request, session
+
+_current = contextvars.ContextVar("region", default=None)
+_read_only = contextvars.ContextVar("region_read_only", default=False)
+
+SESSION_KEY = "region"
+ALL_REGIONS = "all"
+
+
+def current_region():
+    """Slug of the region the current code runs against."""
+    return _current.get() or current_app.config["DEFAULT_REGION"]
+
+
+def read_only_scope():
+    """True inside region_scope(..., read_only=True) (used outside requests)."""
+    return _read_only.get()
+
+
+@contextmanager
+def region_scope(region, read_only=False):
+    """Run a block against `region`."""
+    token = _current.set(region)
+    read_token = _read_only.set(read_only)
+    try:
+        yield region
+    finally:
+        _read_only.reset(read_token)
+        _current.reset(token)
+
+
+def region_names():
+    return list(current_app.config["REGIONS"])
+
+
+def region_config(region=None):
+    return current_app.config["REGIONS"][region or current_region()]
+
+
+def region_for_text(text):
+    """
+    (region, keyword) for the first region keyword found in `text`,
+    longest keywords first ("west philly" before "philly"); else (None, None).
+    """
+    text = text.lower()
+    keywords = [
+        (keyword.lower(), region)
+        for region, conf in current_app.config["REGIONS"].items()
+        for keyword in conf.get("keywords", ())
+    ]
+    for keyword, region in sorted(keywords, key=lambda k: -len(k[0])):
+        if keyword in text:
+            return region, keyword
+    return None, None
+
+
+def configure_regions(app):
+    """
+    Load REGIONS (plus REGIONS_FILE, a JSON object of the same shape) and
+    register a primary and read bind per extra region. Call after
+    configure_read_bind() and before db.init_app().
+    """
+    from utils.db import bind_key_for, read_uri_for
+
+    regions = dict(app.config.get("REGIONS") or {})
+    regions_file = app.config.get("REGIONS_FILE")
+    if regions_file:
+        with open(regions_file) as f:
+            regions.update(json.load(f))
+    default = app.config.setdefault("DEFAULT_REGION", "philadelphia")
+    regions.setdefault(default, {"name": default.title()})
+    app.config["REGIONS"] = regions
+
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    with app.app_context():
+        for slug, conf in regions.items():
+            if slug == default:
+                continue
+            uri = conf.get("database_url")
+            if not uri:
+                os.makedirs(app.config["REGIONS_DIR"], exist_ok=True)
+                uri = "sqlite:///" + os.path.join(app.config["REGIONS_DIR"], f"{slug}.db")
+            binds[bind_key_for(slug)] = uri
+            read_uri = conf.get("read_database_url") or read_uri_for(uri)
+            if read_uri and app.config.get("SQLALCHEMY_READ_ROUTING", True):
+                binds[bind_key_for(slug, read=True)] = read_uri
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def init_regions(app):
+    """Create each extra region's tables and pick the region per request."""
+    from utils.db import add_missing_columns, bind_key_for, db
+
+    with app.app_context():
+        for slug in region_names():
+            if slug != app.config["DEFAULT_REGION"]:
+                engine = db.engines[bind_key_for(slug)]
+                db.metadata.create_all(engine)
+                add_missing_columns(engine)
+
+    @app.before_request
+    def select_region():
+        regions = app.config["REGIONS"]
+        choice = request.args.get("region") or request.headers.get("X-Region")
+        if choice in regions and session.get(SESSION_KEY) != choice:
+            session[SESSION_KEY] = choice
+        region = choice if choice in regions else session.get(SESSION_KEY)
+        g.region_token = _current.set(region if region in regions else app.config["DEFAULT_REGION"])
+
+    @app.teardown_request
+    def reset_region(exc):
+        token = g.pop("region_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    @app.context_processor
+    def region_context():
+        return {"current_region": current_region(), "regions": app.config["REGIONS"]}
+
+
+class PerRegion:
+    """
+    One instance of `factory(region)` per region. Attribute access is
+    forwarded to the current region's instance, so callers keep using
+    e.g. catalog.get(); for_region(slug) reaches a specific one.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def for_region(self, region=None):
+        region = region or current_region()
+        instance = self._instances.get(region)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.setdefault(region, self._factory(region))
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self.for_region(), name)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    # Created on first use, so each gunicorn worker gets its own threads
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("REGION_FANOUT_WORKERS", 8),
+                    thread_name_prefix="region",
+                )
+    return _executor
+
+
+def fan_out(fn, regions=None):
+    """
+    Call fn(region) for each region (default: all) in parallel, read-only.
+    Returns {region: result} in region order.
+    """
+    regions = list(regions or region_names())
+    app = current_app._get_current_object()
+
+    def run(region):
+        with app.app_context(), region_scope(region, read_only=True):
+            return fn(region)
+
+    if len(regions) == 1:
+        return {regions[0]: run(regions[0])}
+    futures = {region: _pool().submit(run, region) for region in regions}
+    return {region: future.result() for region, future in futures.items()}
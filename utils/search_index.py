@@ -0,0 +1,324 @@
+"""
+utils/search_index.py
+
+TF-IDF retrieval index used by the chatbot to rank restaurants.
+
+Each restaurant is one document: its name, cuisine and description plus
+the titles and descriptions of its Content posts. Term weights are
+(1 + log tf) * idf, L2-normalized per document, and kept as NumPy
+posting lists (term -> doc indices, weights), so a query is a couple of
+array slices and one np.bincount over the matching postings.
+
+Updates are incremental: changed documents are re-tokenized into a
+small delta of postings weighted with the current idf, their old
+postings are masked out, and queries add both. The delta is folded into
+fresh postings (recomputing idf) once it passes SEARCH_DELTA_LIMIT
+documents.
+
+Each region has its own index. Restaurant writes and post text edits in
+any worker bump the catalog version stamp and log the restaurants they
+touched (utils/catalog.py); when the stamp moves, the index reloads just
+those documents (two queries), and rebuilds whole only when the log
+cannot list them.
+"""
+
+import re
+import threading
+
+import numpy as np
+from flask import current_app
+
+from utils.catalog import catalog
+from utils.regions import PerRegion, region_scope
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens with a light plural strip (kabobs -> kabob)."""
+    tokens = []
+    for token in TOKEN_RE.findall((text or "").lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class _Postings:
+    """Posting lists of the documents folded in at the last rebuild."""
+
+    def __init__(self, idf, indptr, docs, weights):
+        self.idf = idf
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+
+
+class _View:
+    """What a query reads; replaced whole after each update."""
+
+    __slots__ = ("doc_ids", "vocab", "idf", "base", "dead", "delta_docs", "delta_terms", "delta_weights")
+
+    def __init__(self, doc_ids, vocab, idf, base, dead, delta_docs, delta_terms, delta_weights):
+        self.doc_ids = doc_ids          # doc index -> external id (-1 once removed)
+        self.vocab = vocab
+        self.idf = idf                  # per term, including terms new since the base
+        self.base = base
+        self.dead = dead                # doc indices whose base postings are out of date
+        self.delta_docs = delta_docs    # postings of documents changed since the base
+        self.delta_terms = delta_terms
+        self.delta_weights = delta_weights
+
+
+class TfidfIndex:
+    """Sparse TF-IDF index over documents keyed by an integer id."""
+
+    def __init__(self, delta_limit=1000):
+        self.delta_limit = delta_limit
+        self._lock = threading.Lock()
+        self._doc_ids = np.zeros(0, dtype=np.int64)  # doc index -> external id (-1 once removed)
+        self._doc_index = {}      # external id -> doc index
+        self._vocab = {}          # term -> term index
+        # (doc, term, tf) triplets of the documents in the base postings
+        self._t_doc = np.zeros(0, dtype=np.int32)
+        self._t_term = np.zeros(0, dtype=np.int32)
+        self._t_tf = np.zeros(0, dtype=np.float32)
+        self._delta = {}          # doc index -> (terms, tfs) of documents changed since the base
+        self._dead = set()        # doc indices whose base triplets are out of date
+        self._base = None
+        self._view = None
+        self._fold()
+
+    def __len__(self):
+        return len(self._doc_index)
+
+    def update(self, documents):
+        """Add or replace documents (`documents` maps id -> text)."""
+        with self._lock:
+            new_ids = []
+            for doc_id, text in documents.items():
+                idx = self._doc_index.get(doc_id)
+                if idx is None:
+                    idx = len(self._doc_ids) + len(new_ids)
+                    new_ids.append(doc_id)
+                    self._doc_index[doc_id] = idx
+                else:
+                    self._dead.add(idx)
+                counts = {}
+                for token in tokenize(text):
+                    counts[token] = counts.get(token, 0) + 1
+                terms = [self._vocab.setdefault(token, len(self._vocab)) for token in counts]
+                self._delta[idx] = (np.asarray(terms, dtype=np.int32),
+                                    np.asarray(list(counts.values()), dtype=np.float32))
+            if new_ids:
+                self._doc_ids = np.concatenate([self._doc_ids, np.asarray(new_ids, dtype=np.int64)])
+            self._publish()
+
+    def remove(self, doc_ids):
+        with self._lock:
+            indices = [self._doc_index.pop(doc_id) for doc_id in doc_ids if doc_id in self._doc_index]
+            if not indices:
+                return
+            # Copied, so views already handed out keep their ids
+            self._doc_ids = self._doc_ids.copy()
+            self._doc_ids[indices] = -1
+            for idx in indices:
+                self._dead.add(idx)
+                self._delta.pop(idx, None)
+            self._publish()
+
+    def rebuild(self):
+        """Fold the changed documents into fresh base postings (recomputes idf)."""
+        with self._lock:
+            self._fold()
+
+    def _delta_triplets(self):
+        docs = [np.full(len(terms), idx, dtype=np.int32) for idx, (terms, _) in self._delta.items()]
+        terms = [terms for terms, _ in self._delta.values()]
+        tfs = [tfs for _, tfs in self._delta.values()]
+        if not docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(docs), np.concatenate(terms), np.concatenate(tfs)
+
+    def _publish(self):
+        if len(self._delta) + len(self._dead) > self.delta_limit:
+            self._fold()
+            return
+        base = self._base
+        d_doc, d_term, d_tf = self._delta_triplets()
+        idf = base.idf
+        if len(self._vocab) > len(idf):
+            # Terms first seen since the base: idf from the changed documents
+            df = np.bincount(d_term, minlength=len(self._vocab))[len(idf):].astype(np.float32)
+            n_docs = max(len(self._doc_index), 1)
+            idf = np.concatenate([idf, np.log((1 + n_docs) / (1 + df)) + 1])
+        # Changed documents are weighted with the base idf, L2-normalized per document
+        weights = (1 + np.log(d_tf)) * idf[d_term]
+        if len(weights):
+            _, owner = np.unique(d_doc, return_inverse=True)
+            weights = weights / np.sqrt(np.bincount(owner, weights=weights * weights))[owner]
+        self._view = _View(
+            doc_ids=self._doc_ids,
+            vocab=dict(self._vocab),
+            idf=idf,
+            base=base,
+            dead=np.fromiter(self._dead, dtype=np.int64, count=len(self._dead)),
+            delta_docs=d_doc,
+            delta_terms=d_term,
+            delta_weights=weights.astype(np.float32),
+        )
+
+    def _fold(self):
+        """Merge the delta into the triplets and recompute idf, weights and postings."""
+        if self._dead or self._delta:
+            dead = np.zeros(len(self._doc_ids), dtype=bool)
+            dead[list(self._dead)] = True
+            keep = ~dead[self._t_doc]
+            d_doc, d_term, d_tf = self._delta_triplets()
+            self._t_doc = np.concatenate([self._t_doc[keep], d_doc])
+            self._t_term = np.concatenate([self._t_term[keep], d_term])
+            self._t_tf = np.concatenate([self._t_tf[keep], d_tf])
+            self._delta, self._dead = {}, set()
+
+        n_docs = max(len(self._doc_index), 1)
+        n_terms = len(self._vocab)
+        df = np.bincount(self._t_term, minlength=n_terms).astype(np.float32)
+        idf = np.log((1 + n_docs) / (1 + df)) + 1
+
+        weights = (1 + np.log(self._t_tf)) * idf[self._t_term]
+        norms = np.sqrt(np.bincount(self._t_doc, weights=weights * weights, minlength=len(self._doc_ids)))
+        if len(weights):
+            weights = weights / norms[self._t_doc]
+
+        order = np.argsort(self._t_term, kind="stable")
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._t_term, minlength=n_terms), out=indptr[1:])
+        self._base = _Postings(
+            idf=idf,
+            indptr=indptr,
+            docs=self._t_doc[order],
+            weights=weights[order].astype(np.float32),
+        )
+        empty = np.zeros(0, dtype=np.int32)
+        self._view = _View(self._doc_ids, dict(self._vocab), idf, self._base,
+                           np.zeros(0, dtype=np.int64), empty, empty, np.zeros(0, dtype=np.float32))
+
+    def search(self, terms, limit=None):
+        """
+        Rank documents by cosine similarity to the query terms.
+        `terms` is a list of keywords/phrases (e.g. from parse_query()).
+        Returns [(id, score)] with score > 0, best first.
+        """
+        view = self._view
+        query = {}
+        for phrase in terms:
+            for token in tokenize(phrase):
+                term = view.vocab.get(token)
+                if term is not None:
+                    query[term] = 1.0
+        if not query:
+            return []
+
+        term_idx = np.sort(np.fromiter(query, dtype=np.int64))
+        q_weights = view.idf[term_idx]
+        q_weights = q_weights / np.linalg.norm(q_weights)
+
+        # Base postings, with replaced and removed documents zeroed
+        p = view.base
+        in_base = term_idx < len(p.idf)
+        scores = np.zeros(len(view.doc_ids))
+        if in_base.any():
+            starts, ends = p.indptr[term_idx[in_base]], p.indptr[term_idx[in_base] + 1]
+            docs = np.concatenate([p.docs[s:e] for s, e in zip(starts, ends)])
+            weights = np.concatenate(
+                [p.weights[s:e] * w for s, e, w in zip(starts, ends, q_weights[in_base])]
+            )
+            scores += np.bincount(docs, weights=weights, minlength=len(view.doc_ids))
+        if len(view.dead):
+            scores[view.dead] = 0
+
+        # Plus the current postings of documents changed since the base
+        if len(view.delta_terms):
+            hit = np.isin(view.delta_terms, term_idx)
+            if hit.any():
+                q_delta = q_weights[np.searchsorted(term_idx, view.delta_terms[hit])]
+                scores += np.bincount(view.delta_docs[hit], weights=view.delta_weights[hit] * q_delta,
+                                      minlength=len(view.doc_ids))
+
+        hits = np.flatnonzero(scores > 0)
+        if limit is not None and len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(view.doc_ids[i]), float(scores[i])) for i in hits]
+
+
+def load_restaurant_documents(restaurant_ids=None):
+    """
+    Build the document text for restaurants (all, or the given ids)
+    from the restaurant row and its content posts. Two queries.
+    """
+    from models.content import Content
+    from models.restaurant import Restaurant
+    from utils.projection import project
+
+    restaurant_filter = [] if restaurant_ids is None else [Restaurant.id.in_(restaurant_ids)]
+    documents = {
+        r.id: [r.name or "", r.cuisine or "", r.description or ""]
+        for r in project(Restaurant, ("id", "name", "cuisine", "description"), *restaurant_filter)
+    }
+    content_filter = [Content.restaurant_id.isnot(None)]
+    if restaurant_ids is not None:
+        content_filter.append(Content.restaurant_id.in_(restaurant_ids))
+    for c in project(Content, ("restaurant_id", "title", "description"), *content_filter):
+        if c.restaurant_id in documents:
+            documents[c.restaurant_id] += [c.title or "", c.description or ""]
+    return {doc_id: " ".join(parts) for doc_id, parts in documents.items()}
+
+
+class RestaurantSearchIndex:
+    """
+    One region's restaurant TF-IDF index, built lazily on first search.
+    When the catalog version moves, only the restaurants logged since the
+    index's version are reloaded.
+    """
+
+    def __init__(self, region):
+        self.region = region
+        self.index = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        # Follow the catalog snapshot the request already checked (peek), so
+        # the index matches the rows it is mapped onto and costs no extra query
+        region_catalog = catalog.for_region(self.region)
+        version = (region_catalog.peek() or region_catalog.get()).version
+        if self.index is not None and self.version == version:
+            return self.index
+        with self._lock, region_scope(self.region):
+            if self.index is not None and self.version != version:
+                version, changes = region_catalog.changes_since(self.version)
+                if changes is not None:
+                    self._reload(changes.get("restaurant", set()) | changes.get("content", set()))
+                    self.version = version
+                    return self.index
+            if self.index is None or self.version != version:
+                index = TfidfIndex(current_app.config.get("SEARCH_DELTA_LIMIT", 1000))
+                index.update(load_restaurant_documents())
+                index.rebuild()
+                self.index, self.version = index, version
+        return self.index
+
+    def _reload(self, restaurant_ids):
+        """Re-read the documents of changed restaurants (two queries)."""
+        if not restaurant_ids:
+            return
+        documents = load_restaurant_documents(restaurant_ids)
+        self.index.remove([doc_id for doc_id in restaurant_ids if doc_id not in documents])
+        self.index.update(documents)
+
+    def search(self, terms, limit=None):
+        return self.refresh().search(terms, limit=limit)
+
+
+restaurant_index = PerRegion(RestaurantSearchIndex)
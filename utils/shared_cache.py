@@ -0,0 +1,312 @@
+"""
+utils/shared_cache.py
+
+Cache tier shared by every gunicorn worker on a host (or, with Redis, by
+every host), for results that are expensive to compute and the same for
+all requests: rating summaries, the reviews page, the FYP feed, restaurant
+profile data.
+
+    ratings = cached("ratings", rating_summaries, tags=("review",))
+
+- Values are pickled into a backend with a Redis-style interface
+  (get / mget / set(ex=, nx=) / delete). SQLiteBackend is a local file
+  store (WAL, memory-mapped) and is the default, at
+  instance/shared_cache.db with 0600 permissions; a file owned by another
+  user is refused. A redis:// URL uses a Redis server through redis-py
+  if it is installed.
+- Entries expire after SHARED_CACHE_TTL seconds (or a per-call `ttl`).
+- Tags: each entry records the version of its tags when it was computed.
+  A write to a restaurant, review or content row (data_changed) replaces
+  the versions of its table's tag and of "restaurant:<id>", so every
+  worker misses on its next read. The writer does not need to know which
+  keys exist.
+- Single-flight: on a miss, one caller takes a short lock key and
+  computes; the others wait up to SHARED_CACHE_WAIT_SECONDS for its
+  result instead of all hitting the database at once.
+
+Keys and tags are namespaced by region and database, so regions (and
+test databases) never share entries. If the backend fails, the value is
+computed directly. SHARED_CACHE_URL=none turns the tier off.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import stat
+import threading
+import time
+
+from flask import current_app
+
+from utils.db import engine_for
+from utils.events import data_changed
+from utils.regions import current_region
+
+try:  # optional, for SHARED_CACHE_URL=redis://...
+    import redis
+except ImportError:
+    redis = None
+
+DEFAULTS = {
+    "SHARED_CACHE_URL": "",
+    "SHARED_CACHE_TTL": 300,
+    "SHARED_CACHE_LOCK_SECONDS": 30,
+    "SHARED_CACHE_WAIT_SECONDS": 5.0,
+}
+# Tags outlive any entry; a tag that expired anyway reads as a miss
+TAG_TTL = 7 * 24 * 3600
+# Tables whose writes invalidate their tag
+TAGGED_TABLES = ("restaurant", "review", "content")
+# Interval between polls while another caller computes a value
+POLL_SECONDS = 0.01
+
+
+def secure_file(path):
+    """
+    Create `path` readable and writable only by this user, or check an
+    existing one is ours and not writable by others. Values are unpickled,
+    so a file someone else can write would let them run code in the app.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid():
+        raise RuntimeError(f"Shared cache file {path} is not a regular file owned by this user")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise RuntimeError(f"Shared cache file {path} is writable by other users")
+
+
+class SQLiteBackend:
+    """Redis-style key/value store in a local SQLite file shared by every process on the host."""
+
+    PURGE_EVERY = 500  # sets between deletions of expired keys
+
+    def __init__(self, path, mmap_size=64 * 1024 * 1024):
+        secure_file(path)
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._sets = 0
+        self._conn()  # create the table up front
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                         "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, name):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (name, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def mget(self, names):
+        names = list(names)
+        if not names:
+            return []
+        rows = dict(self._conn().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(names))}) "
+            "AND (expires IS NULL OR expires > ?)",
+            (*names, time.time()),
+        ).fetchall())
+        return [rows.get(name) for name in names]
+
+    def set(self, name, value, ex=None, nx=False):
+        """Store `value` (expiring after `ex` seconds). With `nx`, only if the key is absent."""
+        now = time.time()
+        expires = now + ex if ex else None
+        conn = self._conn()
+        if nx:
+            # Insert, or take over a key that has expired
+            cursor = conn.execute(
+                "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+                "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+                (name, value, expires, now),
+            )
+            return cursor.rowcount > 0
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                     (name, value, expires))
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        return True
+
+    def delete(self, *names):
+        if not names:
+            return 0
+        cursor = self._conn().execute(
+            f"DELETE FROM cache WHERE key IN ({','.join('?' * len(names))})", names
+        )
+        return cursor.rowcount
+
+
+def open_backend(url, default_path):
+    """Backend for a SHARED_CACHE_URL: "" (`default_path`), a path or sqlite:/// URL, redis://, or "none"."""
+    if url == "none":
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if redis is not None:
+            return redis.Redis.from_url(url)
+        print("SHARED_CACHE_URL is a Redis URL but redis is not installed; using a local file")
+        url = ""
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteBackend(url or default_path)
+
+
+def lock_key(key):
+    return "lock:" + key
+
+
+class SharedCache:
+    """get_or_compute() with TTLs, tag versions and single-flight over a backend."""
+
+    def __init__(self, backend, ttl=300, lock_seconds=30, wait_seconds=5.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.stats = {"hits": 0, "misses": 0, "computed": 0, "waited": 0, "errors": 0}
+
+    def _tag_versions(self, tags):
+        """Current versions of `tags`, creating the missing ones."""
+        versions = self.backend.mget(tags)
+        for i, tag in enumerate(tags):
+            if versions[i] is None:
+                self.backend.set(tag, os.urandom(8), ex=TAG_TTL, nx=True)
+                versions[i] = self.backend.get(tag)
+        return versions
+
+    def _lookup(self, key, tags):
+        """(True, value) if a fresh entry exists, else (False, None)."""
+        raw = self.backend.get(key)
+        if raw is None:
+            return False, None
+        versions, value = pickle.loads(raw)
+        if tags and versions != self.backend.mget(tags):
+            return False, None
+        return True, value
+
+    def _wait_or_lock(self, key, tags):
+        """(True, value) once another caller has stored `key`, else (False, whether we hold the lock)."""
+        lock = lock_key(key)
+        deadline = time.monotonic() + self.wait_seconds
+        while not self.backend.set(lock, b"1", ex=self.lock_seconds, nx=True):
+            # Someone else is computing it
+            time.sleep(POLL_SECONDS)
+            found, value = self._lookup(key, tags)
+            if found:
+                return True, value
+            if time.monotonic() >= deadline:
+                return False, False  # compute it ourselves, without the lock
+        return False, True
+
+    def get_or_compute(self, key, compute, ttl=None, tags=()):
+        """Cached value of `key`, or compute() stored for `ttl` seconds under `tags`."""
+        tags = list(tags)
+        try:
+            found, value = self._lookup(key, tags)
+            if found:
+                self.stats["hits"] += 1
+                return value
+            self.stats["misses"] += 1
+            found, value = self._wait_or_lock(key, tags)
+            if found:
+                self.stats["waited"] += 1
+                return value
+            locked = value
+            # Versions read before computing: a write during compute() leaves the entry stale
+            versions = self._tag_versions(tags)
+        except Exception as e:
+            print(f"Shared cache error reading {key}: {e}")
+            self.stats["errors"] += 1
+            return compute()
+
+        try:
+            value = compute()
+            self.stats["computed"] += 1
+            self._quietly(self.backend.set, key, pickle.dumps((versions, value), pickle.HIGHEST_PROTOCOL),
+                          ex=ttl or self.ttl)
+        finally:
+            if locked:
+                self._quietly(self.backend.delete, lock_key(key))
+        return value
+
+    def _quietly(self, operation, *args, **kwargs):
+        # A failed store or unlock only costs a recompute (locks expire on their own)
+        try:
+            operation(*args, **kwargs)
+        except Exception as e:
+            print(f"Shared cache error: {e}")
+            self.stats["errors"] += 1
+
+    def invalidate(self, *tags):
+        """Give `tags` new versions; every entry computed under them becomes a miss."""
+        try:
+            for tag in tags:
+                self.backend.set(tag, os.urandom(8), ex=TAG_TTL)
+        except Exception as e:
+            # Entries still expire after their TTL
+            print(f"Shared cache error invalidating {tags}: {e}")
+            self.stats["errors"] += 1
+
+
+def init_shared_cache(app):
+    """Open the backend named by SHARED_CACHE_URL (once per process, before the workers fork)."""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    backend = open_backend(app.config["SHARED_CACHE_URL"], os.path.join(app.instance_path, "shared_cache.db"))
+    if backend is None:
+        return
+    app.extensions["shared_cache"] = SharedCache(
+        backend,
+        ttl=app.config["SHARED_CACHE_TTL"],
+        lock_seconds=app.config["SHARED_CACHE_LOCK_SECONDS"],
+        wait_seconds=app.config["SHARED_CACHE_WAIT_SECONDS"],
+    )
+
+    def on_data_changed(sender, changes):
+        tags = [table for table in TAGGED_TABLES if changes.touches(table)]
+        tags += [f"restaurant:{restaurant_id}" for restaurant_id in changes.restaurant_ids]
+        if tags:
+            prefix = namespace(changes.region)
+            app.extensions["shared_cache"].invalidate(*[prefix + tag for tag in tags])
+
+    data_changed.connect(on_data_changed, sender=app, weak=False)
+
+
+_namespaces = {}
+
+
+def namespace(region):
+    """Key prefix of a region's database, e.g. "philadelphia@1a2b3c4d:"."""
+    url = str(engine_for(region).url)
+    if url not in _namespaces:
+        _namespaces[url] = f"{region}@{hashlib.sha1(url.encode()).hexdigest()[:8]}:"
+    return _namespaces[url]
+
+
+def cached(name, compute, tags=(), ttl=None):
+    """
+    compute() shared across workers under `name` in the current region,
+    invalidated by writes to the `tags` (table names or "restaurant:<id>").
+    """
+    cache = current_app.extensions.get("shared_cache")
+    if cache is None:
+        return compute()
+    prefix = namespace(current_region())
+    return cache.get_or_compute(prefix + name, compute, ttl=ttl, tags=[prefix + tag for tag in tags])
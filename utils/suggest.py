@@ -0,0 +1,437 @@
+"""
+utils/suggest.py
+
+Typeahead index behind /api/suggest. Entries are restaurant names,
+cuisines and the chatbot's dish vocabulary (get_food_mappings()), each
+with a popularity weight:
+- restaurant: review count plus likes on its posts
+- cuisine: restaurants serving it plus their popularity
+- dish: the same sum over restaurants whose name, cuisine or
+  description mention it
+
+Every word start of an entry is a key ("dave's hot chicken" is found by
+"dav", "hot" and "chi"), kept in one sorted list, so a prefix is a
+contiguous slice found with two bisects. A segment tree over the slice
+holds the position of the heaviest key under each node; the top K come
+off a heap of nodes, so short prefixes matching thousands of keys cost
+the same as long ones.
+
+Updates are incremental: changed entries go to a small sorted delta,
+their old keys are masked out, and queries merge both. The base arrays
+are rebuilt once the delta passes SUGGEST_DELTA_LIMIT keys.
+
+Each region has its own index, built on first use (or by wsgi.warm_up).
+Restaurant, review and content writes in this process refresh the
+affected restaurants on a background thread. Restaurant writes in other
+workers are picked up through the catalog version stamp: queries check it
+(at most once per CATALOG_CHECK_INTERVAL), and when it moved the
+restaurants logged since the index's version (Catalog.changes_since())
+are refreshed the same way in the background. The index is rebuilt
+whole only when the log cannot list them. Until then the old index keeps
+answering.
+"""
+
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.events import data_changed
+from utils.regions import PerRegion, region_scope
+
+Entry = namedtuple("Entry", ("kind", "ref", "text", "weight"))
+
+WORD_START_RE = re.compile(r"(?:^|(?<=[\s/&,(-]))\w")
+CUISINE_SPLIT_RE = re.compile(r"\s*[/,&]\s*")
+# Past this many prefix bytes every key is unique enough; keeps keys short
+KEY_CHARS = 48
+
+
+def normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+def word_keys(text):
+    """Keys of a text: itself from every word start, lowercased and truncated."""
+    text = normalize(text)
+    return {text[m.start():m.start() + KEY_CHARS] for m in WORD_START_RE.finditer(text)}
+
+
+class _Base:
+    """Immutable sorted keys with a max-weight segment tree over them."""
+
+    def __init__(self, pairs, weights):
+        # `pairs` are (key, entry index), sorted
+        self.keys = [key for key, _ in pairs]
+        self.owners = array("i", [entry for _, entry in pairs])
+        n = len(pairs)
+        size = 1
+        while size < max(n, 1):
+            size *= 2
+        self.size = size
+
+        # Leaf weights by position; empty leaves weigh -inf
+        leaf_weights = np.full(size, -np.inf)
+        if n:
+            leaf_weights[:n] = np.asarray(weights, dtype=np.float64)[np.asarray(self.owners)]
+        tree = np.full(2 * size, -1, dtype=np.int32)
+        tree[size:size + n] = np.arange(n, dtype=np.int32)
+        node_weight = np.full(2 * size, -np.inf)
+        node_weight[size:] = leaf_weights
+        level = size
+        while level > 1:
+            parents = np.arange(level // 2, level, dtype=np.int64)
+            left, right = 2 * parents, 2 * parents + 1
+            pick_left = node_weight[left] >= node_weight[right]
+            tree[parents] = np.where(pick_left, tree[left], tree[right])
+            node_weight[parents] = np.where(pick_left, node_weight[left], node_weight[right])
+            level //= 2
+        self.tree = array("i", tree.tobytes())
+        self.node_weight = array("d", node_weight.tobytes())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def top(self, prefix, k, skip):
+        """Up to k entry indices under `prefix`, heaviest first, ignoring `skip`."""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_right(self.keys, prefix + "\uffff")
+        if lo >= hi:
+            return []
+        tree, node_weight, size = self.tree, self.node_weight, self.size
+        heap = []
+        left, right = lo + size, hi + size
+        while left < right:  # canonical nodes covering [lo, hi)
+            if left & 1:
+                heap.append((-node_weight[left], tree[left], left))
+                left += 1
+            if right & 1:
+                right -= 1
+                heap.append((-node_weight[right], tree[right], right))
+            left >>= 1
+            right >>= 1
+        heapq.heapify(heap)
+
+        found, seen = [], set()
+        while heap and len(found) < k:
+            _, position, node = heapq.heappop(heap)
+            if node >= size:
+                entry = self.owners[position]
+                if entry not in skip and entry not in seen:
+                    seen.add(entry)
+                    found.append(entry)
+                continue
+            for child in (2 * node, 2 * node + 1):
+                if tree[child] >= 0:
+                    heapq.heappush(heap, (-node_weight[child], tree[child], child))
+        return found
+
+    def nbytes(self):
+        size = sum(len(key) for key in self.keys) + 8 * len(self.keys)
+        return size + len(self.owners) * 4 + len(self.tree) * 4 + len(self.node_weight) * 8
+
+
+class _View:
+    """What a query reads; replaced whole on every update."""
+
+    __slots__ = ("entries", "base", "delta", "dead")
+
+    def __init__(self, entries, base, delta, dead):
+        self.entries = entries  # entry index -> Entry
+        self.base = base
+        self.delta = delta      # sorted [(key, entry index)] added since the base
+        self.dead = dead        # entry indices replaced or removed since the base
+
+
+class SuggestIndex:
+    """Weighted prefix completion over entries keyed by (kind, ref)."""
+
+    def __init__(self, delta_limit=2000):
+        self.delta_limit = delta_limit
+        self._lock = threading.Lock()
+        self._index = {}  # (kind, ref) -> live entry index
+        self._view = _View([], _Base([], []), [], frozenset())
+
+    def __len__(self):
+        return len(self._index)
+
+    def update(self, entries):
+        """Add or replace entries (an iterable of Entry)."""
+        with self._lock:
+            view = self._view
+            # Entries are append-only until the next compaction, so older views stay valid
+            added, dead = [], set(view.dead)
+            for entry in entries:
+                old = self._index.get((entry.kind, entry.ref))
+                if old is not None:
+                    dead.add(old)
+                idx = len(view.entries)
+                view.entries.append(entry)
+                self._index[(entry.kind, entry.ref)] = idx
+                added.extend((key, idx) for key in word_keys(entry.text))
+            self._publish(view, view.delta + added, dead)
+
+    def remove(self, keys):
+        """Drop entries by (kind, ref)."""
+        with self._lock:
+            view = self._view
+            dead = set(view.dead)
+            for key in keys:
+                idx = self._index.pop(key, None)
+                if idx is not None:
+                    dead.add(idx)
+            self._publish(view, view.delta, dead)
+
+    def rebuild(self):
+        """Fold the delta into fresh base arrays."""
+        with self._lock:
+            view = self._view
+            if view.delta or view.dead:
+                self._fold(view, view.delta, view.dead)
+
+    def _publish(self, view, delta, dead):
+        if len(delta) + len(dead) > self.delta_limit:
+            self._fold(view, delta, dead)
+        else:
+            self._view = _View(view.entries, view.base, sorted(delta), frozenset(dead))
+
+    def _fold(self, view, delta, dead):
+        entries = view.entries
+        if len(entries) > 2 * len(self._index):
+            # Mostly replaced entries: compact the list and re-key the live ones
+            live = sorted(self._index.items(), key=lambda item: item[1])
+            entries = [entries[idx] for _, idx in live]
+            self._index = {key: i for i, (key, _) in enumerate(live)}
+            pairs = [(key, i) for i, entry in enumerate(entries) for key in word_keys(entry.text)]
+        else:
+            # Both runs are sorted, so this sort is a merge
+            base = view.base
+            pairs = [pair for pair in zip(base.keys, base.owners) if pair[1] not in dead]
+            pairs += [pair for pair in sorted(delta) if pair[1] not in dead]
+        pairs.sort()
+        base = _Base(pairs, [entry.weight for entry in entries])
+        self._view = _View(entries, base, [], frozenset())
+
+    def complete(self, prefix, k=8):
+        """Top k entries with a word starting with `prefix`, heaviest first."""
+        prefix = normalize(prefix)[:KEY_CHARS]
+        if not prefix or k <= 0:
+            return []
+        view = self._view
+        found = view.base.top(prefix, k, view.dead)
+        if view.delta:
+            lo = bisect_left(view.delta, (prefix,))
+            hi = bisect_left(view.delta, (prefix + "\uffff",))
+            found.extend(idx for _, idx in view.delta[lo:hi] if idx not in view.dead)
+            found = sorted(dict.fromkeys(found), key=lambda idx: -view.entries[idx].weight)
+        return [view.entries[idx] for idx in found[:k]]
+
+    def nbytes(self):
+        return self._view.base.nbytes()
+
+
+def split_cuisines(cuisine):
+    """ "Indian / Pakistani" -> ["Indian", "Pakistani"] """
+    return [part for part in CUISINE_SPLIT_RE.split((cuisine or "").strip()) if part]
+
+
+def dish_vocabulary():
+    """Dish words and phrases the chatbot understands (keys and search terms)."""
+    from routes.chatbot_routes import get_food_mappings
+
+    words = {}
+    for food, terms in get_food_mappings().items():
+        for word in [food, *terms]:
+            words.setdefault(normalize(word), word)
+    return list(words.values())
+
+
+def load_popularity(restaurant_ids=None):
+    """
+    (name, cuisine, weight) per restaurant (all, or the given ids), where
+    weight is its review count plus the likes on its posts. Three queries.
+    """
+    from sqlalchemy import func, select
+
+    from models.content import Content
+    from models.restaurant import Restaurant
+    from utils.db import db
+    from utils.projection import project, rating_summaries
+
+    restaurant_filter = [] if restaurant_ids is None else [Restaurant.id.in_(restaurant_ids)]
+    rows = project(Restaurant, ("id", "name", "cuisine"), *restaurant_filter)
+    ratings = rating_summaries(restaurant_ids)
+    stmt = select(Content.restaurant_id, func.sum(Content.likes_count)).where(
+        Content.restaurant_id.isnot(None)
+    ).group_by(Content.restaurant_id)
+    if restaurant_ids is not None:
+        stmt = stmt.where(Content.restaurant_id.in_(restaurant_ids))
+    likes = dict(db.session.execute(stmt).all())
+    return {
+        r.id: (r.name, r.cuisine, ratings.get(r.id, (None, 0))[1] + (likes.get(r.id) or 0))
+        for r in rows
+    }
+
+
+class RestaurantSuggest:
+    """
+    One region's typeahead index. Restaurants marked stale are reloaded
+    by refresh(); cuisine weights are kept as running sums so a change to
+    one restaurant only touches its own cuisines.
+    """
+
+    def __init__(self, region):
+        self.region = region
+        self.index = None
+        self._restaurants = {}  # id -> (cuisines, weight) currently counted
+        self._cuisines = {}     # normalized cuisine -> [display text, weight]
+        self._stale = set()
+        self._lock = threading.Lock()
+        self.scheduled = False  # a background refresh is queued
+        self.version = None     # catalog version the index was built from
+
+    def invalidate(self, restaurant_ids=None):
+        """Mark restaurants stale; no ids means rebuild everything."""
+        with self._lock:
+            if restaurant_ids is None:
+                self.index = None
+            else:
+                self._stale.update(restaurant_ids)
+
+    def refresh(self):
+        from utils.catalog import catalog
+
+        with self._lock, region_scope(self.region, read_only=True):
+            if self.index is None:
+                self._build()
+                return self.index
+            stale, self._stale = self._stale, set()
+            if self._catalog_moved():
+                # Restaurants written since our version, here or in other workers
+                version, changes = catalog.for_region(self.region).changes_since(self.version)
+                if changes is None:
+                    self._build()
+                    return self.index
+                stale |= changes.get("restaurant", set()) | changes.get("content", set())
+                self.version = version
+            if stale:
+                stale = list(stale)
+                self._apply(self.index, stale, load_popularity(stale))
+        return self.index
+
+    def _build(self):
+        from flask import current_app
+
+        from utils.catalog import catalog
+
+        index = SuggestIndex(current_app.config.get("SUGGEST_DELTA_LIMIT", 2000))
+        self._restaurants, self._cuisines, self._stale = {}, {}, set()
+        popularity = load_popularity()
+        self._apply(index, list(popularity), popularity)
+
+        # Dish weights are only counted here; they change slowly
+        snapshot = catalog.for_region(self.region).get()
+        dishes = []
+        for word in dish_vocabulary():
+            positions = snapshot.search(word, ("name", "cuisine", "description"))
+            weight = sum(1 + popularity.get(snapshot.ids[i], ("", "", 0))[2] for i in positions)
+            dishes.append(Entry("dish", normalize(word), word, weight))
+        index.update(dishes)
+        index.rebuild()
+        self.index, self.version = index, snapshot.version
+
+    def _catalog_moved(self):
+        """True if the catalog (checked at most once per CATALOG_CHECK_INTERVAL) left our version."""
+        from utils.catalog import catalog
+
+        return catalog.for_region(self.region).get().version != self.version
+
+    def _apply(self, index, restaurant_ids, popularity):
+        entries, gone, touched = [], [], set()
+        for restaurant_id in restaurant_ids:
+            old_cuisines, old_weight = self._restaurants.pop(restaurant_id, ((), 0))
+            for cuisine in old_cuisines:
+                self._cuisines[cuisine][1] -= 1 + old_weight
+                touched.add(cuisine)
+            if restaurant_id not in popularity:
+                gone.append(("restaurant", restaurant_id))
+                continue
+            name, cuisine_text, weight = popularity[restaurant_id]
+            entries.append(Entry("restaurant", restaurant_id, name, weight))
+            displays = {normalize(c): c for c in split_cuisines(cuisine_text)}
+            cuisines = tuple(displays)
+            for cuisine in cuisines:
+                slot = self._cuisines.setdefault(cuisine, [displays[cuisine], 0])
+                slot[1] += 1 + weight
+                touched.add(cuisine)
+            self._restaurants[restaurant_id] = (cuisines, weight)
+
+        for cuisine in touched:
+            text, weight = self._cuisines[cuisine]
+            if weight > 0:
+                entries.append(Entry("cuisine", cuisine, text, weight))
+            else:
+                del self._cuisines[cuisine]
+                gone.append(("cuisine", cuisine))
+        index.remove(gone)
+        index.update(entries)
+
+    def complete(self, prefix, k=8):
+        """Top k entries for `prefix`; one per text (a cuisine can also be a dish)."""
+        index = self.index
+        if not normalize(prefix):
+            return []
+        if index is None:  # first use in this process
+            index = self.refresh()
+        elif self._catalog_moved():
+            # A restaurant changed, possibly in another worker
+            from flask import current_app
+
+            _refresh_in_background(current_app._get_current_object(), self)
+        unique = {}
+        for entry in index.complete(prefix, 2 * k):
+            unique.setdefault(normalize(entry.text), entry)
+        return list(unique.values())[:k]
+
+
+suggest_index = PerRegion(RestaurantSuggest)
+
+# Columns that feed the entries and their weights
+SUGGEST_COLUMNS = {
+    "restaurant": ("name", "cuisine"),
+    "review": None,
+    "content": ("restaurant_id", "likes_count"),
+}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="suggest")
+
+
+def _refresh_in_background(app, suggest):
+    def run():
+        suggest.scheduled = False
+        try:
+            with app.app_context():
+                suggest.refresh()
+        except Exception as e:
+            print(f"Error refreshing suggestions ({suggest.region}): {e}")
+
+    # One queued refresh picks up every restaurant marked stale before it runs
+    if not suggest.scheduled:
+        suggest.scheduled = True
+        _executor.submit(run)
+
+
+@data_changed.connect
+def _on_data_changed(sender, changes):
+    if not any(changes.touches(table, columns) for table, columns in SUGGEST_COLUMNS.items()):
+        return
+    suggest = suggest_index.for_region(changes.region)
+    if suggest.index is None:
+        return  # not built yet; the first query loads current data
+    suggest.invalidate(changes.restaurant_ids)
+    _refresh_in_background(sender, suggest)
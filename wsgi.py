@@ -0,0 +1,31 @@
+"""
+wsgi.py
+
+Production entry point. Run with the settings in gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is created once in the gunicorn master (preload_app) and the
+workers are forked from it; gunicorn.conf.py disposes the inherited
+database engines in each worker and calls warm_up() before the worker
+accepts requests.
+"""
+
+from app import create_app
+from utils.catalog import catalog
+from utils.regions import region_names
+from utils.search_index import restaurant_index
+from utils.suggest import suggest_index
+
+app = create_app()
+
+
+def warm_up(app):
+    """Build the per-process caches and indexes so the first requests are not slow."""
+    with app.app_context():
+        for region in region_names():
+            catalog.for_region(region).get()
+            restaurant_index.for_region(region).refresh()
+            suggest_index.for_region(region).refresh()
+        for name in app.jinja_env.list_templates(extensions=["html"]):
+            app.jinja_env.get_template(name)